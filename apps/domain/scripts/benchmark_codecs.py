@@ -0,0 +1,70 @@
+"""Compare the compression codecs available to BinObject.
+
+Measures compression ratio and compress/decompress throughput of every
+registered codec on the serialized mtcars test fixtures and on synthetic
+tensors of increasing size.
+
+Usage (from apps/domain):
+    python scripts/benchmark_codecs.py
+"""
+
+# stdlib
+import os
+import sys
+import time
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(myPath + "/../src/")
+
+# third party
+from main.core.database.bin_storage.bin_obj import codecs  # noqa: E402
+import pandas as pd  # noqa: E402
+from syft import serialize  # noqa: E402
+import torch as th  # noqa: E402
+
+FIXTURES = os.path.join(myPath, "..", "tests", "test_routes")
+REPEAT = 3
+
+
+def payloads():
+    for name in ["mtcars_train.csv", "mtcars_test.csv"]:
+        df = pd.read_csv(os.path.join(FIXTURES, name), header=None)
+        yield f"{name} (DataFrame)", df
+        yield f"{name} (Tensor)", th.tensor(df.values, dtype=th.float32)
+
+    for numel in [2**18, 2**22, 2**25]:
+        # Quantized values, similar to typical dataset columns
+        yield f"randint tensor {numel * 4 // 2 ** 20} MB", th.randint(
+            0, 256, (numel,), dtype=th.int32
+        )
+        yield f"randn tensor {numel * 4 // 2 ** 20} MB", th.randn(numel)
+
+
+def measure(func, data):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(data)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    print(
+        f"{'payload':<28}{'codec':<6}{'ratio':>8}{'comp MB/s':>12}{'decomp MB/s':>13}"
+    )
+    for name, obj in payloads():
+        raw = serialize(obj).SerializeToString()
+        megabytes = len(raw) / 2**20
+        for codec_name, codec in codecs.items():
+            compressed, compress_time = measure(codec.compress, raw)
+            _, decompress_time = measure(codec.decompress, compressed)
+            print(
+                f"{name:<28}{codec_name:<6}{len(raw) / len(compressed):>8.2f}"
+                f"{megabytes / max(compress_time, 1e-9):>12.1f}"
+                f"{megabytes / max(decompress_time, 1e-9):>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the flat-buffer FedAvg of CycleManager with the former per
+parameter reduce(th.add) averaging.
+
+Diffs have the parameter shapes of a ResNet-18 (62 tensors, 11.7M values).
+To keep memory bounded, a batch of N diffs cycles over a small pool of
+distinct diffs, which does not change the work either method performs.
+
+Usage (from apps/domain):
+    python scripts/benchmark_fedavg.py [--diffs 100 300 1000]
+"""
+
+# stdlib
+import argparse
+from functools import reduce
+import os
+import sys
+import time
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(myPath + "/../src/")
+
+# third party
+from main.core.model_centric.cycles.fed_avg import average_diffs  # noqa: E402
+import torch as th  # noqa: E402
+
+POOL_SIZE = 8
+
+
+def resnet18_shapes():
+    shapes = [(64, 3, 7, 7), (64,), (64,)]
+    in_channels = 64
+    for channels, stride in [(64, 1), (128, 2), (256, 2), (512, 2)]:
+        for block in range(2):
+            block_in = in_channels if block == 0 else channels
+            shapes += [(channels, block_in, 3, 3), (channels,), (channels,)]
+            shapes += [(channels, channels, 3, 3), (channels,), (channels,)]
+            if block == 0 and (stride != 1 or block_in != channels):
+                shapes += [(channels, block_in, 1, 1), (channels,), (channels,)]
+        in_channels = channels
+    return shapes + [(1000, 512), (1000,)]
+
+
+def reduce_average(diffs):
+    raw_diffs = [[diff[i] for diff in diffs] for i in range(len(diffs[0]))]
+    sums = [reduce(th.add, param) for param in raw_diffs]
+    return [th.div(param, len(diffs)) for param in sums]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--diffs", type=int, nargs="+", default=[100, 300, 1000])
+    args = parser.parse_args()
+
+    shapes = resnet18_shapes()
+    pool = [[th.randn(shape) for shape in shapes] for _ in range(POOL_SIZE)]
+    print(f"{len(shapes)} params, {sum(p.numel() for p in pool[0])} values")
+
+    print(f"{'diffs':>6}{'reduce s':>12}{'flat s':>12}{'speedup':>10}")
+    for num_diffs in args.diffs:
+        diffs = [pool[i % POOL_SIZE] for i in range(num_diffs)]
+
+        start = time.perf_counter()
+        expected = reduce_average(diffs)
+        reduce_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = average_diffs(diffs)
+        flat_time = time.perf_counter() - start
+
+        assert all(th.allclose(a, b, atol=1e-5) for a, b in zip(result, expected))
+        print(
+            f"{num_diffs:>6}{reduce_time:>12.3f}{flat_time:>12.3f}"
+            f"{reduce_time / flat_time:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare the native tensor format of BinObject with the protobuf route.
+
+Measures encode/decode throughput and the peak memory used on top of the
+input tensor, for float32 tensors from 1 MB up to --max-mb (1 GB by
+default). Every measurement runs in a forked process so that peak memory
+is not polluted by earlier runs.
+
+Usage (from apps/domain):
+    python scripts/benchmark_formats.py [--max-mb 1024]
+"""
+
+# stdlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(myPath + "/../src/")
+
+# third party
+from main.core.database.bin_storage.bin_obj import bin_to_proto  # noqa: E402
+from main.core.database.bin_storage.native_format import native_formats  # noqa: E402
+from syft import deserialize  # noqa: E402
+from syft import serialize  # noqa: E402
+import torch as th  # noqa: E402
+
+
+def protobuf_encode(tensor):
+    return serialize(tensor).SerializeToString()
+
+
+def protobuf_decode(raw):
+    proto = bin_to_proto["TensorProto"]()
+    proto.ParseFromString(raw)
+    return deserialize(blob=proto)
+
+
+ROUTES = {
+    "protobuf": (protobuf_encode, protobuf_decode),
+    "native": (native_formats["RawTensor"].encode, native_formats["RawTensor"].decode),
+}
+
+
+def max_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(route, megabytes):
+    encode, decode = ROUTES[route]
+    tensor = th.randn(megabytes * 2**20 // 4)
+    baseline = max_rss_mb()
+
+    start = time.perf_counter()
+    raw = encode(tensor)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = decode(raw)
+    decode_time = time.perf_counter() - start
+
+    assert th.equal(decoded, tensor)
+    return encode_time, decode_time, max_rss_mb() - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-mb", type=int, default=1024)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    print(f"{'size':>8}{'route':>10}{'enc MB/s':>12}{'dec MB/s':>12}{'peak MB':>10}")
+    megabytes = 1
+    while megabytes <= args.max_mb:
+        for route in ROUTES:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                encode_time, decode_time, peak = pool.submit(
+                    measure, route, megabytes
+                ).result()
+            print(
+                f"{megabytes:>6}MB{route:>10}"
+                f"{megabytes / max(encode_time, 1e-9):>12.1f}"
+                f"{megabytes / max(decode_time, 1e-9):>12.1f}"
+                f"{peak:>10.1f}"
+            )
+        megabytes *= 4
+
+
+if __name__ == "__main__":
+    main()
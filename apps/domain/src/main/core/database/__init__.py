@@ -15,10 +15,16 @@ class BaseModel(db.Model, AllFeaturesMixin):
 
 
 # grid relative
+from .bin_storage.bin_obj import BinBlob
 from .bin_storage.bin_obj import BinObject
+from .bin_storage.bin_obj import BinObjectChunk
 from .bin_storage.bin_obj import ObjectMetadata
+from .bin_storage.bin_obj import ObjectPermission
+from .bin_storage.bin_obj import ObjectTag
 from .bin_storage.json_obj import JsonObject
 from .bin_storage.metadata import StorageMetadata
+from .data_migration.data_migration import DataMigration
+from .data_migration.data_migration import apply_data_migration
 from .dataset.datasetgroup import DatasetGroup
 from .groups.groups import Group
 from .groups.usergroup import UserGroup
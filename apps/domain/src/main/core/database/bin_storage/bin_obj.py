@@ -1,4 +1,24 @@
+# stdlib
+import hashlib
+import lzma
+import os
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import Union
+import zlib
+
 # third party
+import numpy as np
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import IntegrityError
 from syft import deserialize
 from syft import serialize
 from syft.proto.lib.pandas.frame_pb2 import PandasDataFrame as PandasDataFrame_PB
@@ -7,32 +27,515 @@ from syft.proto.lib.torch.tensor_pb2 import TensorProto as TensorProto_PB
 # grid relative
 from .. import BaseModel
 from .. import db
+from .mmap_file import MMAP_THRESHOLD
+from .mmap_file import as_array
+from .mmap_file import read_array_file
+from .mmap_file import write_array_file
+from .native_format import native_encode
+from .native_format import native_formats
 
 bin_to_proto = {
     TensorProto_PB.__name__: TensorProto_PB,
     PandasDataFrame_PB.__name__: PandasDataFrame_PB,
 }
 
+# Type names of the objects stored as protobuf before BinObject.obj_type existed
+proto_to_type = {
+    TensorProto_PB.__name__: "torch.Tensor",
+    PandasDataFrame_PB.__name__: "pandas.core.frame.DataFrame",
+}
+
+# Payloads larger than this are split into rows of this many bytes.
+CHUNK_SIZE = int(os.environ.get("BIN_OBJECT_CHUNK_SIZE", 4 * 1024 * 1024))
+
+# Payloads smaller than this are stored uncompressed.
+COMPRESSION_THRESHOLD = int(
+    os.environ.get("BIN_OBJECT_COMPRESSION_THRESHOLD", 64 * 1024)
+)
+
+
+class Codec(NamedTuple):
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+    # Incremental versions, for chunked payloads: compressor() returns an
+    # object with compress(data) and flush(), decompressor() one with
+    # decompress(data).
+    compressor: Callable[[], Any]
+    decompressor: Callable[[], Any]
+
+
+class _Identity:
+    """Incremental codec of uncompressed payloads."""
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+codecs: Dict[str, Codec] = {
+    "none": Codec(
+        compress=lambda data: data,
+        decompress=lambda data: data,
+        compressor=_Identity,
+        decompressor=_Identity,
+    ),
+    "zlib": Codec(
+        compress=lambda data: zlib.compress(data, 1),
+        decompress=zlib.decompress,
+        compressor=lambda: zlib.compressobj(1),
+        decompressor=zlib.decompressobj,
+    ),
+    "lzma": Codec(
+        compress=lzma.compress,
+        decompress=lzma.decompress,
+        compressor=lzma.LZMACompressor,
+        decompressor=lzma.LZMADecompressor,
+    ),
+}
+
+try:
+    # third party
+    import lz4.frame
+
+    class _LZ4Compressor:
+        """LZ4 frame compressor, opening the frame with the first data."""
+
+        def __init__(self):
+            self._compressor = lz4.frame.LZ4FrameCompressor()
+            self._header = self._compressor.begin()
+
+        def compress(self, data: bytes) -> bytes:
+            header, self._header = self._header, b""
+            return header + self._compressor.compress(data)
+
+        def flush(self) -> bytes:
+            header, self._header = self._header, b""
+            return header + self._compressor.flush()
+
+    codecs["lz4"] = Codec(
+        compress=lz4.frame.compress,
+        decompress=lz4.frame.decompress,
+        compressor=_LZ4Compressor,
+        decompressor=lz4.frame.LZ4FrameDecompressor,
+    )
+except ImportError:
+    pass
+
+try:
+    # third party
+    import zstandard
+
+    codecs["zstd"] = Codec(
+        compress=lambda data: zstandard.ZstdCompressor(level=10).compress(data),
+        # Frames written incrementally do not record their content size,
+        # which the one-shot decompress requires
+        decompress=lambda data: zstandard.ZstdDecompressor()
+        .decompressobj()
+        .decompress(data),
+        compressor=lambda: zstandard.ZstdCompressor(level=10).compressobj(),
+        decompressor=lambda: zstandard.ZstdDecompressor().decompressobj(),
+    )
+except ImportError:
+    pass
+
+# Fast codec for dense numeric payloads, high ratio codec for tabular ones.
+# Both fall back to the standard library when the optional packages are
+# not installed.
+FAST_CODEC = "lz4" if "lz4" in codecs else "zlib"
+HIGH_RATIO_CODEC = "zstd" if "zstd" in codecs else "lzma"
+
+codec_by_type = {
+    "torch.Tensor": FAST_CODEC,
+    "pandas.core.frame.DataFrame": HIGH_RATIO_CODEC,
+}
+
+
+def select_codec(obj_type: str, size: int) -> str:
+    """Choose the codec used to store a payload from its type and size."""
+    if size < COMPRESSION_THRESHOLD:
+        return "none"
+    return codec_by_type.get(obj_type, FAST_CODEC)
+
+
+def type_name(obj_type: type) -> str:
+    """Fully qualified name of a python type, as persisted in
+    BinObject.obj_type."""
+    return f"{obj_type.__module__}.{obj_type.__qualname__}"
+
+
+class BinBlob(BaseModel):
+    """Payload shared by every BinObject storing the same content.
+
+    Blobs are addressed by the SHA256 of their uncompressed content and are
+    dropped by release_blob once no BinObject references them.
+    """
+
+    __tablename__ = "bin_blob"
+
+    hash = db.Column(db.String(64), primary_key=True)
+    binary = db.deferred(db.Column(db.LargeBinary()))
+    size = db.Column(db.BigInteger())
+    # Number of BinObjectChunk rows holding the payload, 0 if stored inline.
+    chunks = db.Column(db.Integer(), default=0)
+    codec = db.Column(db.String(64), default="none")
+    # Path of the file holding the raw array, for file backed payloads.
+    path = db.Column(db.String(3072))
+
+    @property
+    def content(self) -> Union[bytes, bytearray]:
+        codec = self.codec or "none"
+        if self.chunks:
+            chunks = iter_chunks(db.session, self.hash, self.chunks)
+            return decode_chunks(chunks, codec)
+        return codecs[codec].decompress(self.binary)
+
 
 class BinObject(BaseModel):
     __tablename__ = "bin_object"
 
     id = db.Column(db.String(3072), primary_key=True)
-    binary = db.Column(db.LargeBinary(3072))
     protobuf_name = db.Column(db.String(3072))
+    obj_type = db.Column(db.String(3072), index=True)
+    blob_hash = db.Column(db.String(64), db.ForeignKey("bin_blob.hash"), index=True)
+    blob = db.relationship("BinBlob")
+    # Protobuf payload of rows written before blobs existed, moved to a blob
+    # by migrate_inline_binaries
+    binary = db.deferred(db.Column(db.LargeBinary()))
 
     @property
     def object(self):
-        _proto_struct = bin_to_proto[self.protobuf_name]()
-        _proto_struct.ParseFromString(self.binary)
-        _obj = deserialize(blob=_proto_struct)
-        return _obj
+        return self.load()[0]
+
+    def load(self) -> Tuple[Any, int]:
+        """Decode the stored object.
+
+        Returns:
+            result: Tuple (object, size), size being the bytes the object
+                holds in memory: the buffer of dense arrays, the uncompressed
+                payload of other objects.
+        """
+        if self.blob is None:
+            content = self.binary
+        elif self.blob.path:
+            _obj = read_array_file(
+                self.blob.path, as_tensor=self.obj_type == "torch.Tensor"
+            )
+            return _obj, self.blob.size
+        else:
+            content = self.blob.content
+
+        if self.protobuf_name in native_formats:
+            _obj = native_formats[self.protobuf_name].decode(content)
+        else:
+            _proto_struct = bin_to_proto[self.protobuf_name]()
+            _proto_struct.ParseFromString(content)
+            _obj = deserialize(blob=_proto_struct)
+
+        array = as_array(_obj)
+        return _obj, array.nbytes if array is not None else len(content)
 
     @object.setter
     def object(self, value):
-        serialized_value = serialize(value)
-        self.binary = serialized_value.SerializeToString()
-        self.protobuf_name = serialized_value.__class__.__name__
+        self.store(value)
+
+    def store(
+        self, value, chunk_size: int = CHUNK_SIZE, data_dir: Optional[str] = None
+    ) -> None:
+        """Point this object to the blob holding the content of value,
+        storing a new blob only if no identical content is stored yet.
+
+        Args:
+            value: Object to be stored.
+            chunk_size: Payloads larger than this are stored as chunk rows.
+            data_dir: If set, large dense arrays are stored as files in it.
+        """
+        self.obj_type = type_name(type(value))
+        self.binary = None
+
+        array = as_array(value) if data_dir else None
+        if array is not None and array.nbytes >= MMAP_THRESHOLD:
+            self.protobuf_name = None
+            self.blob = put_array_blob(db.session, array, data_dir)
+            return
+
+        # Dense arrays skip protobuf, other objects fall back to it
+        native = native_encode(value)
+        if native is not None:
+            self.protobuf_name, raw = native
+        else:
+            serialized_value = serialize(value)
+            self.protobuf_name = serialized_value.__class__.__name__
+            raw = serialized_value.SerializeToString()
+        self.blob = put_blob(db.session, raw, self.obj_type, chunk_size=chunk_size)
+
+
+class BinObjectChunk(BaseModel):
+    __tablename__ = "bin_object_chunk"
+
+    blob = db.Column(db.String(64), db.ForeignKey("bin_blob.hash"), primary_key=True)
+    seq = db.Column(db.Integer(), primary_key=True, autoincrement=False)
+    binary = db.Column(db.LargeBinary())
+
+
+def put_blob(
+    session, raw: Union[bytes, bytearray], obj_type: str, chunk_size: int = CHUNK_SIZE
+) -> BinBlob:
+    """Get the blob storing raw, creating it if it does not exist yet.
+
+    Args:
+        session: SQLAlchemy session.
+        raw: Serialized payload.
+        obj_type: Type name of the serialized object, used to pick a codec.
+        chunk_size: Payloads larger than this are stored as chunk rows.
+    Returns:
+        blob: BinBlob instance.
+    """
+    digest = hashlib.sha256(raw).hexdigest()
+    blob = get_blob(session, digest)
+    if blob is not None:
+        return blob
+
+    codec = select_codec(obj_type, len(raw))
+    if len(raw) > chunk_size:
+        return put_chunked_blob(session, digest, raw, codec, chunk_size)
+
+    payload = codecs[codec].compress(raw)
+    # Keep incompressible payloads as they are
+    if len(payload) >= len(raw):
+        codec, payload = "none", raw
+
+    blob = BinBlob(hash=digest, codec=codec, size=len(payload), chunks=0)
+    blob.binary = payload
+    blob, _ = insert_blob(session, blob)
+    return blob
+
+
+def put_chunked_blob(
+    session, digest: str, raw: Union[bytes, bytearray], codec: str, chunk_size: int
+) -> BinBlob:
+    """Store a payload larger than chunk_size as chunk rows, compressed one
+    chunk at a time so that the whole compressed payload is never held.
+
+    Whether the payload compresses is judged on its first chunk, as the
+    chunks are written before the compressed size is known.
+    """
+    sample = memoryview(raw)[:chunk_size]
+    if codec != "none" and len(codecs[codec].compress(sample)) >= len(sample):
+        codec = "none"
+
+    blob, inserted = insert_blob(
+        session, BinBlob(hash=digest, codec=codec, size=0, chunks=0)
+    )
+    if inserted:
+        blob.chunks, blob.size = write_chunks(
+            session, digest, encode_chunks(raw, codec, chunk_size), chunk_size
+        )
+    return blob
+
+
+def put_array_blob(session, array: np.ndarray, data_dir: str) -> BinBlob:
+    """Get the file backed blob storing array, writing it to data_dir if it
+    does not exist yet."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array)
+    digest = digest.hexdigest()
+
+    blob = get_blob(session, digest)
+    if blob is not None:
+        return blob
+
+    path = os.path.join(data_dir, f"{digest}.npy")
+    blob = BinBlob(
+        hash=digest,
+        codec="none",
+        chunks=0,
+        size=write_array_file(path, array),
+        path=path,
+    )
+    # A concurrent writer of the same array wrote the same file
+    blob, _ = insert_blob(session, blob)
+    return blob
+
+
+def get_blob(session, digest: str) -> Optional[BinBlob]:
+    """Get a blob by hash, locked against release_blob until the transaction
+    ends, so that it is not deleted before the caller references it."""
+    return (
+        session.query(BinBlob).filter_by(hash=digest).with_for_update(read=True).first()
+    )
+
+
+# Dialects inserting blobs with INSERT ... ON CONFLICT DO NOTHING. pysqlite
+# only emits BEGIN before DML, so a savepoint opened first would run outside
+# of the transaction and its release would commit.
+insert_on_conflict = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def insert_blob(session, blob: BinBlob) -> Tuple[BinBlob, bool]:
+    """Insert a new blob, unless a concurrent transaction inserted an
+    identical one first.
+
+    Returns:
+        result: Tuple (blob, inserted), blob being the stored BinBlob, which
+            is the one inserted concurrently if inserted is False.
+    """
+    dialect = session.bind.dialect.name
+    if dialect not in insert_on_conflict:
+        try:
+            with session.begin_nested():
+                session.add(blob)
+        except IntegrityError:
+            return get_blob(session, blob.hash), False
+        return blob, True
+
+    values = {column.key: getattr(blob, column.key) for column in BinBlob.__table__.c}
+    result = session.execute(
+        insert_on_conflict[dialect](BinBlob.__table__)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["hash"])
+    )
+    return get_blob(session, blob.hash), result.rowcount == 1
+
+
+def release_blob(session, digest: Optional[str]) -> Optional[str]:
+    """Delete a blob if no BinObject references it anymore.
+
+    Args:
+        session: SQLAlchemy session.
+        digest: Hash of the blob.
+    Returns:
+        path: File of the deleted blob, to be removed once the transaction is
+            committed, or None.
+    """
+    if digest is None:
+        return None
+
+    session.flush()
+    # Locked first, a concurrent writer referencing the blob is then either
+    # committed and seen below, or waits and stores a new blob
+    blob = session.query(BinBlob).filter_by(hash=digest).with_for_update().first()
+    if blob is None:
+        return None
+
+    if session.query(BinObject.id).filter_by(blob_hash=digest).first() is not None:
+        return None
+
+    session.query(BinObjectChunk).filter_by(blob=digest).delete()
+    session.delete(blob)
+    return blob.path
+
+
+def migrate_inline_binaries(session) -> None:
+    """Move the payloads of BinObject rows written before blobs existed to
+    blobs, in the transaction of the caller."""
+    legacy = session.query(BinObject.id).filter(
+        BinObject.blob_hash.is_(None), BinObject.binary.isnot(None)
+    )
+    for (key,) in legacy.all():
+        bin_obj = session.query(BinObject).get(key)
+        if bin_obj.obj_type is None:
+            bin_obj.obj_type = proto_to_type.get(bin_obj.protobuf_name)
+        bin_obj.blob = put_blob(session, bin_obj.binary, bin_obj.obj_type)
+        bin_obj.binary = None
+        session.flush()
+        # Only one payload is held by the session at a time
+        session.expunge(bin_obj)
+
+
+def write_chunks(
+    session,
+    digest: str,
+    source: Union[bytes, BinaryIO, Iterable[bytes]],
+    chunk_size: int = CHUNK_SIZE,
+) -> Tuple[int, int]:
+    """Store a payload as fixed-size chunk rows, flushing each one before
+    reading the next so that at most one chunk is held by the session.
+
+    Args:
+        session: SQLAlchemy session.
+        digest: Hash of the BinBlob owning the chunks.
+        source: Payload bytes, a binary file-like object to read it from, or
+            an iterable of consecutive parts of it.
+        chunk_size: Size in bytes of every chunk but the last one.
+    Returns:
+        result: Tuple (chunks, size), the number of chunk rows written and
+            the size in bytes of the payload.
+    """
+    if hasattr(source, "read"):
+        read = source.read
+    elif not isinstance(source, (bytes, bytearray, memoryview)):
+        parts = iter(source)
+        pending = bytearray()
+
+        def read(size: int) -> bytes:
+            for part in parts:
+                pending.extend(part)
+                if len(pending) >= size:
+                    break
+            data = bytes(pending[:size])
+            del pending[:size]
+            return data
+
+    else:
+        view = memoryview(source)
+        offset = 0
+
+        def read(size: int) -> bytes:
+            nonlocal offset
+            data = bytes(view[offset : offset + size])
+            offset += len(data)
+            return data
+
+    seq = 0
+    size = 0
+    data = read(chunk_size)
+    while data:
+        chunk = BinObjectChunk(blob=digest, seq=seq, binary=data)
+        session.add(chunk)
+        session.flush()
+        session.expunge(chunk)
+        seq += 1
+        size += len(data)
+        data = read(chunk_size)
+
+    return seq, size
+
+
+def encode_chunks(
+    raw: Union[bytes, bytearray], codec: str, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Compress a payload chunk_size bytes at a time."""
+    view = memoryview(raw)
+    encoder = codecs[codec].compressor()
+    for offset in range(0, len(view), chunk_size):
+        data = encoder.compress(view[offset : offset + chunk_size])
+        if data:
+            yield data
+    yield encoder.flush()
+
+
+def iter_chunks(session, digest: str, chunks: int) -> Iterator[bytes]:
+    """Stream the chunks of a payload in order, one query per chunk."""
+    for seq in range(chunks):
+        yield session.query(BinObjectChunk.binary).filter_by(
+            blob=digest, seq=seq
+        ).scalar()
+
+
+def decode_chunks(chunks: Iterable[bytes], codec: str) -> bytearray:
+    """Decompress a chunked payload as its chunks are read, without
+    assembling the compressed payload first."""
+    decoder = codecs[codec].decompressor()
+    content = bytearray()
+    for data in chunks:
+        content += decoder.decompress(data)
+    return content
 
 
 class ObjectMetadata(BaseModel):
@@ -44,3 +547,36 @@ class ObjectMetadata(BaseModel):
     description = db.Column(db.String())
     read_permissions = db.Column(db.JSON())
     search_permissions = db.Column(db.JSON())
+
+
+class ObjectTag(BaseModel):
+    """Index of the tags of every stored object, kept in sync with
+    ObjectMetadata.tags so that tag searches are answered in SQL."""
+
+    __tablename__ = "object_tag"
+
+    tag = db.Column(db.String(256), primary_key=True)
+    obj = db.Column(
+        db.String(3072), db.ForeignKey("bin_object.id"), primary_key=True, index=True
+    )
+
+
+READ_PERMISSION = "read"
+
+
+class ObjectPermission(BaseModel):
+    """Index of the permissions granted on every stored object, kept in sync
+    with ObjectMetadata.read_permissions so that the objects available to a
+    user can be listed in SQL."""
+
+    __tablename__ = "object_permission"
+    __table_args__ = (
+        db.Index("ix_object_permission_verify_key", "verify_key", "permission"),
+    )
+
+    obj = db.Column(
+        db.String(3072), db.ForeignKey("bin_object.id"), primary_key=True, index=True
+    )
+    # Hex encoded VerifyKey of the grantee
+    verify_key = db.Column(db.String(256), primary_key=True)
+    permission = db.Column(db.String(16), primary_key=True, default=READ_PERMISSION)
@@ -0,0 +1,75 @@
+# stdlib
+import os
+from typing import Any
+from typing import Optional
+
+# third party
+import numpy as np
+import torch as th
+
+# Directory holding file backed payloads. The backend is disabled when unset.
+DATA_DIR = os.environ.get("BIN_OBJECT_DATA_DIR", None)
+
+# Arrays smaller than this are kept in the database.
+MMAP_THRESHOLD = int(os.environ.get("BIN_OBJECT_MMAP_THRESHOLD", 1024 * 1024))
+
+
+def as_array(value: Any) -> Optional[np.ndarray]:
+    """Return a numpy view of value if it is a dense numeric array that can
+    be stored as raw bytes, otherwise None."""
+    if isinstance(value, th.Tensor):
+        if (
+            value.layout != th.strided
+            or value.device.type != "cpu"
+            or value.requires_grad
+        ):
+            return None
+        try:
+            return value.numpy()
+        except (TypeError, RuntimeError):
+            # dtypes without a numpy equivalent (e.g. bfloat16)
+            return None
+    elif isinstance(value, np.ndarray) and value.dtype.kind in "biufc":
+        return value
+    return None
+
+
+def write_array_file(path: str, array: np.ndarray) -> int:
+    """Write an array as a .npy file (dtype/shape header followed by the raw
+    contiguous buffer).
+
+    Args:
+        path: Destination file path.
+        array: Array to be written.
+    Returns:
+        size: Size of the written file in bytes.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as tmp_file:
+        np.save(tmp_file, np.ascontiguousarray(array), allow_pickle=False)
+    # Readers never see a partially written file
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def read_array_file(path: str, as_tensor: bool) -> Any:
+    """Map a .npy file into memory without copying it.
+
+    The mapping is copy-on-write, so in-place changes made by the caller
+    never reach the file.
+
+    Args:
+        path: File path.
+        as_tensor: Wrap the mapped array into a torch tensor sharing its memory.
+    Returns:
+        value: numpy.memmap or torch.Tensor view of the file.
+    """
+    array = np.load(path, mmap_mode="c", allow_pickle=False)
+    if as_tensor:
+        return th.from_numpy(array)
+    return array
+
+
+def remove_array_file(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
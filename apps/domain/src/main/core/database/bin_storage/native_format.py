@@ -0,0 +1,184 @@
+# stdlib
+import json
+import struct
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+# third party
+import numpy as np
+import pandas as pd
+import torch as th
+
+# grid relative
+from .mmap_file import as_array
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Little endian length of the JSON header that precedes the raw buffers.
+HEADER_LENGTH = struct.Struct("<I")
+
+
+class NativeFormat(NamedTuple):
+    # Returns None when the value is not supported by the format.
+    encode: Callable[[Any], Optional[bytearray]]
+    decode: Callable[[Buffer], Any]
+
+
+def pack(header: dict, arrays: List[np.ndarray]) -> bytearray:
+    """Write a JSON header followed by the raw buffers of arrays into a
+    single preallocated buffer."""
+    head = json.dumps(header).encode("utf-8")
+    out = bytearray(
+        HEADER_LENGTH.size + len(head) + sum(array.nbytes for array in arrays)
+    )
+    HEADER_LENGTH.pack_into(out, 0, len(head))
+    offset = HEADER_LENGTH.size
+    out[offset : offset + len(head)] = head
+    offset += len(head)
+    for array in arrays:
+        view = np.frombuffer(out, dtype=np.uint8, count=array.nbytes, offset=offset)
+        view[:] = array.reshape(-1).view(np.uint8)
+        offset += array.nbytes
+    return out
+
+
+def unpack(payload: Buffer) -> Tuple[dict, bytearray, int]:
+    """Read the header of a packed payload.
+
+    Returns:
+        result: Tuple (header, buffer, offset) where offset is the position of
+            the first raw buffer. The buffer is writable, so that arrays built
+            on top of it can be modified in place.
+    """
+    if not isinstance(payload, bytearray):
+        payload = bytearray(payload)
+    (length,) = HEADER_LENGTH.unpack_from(payload, 0)
+    offset = HEADER_LENGTH.size + length
+    header = json.loads(payload[HEADER_LENGTH.size : offset].decode("utf-8"))
+    return header, payload, offset
+
+
+def read_array(
+    buffer: bytearray, offset: int, dtype: str, shape: List[int]
+) -> Tuple[np.ndarray, int]:
+    """View an array stored at offset without copying it.
+
+    Returns:
+        result: Tuple (array, offset of the next buffer).
+    """
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape, dtype=np.int64))
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+    return array.reshape(shape), offset + count * dtype.itemsize
+
+
+def encode_tensor(value: Any) -> Optional[bytearray]:
+    if not isinstance(value, th.Tensor):
+        return None
+    array = as_array(value)
+    if array is None:
+        return None
+
+    # Unlike ascontiguousarray, keeps zero-dimensional arrays as they are
+    array = np.require(array, requirements="C")
+    header = {"dtype": array.dtype.str, "shape": list(array.shape)}
+    # Attributes attached by syft are kept, as the protobuf path does
+    for attr in ["tags", "description"]:
+        if getattr(value, attr, None):
+            header[attr] = getattr(value, attr)
+    return pack(header, [array])
+
+
+def decode_tensor(payload: Buffer) -> th.Tensor:
+    header, buffer, offset = unpack(payload)
+    array, _ = read_array(buffer, offset, header["dtype"], header["shape"])
+    tensor = th.from_numpy(array)
+    for attr in ["tags", "description"]:
+        if attr in header:
+            setattr(tensor, attr, header[attr])
+    return tensor
+
+
+def encode_array(value: Any) -> Optional[bytearray]:
+    if type(value) is not np.ndarray or value.dtype.kind not in "biufc":
+        return None
+
+    array = np.require(value, requirements="C")
+    return pack({"dtype": array.dtype.str, "shape": list(array.shape)}, [array])
+
+
+def decode_array(payload: Buffer) -> np.ndarray:
+    header, buffer, offset = unpack(payload)
+    array, _ = read_array(buffer, offset, header["dtype"], header["shape"])
+    return array
+
+
+def encode_dataframe(value: Any) -> Optional[bytearray]:
+    """Encode data frames made of numeric columns with unique, plain column
+    names and a range index. Anything else is left to protobuf."""
+    if type(value) is not pd.DataFrame:
+        return None
+
+    index, columns = value.index, value.columns
+    if (
+        not isinstance(index, pd.RangeIndex)
+        or index.name is not None
+        or isinstance(columns, pd.MultiIndex)
+        or columns.name is not None
+        or not columns.is_unique
+        or not all(type(name) in (str, int) for name in columns)
+    ):
+        return None
+
+    arrays = []
+    for i in range(len(columns)):
+        array = value.iloc[:, i].to_numpy()
+        if not isinstance(array, np.ndarray) or array.dtype.kind not in "biufc":
+            return None
+        arrays.append(np.require(array, requirements="C"))
+
+    header = {
+        "columns": list(columns),
+        "dtypes": [array.dtype.str for array in arrays],
+        "index": [index.start, index.stop, index.step],
+    }
+    return pack(header, arrays)
+
+
+def decode_dataframe(payload: Buffer) -> pd.DataFrame:
+    header, buffer, offset = unpack(payload)
+    index = pd.RangeIndex(*header["index"])
+
+    columns = {}
+    for name, dtype in zip(header["columns"], header["dtypes"]):
+        columns[name], offset = read_array(buffer, offset, dtype, [len(index)])
+    return pd.DataFrame(columns, index=index, columns=header["columns"])
+
+
+# Formats are tried in order, the first one accepting a value is used. Their
+# names are persisted in BinObject.protobuf_name.
+native_formats: Dict[str, NativeFormat] = {
+    "RawTensor": NativeFormat(encode=encode_tensor, decode=decode_tensor),
+    "RawArray": NativeFormat(encode=encode_array, decode=decode_array),
+    "RawDataFrame": NativeFormat(encode=encode_dataframe, decode=decode_dataframe),
+}
+
+
+def native_encode(value: Any) -> Optional[Tuple[str, bytearray]]:
+    """Encode value with the first native format supporting it.
+
+    Returns:
+        result: Tuple (format name, payload), or None if value has to go
+            through protobuf.
+    """
+    for name, native_format in native_formats.items():
+        payload = native_format.encode(value)
+        if payload is not None:
+            return name, payload
+    return None
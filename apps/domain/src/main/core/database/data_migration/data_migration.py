@@ -0,0 +1,53 @@
+# stdlib
+from datetime import datetime
+from typing import Callable
+
+# third party
+from sqlalchemy.exc import IntegrityError
+
+# grid relative
+from .. import BaseModel
+from .. import db
+
+
+class DataMigration(BaseModel):
+    """Marker of a data migration applied to the database."""
+
+    __tablename__ = "data_migration"
+
+    name = db.Column(db.String(255), primary_key=True)
+    applied_at = db.Column(db.DateTime(), default=datetime.utcnow)
+
+    def __str__(self):
+        return f"<DataMigration name: {self.name}, applied at: {self.applied_at}>"
+
+
+def apply_data_migration(name: str, migrate: Callable[[], None]) -> bool:
+    """Apply a data migration once per database.
+
+    The marker is inserted before migrating, in the same transaction: when
+    several workers start at once, one inserts it and migrates, the others
+    wait for its transaction and fail to insert the marker.
+
+    Args:
+        name: Unique name of the migration.
+        migrate: Migrates the data, without committing.
+    Returns:
+        applied: Whether this call applied the migration.
+    """
+    if db.session.query(DataMigration).get(name) is not None:
+        return False
+
+    try:
+        db.session.add(DataMigration(name=name))
+        db.session.flush()
+        migrate()
+        db.session.commit()
+    except IntegrityError:
+        # Applied by another worker
+        db.session.rollback()
+        return False
+    except Exception:
+        db.session.rollback()
+        raise
+    return True
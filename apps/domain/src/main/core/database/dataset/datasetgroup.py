@@ -26,6 +26,17 @@ class Dataset(BaseModel):
     tags = db.Column(db.JSON())
 
 
+class DatasetTag(BaseModel):
+    """Index of the tags of every dataset, kept in sync with Dataset.tags."""
+
+    __tablename__ = "dataset_tag"
+
+    tag = db.Column(db.String(256), primary_key=True)
+    dataset = db.Column(
+        db.String(256), db.ForeignKey("dataset.id"), primary_key=True, index=True
+    )
+
+
 class BinObjDataset(BaseModel):
     __tablename__ = "bin_obj_dataset"
 
@@ -0,0 +1,97 @@
+# stdlib
+from collections import OrderedDict
+from threading import RLock
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Tuple
+
+
+class ObjectCache:
+    """In-process LRU cache of deserialized store payloads, bounded by the
+    total size in bytes of the cached entries rather than by their count.
+
+    Args:
+        max_bytes: Upper bound for the sum of the sizes of all cached entries.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Look up a cached value, marking it as the most recently used.
+
+        Args:
+            key: Cache key.
+        Returns:
+            result: Tuple (found, value), value is None when not found.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """Cache a value, evicting the least recently used entries until the
+        byte budget is respected. Values larger than the whole budget are not
+        cached.
+
+        Args:
+            key: Cache key.
+            value: Value to be cached.
+            size: Size of the value in bytes.
+        """
+        with self._lock:
+            self.invalidate(key)
+
+            if size > self.max_bytes:
+                return
+
+            while self._entries and self.size + size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+            self._entries[key] = (value, size)
+            self.size += size
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a key from the cache, if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def clear(self) -> None:
+        """Drop every cached entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
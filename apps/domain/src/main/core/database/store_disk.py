@@ -1,7 +1,19 @@
 # stdlib
+from contextlib import contextmanager
+from functools import partial
+import os
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import KeysView
+from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
 from typing import ValuesView
 
 # third party
@@ -16,11 +28,26 @@ from syft.core.store.storeable_object import StorableObject
 from torch import Tensor
 
 # grid relative
+from .bin_storage.bin_obj import BinBlob
 from .bin_storage.bin_obj import BinObject
+from .bin_storage.bin_obj import BinObjectChunk
+from .bin_storage.bin_obj import CHUNK_SIZE
 from .bin_storage.bin_obj import ObjectMetadata
+from .bin_storage.bin_obj import ObjectPermission
+from .bin_storage.bin_obj import ObjectTag
+from .bin_storage.bin_obj import READ_PERMISSION
+from .bin_storage.bin_obj import release_blob
+from .bin_storage.bin_obj import type_name
+from .bin_storage.mmap_file import DATA_DIR
+from .bin_storage.mmap_file import remove_array_file
+from .store_cache import ObjectCache
+from .utils import tagged_with
 
 ENCODING = "UTF-8"
 
+# Number of rows fetched per round-trip when streaming bulk reads.
+BULK_READ_BATCH_SIZE = 1000
+
 
 def create_storable(
     _id: UID, data: Tensor, description: str, tags: Iterable[str]
@@ -30,21 +57,130 @@ def create_storable(
     return obj
 
 
+class LazyStorableObject(StorableObject):
+    """StorableObject built from its metadata only.
+
+    The payload is fetched and deserialized the first time ``.data`` is
+    accessed, so reading tags, description or permissions never touches
+    the binary blob. Read permissions are kept hex encoded, as stored, until
+    ``.read_permissions`` is accessed.
+    """
+
+    def __init__(
+        self,
+        id: UID,
+        loader: Callable[[], Any],
+        description: str,
+        tags: Iterable[str],
+        read_permissions: Dict[str, Any],
+        search_permissions: dict,
+    ):
+        super().__init__(
+            id=id,
+            data=None,
+            description=description,
+            tags=tags,
+            read_permissions={},
+            search_permissions=search_permissions,
+        )
+        self._loader = loader
+        self._encoded_read_permissions = read_permissions
+
+    @property
+    def data(self) -> Any:
+        if self._loader is not None:
+            self._data = self._loader()
+            self._loader = None
+        return self._data
+
+    @data.setter
+    def data(self, value: Any) -> None:
+        self._data = value
+        self._loader = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loader is None
+
+    @property
+    def read_permissions(self) -> dict:
+        if self._encoded_read_permissions is not None:
+            self._read_permissions = {
+                VerifyKey(verify_key.encode(ENCODING), encoder=HexEncoder): value
+                for verify_key, value in self._encoded_read_permissions.items()
+            }
+            self._encoded_read_permissions = None
+        return self._read_permissions
+
+    @read_permissions.setter
+    def read_permissions(self, value: dict) -> None:
+        self._read_permissions = value
+        self._encoded_read_permissions = None
+
+
 def storable_to_dict(storable_obj: StorableObject) -> dict:
     _dict = {}
     _dict["tags"] = storable_obj.tags
     _dict["description"] = storable_obj.description
     # Serialize nacl Verify Keys Structure
-    _dict["read_permissions"] = {
-        key.encode(encoder=HexEncoder).decode("utf-8"): None
-        for key in storable_obj.read_permissions.keys()
-    }
+    if (
+        isinstance(storable_obj, LazyStorableObject)
+        and storable_obj._encoded_read_permissions is not None
+    ):
+        _dict["read_permissions"] = dict(storable_obj._encoded_read_permissions)
+    else:
+        _dict["read_permissions"] = {
+            key.encode(encoder=HexEncoder).decode("utf-8"): None
+            for key in storable_obj.read_permissions.keys()
+        }
     return _dict
 
 
+def subtype_names(obj_type: type) -> Set[str]:
+    """Collect the persisted type names of obj_type and all of its currently
+    loaded subclasses, so that isinstance checks can be answered in SQL."""
+    names = set()
+    pending = [obj_type]
+    while pending:
+        _type = pending.pop()
+        names.add(type_name(_type))
+        # Metaclasses are skipped, no stored payload is a class
+        pending.extend(
+            subtype
+            for subtype in type.__subclasses__(_type)
+            if not issubclass(subtype, type)
+        )
+    return names
+
+
+class _TransactionState(threading.local):
+    """Per-thread state of the transaction blocks opened on a store."""
+
+    def __init__(self):
+        self.depth = 0
+        # Blobs that lost a reference, released when the transaction commits.
+        self.released: Set[Optional[str]] = set()
+
+
 class DiskObjectStore(ObjectStore):
-    def __init__(self, db):
+    def __init__(
+        self,
+        db,
+        cache: Optional[ObjectCache] = None,
+        chunk_size: int = CHUNK_SIZE,
+        data_dir: Optional[str] = DATA_DIR,
+    ):
         self.db = db
+        # Payloads larger than chunk_size bytes are stored as chunk rows.
+        self.chunk_size = chunk_size
+        # Large dense arrays are stored as memory mapped files under data_dir.
+        self.data_dir = data_dir
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+        # Optional read-through cache of deserialized payloads. It can be
+        # shared between stores backed by the same database.
+        self.cache = cache
+        self._transaction = _TransactionState()
 
     def get_object(self, key: UID) -> Optional[StorableObject]:
         try:
@@ -53,7 +189,107 @@ class DiskObjectStore(ObjectStore):
             return None
 
     def get_objects_of_type(self, obj_type: type) -> Iterable[StorableObject]:
-        return [obj for obj in self.values() if isinstance(obj.data, obj_type)]
+        # Every object is an instance of object, e.g. for the object search
+        if obj_type is object:
+            return self.values()
+
+        # Rows with a persisted type are filtered in SQL, legacy rows stored
+        # before the obj_type column existed are checked after decoding.
+        type_filter = BinObject.obj_type.in_(subtype_names(obj_type))
+        typed = self._bulk_read(type_filter)
+        untyped = [
+            obj
+            for obj in self._bulk_read(BinObject.obj_type.is_(None))
+            if isinstance(obj.data, obj_type)
+        ]
+        return typed + untyped
+
+    def get_objects_with_tags(
+        self,
+        tags: Iterable[str],
+        readable_by: Optional[Union[VerifyKey, str]] = None,
+    ) -> List[StorableObject]:
+        """Objects tagged with every one of tags, found through the tag index
+        without reading the metadata of non-matching objects.
+
+        Args:
+            tags: Tags of the objects, every object matches when empty.
+            readable_by: If set, only the objects the owner of this VerifyKey,
+                or its hex encoding, is allowed to read.
+        Returns:
+            objects: List of matching StorableObjects.
+        """
+        criteria = []
+        tags = set(tags)
+        if tags:
+            matches = tagged_with(ObjectTag.obj, ObjectTag.tag, tags)
+            criteria.append(BinObject.id.in_(matches))
+        if readable_by is not None:
+            criteria.append(self._readable_by(readable_by))
+        return self._bulk_read(*criteria)
+
+    def get_objects_readable_by(
+        self, verify_key: Union[VerifyKey, str]
+    ) -> List[StorableObject]:
+        """Objects the owner of verify_key is allowed to read, found through
+        the permission index.
+
+        Args:
+            verify_key: VerifyKey or its hex encoding.
+        Returns:
+            objects: List of readable StorableObjects.
+        """
+        return self._bulk_read(self._readable_by(verify_key))
+
+    def _readable_by(self, verify_key: Union[VerifyKey, str]):
+        if isinstance(verify_key, VerifyKey):
+            verify_key = verify_key.encode(encoder=HexEncoder).decode(ENCODING)
+
+        readable = self.db.session.query(ObjectPermission.obj).filter_by(
+            verify_key=verify_key, permission=READ_PERMISSION
+        )
+        return BinObject.id.in_(readable)
+
+    def grant_permission(
+        self, key: UID, verify_key: str, permission: str = READ_PERMISSION
+    ) -> None:
+        """Grant a permission on an object without loading or rewriting it.
+
+        Args:
+            key: UID of the object.
+            verify_key: Hex encoded verify key of the grantee.
+            permission: Permission type.
+        """
+        with self.transaction():
+            if permission == READ_PERMISSION:
+                metadata = (
+                    self.db.session.query(ObjectMetadata)
+                    .filter_by(obj=str(key.value))
+                    .first()
+                )
+                if metadata is None:
+                    raise Exception("Object not found!")
+                metadata.read_permissions = {
+                    **metadata.read_permissions,
+                    verify_key: None,
+                }
+
+            self.db.session.merge(
+                ObjectPermission(
+                    obj=str(key.value), verify_key=verify_key, permission=permission
+                )
+            )
+
+    def reindex(self) -> None:
+        """Rebuild the tag and permission indexes from ObjectMetadata, in the
+        transaction of the caller."""
+        self.db.session.query(ObjectTag).delete()
+        self.db.session.query(ObjectPermission).delete()
+        for key, tags, read_permissions in self.db.session.query(
+            ObjectMetadata.obj, ObjectMetadata.tags, ObjectMetadata.read_permissions
+        ):
+            self._index_tags(key, tags)
+            self._index_read_permissions(key, read_permissions)
 
     def __sizeof__(self) -> int:
         return self.values().__sizeof__()
@@ -70,11 +306,24 @@ class DiskObjectStore(ObjectStore):
         return keys
 
     def values(self) -> ValuesView[StorableObject]:
-        obj_keys = self.keys()
-        values = []
-        for key in obj_keys:
-            values.append(self.__getitem__(key))
-        return values
+        return self._bulk_read()
+
+    def _bulk_read(self, *criteria) -> List[StorableObject]:
+        """Load objects and their metadata using a single joined query,
+        streamed from the database in batches.
+
+        Args:
+            criteria: Optional SQLAlchemy filters applied before any payload is read.
+        Returns:
+            objects: List of StorableObjects matching the criteria.
+        """
+        rows = (
+            self.db.session.query(BinObject.id, ObjectMetadata)
+            .join(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+            .filter(*criteria)
+            .yield_per(BULK_READ_BATCH_SIZE)
+        )
+        return [self._to_storable(key, obj_metadata) for key, obj_metadata in rows]
 
     def __contains__(self, key: UID) -> bool:
         return (
@@ -83,68 +332,215 @@ class DiskObjectStore(ObjectStore):
         )
 
     def __getitem__(self, key: UID) -> StorableObject:
-        bin_obj = self.db.session.query(BinObject).filter_by(id=str(key.value)).first()
-        obj_metadata = (
-            self.db.session.query(ObjectMetadata).filter_by(obj=str(key.value)).first()
+        row = (
+            self.db.session.query(BinObject.id, ObjectMetadata)
+            .join(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+            .filter(BinObject.id == str(key.value))
+            .first()
         )
 
-        if not bin_obj or not obj_metadata:
+        if not row:
             raise Exception("Object not found!")
 
-        read_permissions = {
-            VerifyKey(key.encode("utf-8"), encoder=HexEncoder): value
-            for key, value in obj_metadata.read_permissions.items()
-        }
+        return self._to_storable(*row)
+
+    def _load_data(self, key: str) -> Any:
+        if self.cache is not None:
+            found, data = self.cache.get(key)
+            if found:
+                return data
 
-        obj = StorableObject(
-            id=UID.from_string(bin_obj.id),
-            data=bin_obj.object,
+        bin_obj = self.db.session.query(BinObject).filter_by(id=key).first()
+
+        if not bin_obj:
+            raise Exception("Object not found!")
+
+        # The cache is charged the decoded size, not the compressed one
+        data, size = bin_obj.load()
+        # File backed payloads are cached by the OS page cache instead
+        if self.cache is not None and not bin_obj.blob.path:
+            self.cache.put(key, data, size=size)
+        return data
+
+    def _to_storable(self, key: str, obj_metadata: ObjectMetadata) -> StorableObject:
+        obj = LazyStorableObject(
+            id=UID.from_string(key),
+            loader=partial(self._load_data, key),
             description=obj_metadata.description,
             tags=obj_metadata.tags,
-            read_permissions=read_permissions,
+            read_permissions=obj_metadata.read_permissions,
             search_permissions=syft.lib.python.Dict({VERIFYALL: None}),
         )
         return obj
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group writes and deletes into a single database transaction.
+
+        The transaction is committed when the outermost block exits and
+        rolled back if it raises. Blocks are tracked per thread, as the
+        store is shared by concurrent requests.
+        """
+        state = self._transaction
+        state.depth += 1
+        try:
+            yield
+        except BaseException:
+            if state.depth == 1:
+                state.released.clear()
+                self.db.session.rollback()
+            raise
+        else:
+            if state.depth == 1:
+                paths = [
+                    release_blob(self.db.session, blob_hash)
+                    for blob_hash in state.released
+                ]
+                state.released.clear()
+                self.db.session.commit()
+                for path in paths:
+                    remove_array_file(path)
+        finally:
+            state.depth -= 1
+
     def __setitem__(self, key: UID, value: StorableObject) -> None:
-        obj = value
-        bin_obj = BinObject(id=str(key.value), object=value.data)
+        with self.transaction():
+            self._write(key, value)
+
+    def set_many(self, items: Iterable[Tuple[UID, StorableObject]]) -> None:
+        """Write several objects and their metadata in one transaction.
+
+        Args:
+            items: Pairs of (key, StorableObject), e.g. a dict's items().
+        """
+        with self.transaction():
+            for key, value in items:
+                self._write(key, value)
+
+    def _write(self, key: UID, value: StorableObject) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(str(key.value))
+
+        # The payload of an untouched lazy object is already stored as-is,
+        # so only its metadata needs to be written back.
+        if (
+            isinstance(value, LazyStorableObject)
+            and not value.is_loaded
+            and value.id == key
+        ):
+            self._update_metadata(key, value)
+            return
+
+        # Existing rows are updated in place instead of being deleted and
+        # inserted again.
+        bin_obj = self.db.session.query(BinObject).filter_by(id=str(key.value)).first()
+        is_new = bin_obj is None
+        if is_new:
+            bin_obj = BinObject(id=str(key.value))
+        old_blob_hash = bin_obj.blob_hash
+
+        # Identical payloads share a single blob, so this only writes the
+        # payload if its content is not stored yet
+        bin_obj.store(value.data, chunk_size=self.chunk_size, data_dir=self.data_dir)
+
+        if is_new:
+            metadata_dict = storable_to_dict(value)
+            self.db.session.add(bin_obj)
+            self.db.session.add(
+                ObjectMetadata(
+                    obj=bin_obj.id,
+                    tags=metadata_dict["tags"],
+                    description=metadata_dict["description"],
+                    read_permissions=metadata_dict["read_permissions"],
+                    search_permissions={},
+                )
+            )
+            self._index_tags(bin_obj.id, metadata_dict["tags"])
+            self._index_read_permissions(bin_obj.id, metadata_dict["read_permissions"])
+        else:
+            self._update_metadata(key, value)
+            if old_blob_hash != bin_obj.blob.hash:
+                self._transaction.released.add(old_blob_hash)
+
+    def _update_metadata(self, key: UID, value: StorableObject) -> None:
         metadata_dict = storable_to_dict(value)
-        metadata_obj = ObjectMetadata(
-            obj=bin_obj.id,
-            tags=metadata_dict["tags"],
-            description=metadata_dict["description"],
-            read_permissions=metadata_dict["read_permissions"],
-            search_permissions={},
+        self.db.session.query(ObjectMetadata).filter_by(obj=str(key.value)).update(
+            {
+                "tags": metadata_dict["tags"],
+                "description": metadata_dict["description"],
+                "read_permissions": metadata_dict["read_permissions"],
+            }
         )
+        self.db.session.query(ObjectTag).filter_by(obj=str(key.value)).delete()
+        self._index_tags(str(key.value), metadata_dict["tags"])
+        self.db.session.query(ObjectPermission).filter_by(
+            obj=str(key.value), permission=READ_PERMISSION
+        ).delete()
+        self._index_read_permissions(str(key.value), metadata_dict["read_permissions"])
 
-        if self.__contains__(key):
-            self.delete(key)
+    def _index_tags(self, key: str, tags: Optional[Iterable[str]]) -> None:
+        self.db.session.add_all(ObjectTag(tag=tag, obj=key) for tag in set(tags or []))
 
-        self.db.session.add(bin_obj)
-        self.db.session.add(metadata_obj)
-        self.db.session.commit()
+    def _index_read_permissions(
+        self, key: str, read_permissions: Optional[Dict[str, Any]]
+    ) -> None:
+        self.db.session.add_all(
+            ObjectPermission(obj=key, verify_key=verify_key, permission=READ_PERMISSION)
+            for verify_key in read_permissions or {}
+        )
+
+    def _delete_rows(self, key: str) -> bool:
+        """Delete the object and metadata rows of key, releasing its blob
+        when the transaction commits.
+
+        Returns:
+            found: Whether the object existed.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(key)
+
+        blob_hash = self.db.session.query(BinObject.blob_hash).filter_by(id=key).first()
+        if blob_hash is None:
+            return False
+
+        self.db.session.query(ObjectTag).filter_by(obj=key).delete()
+        self.db.session.query(ObjectPermission).filter_by(obj=key).delete()
+        self.db.session.query(ObjectMetadata).filter_by(obj=key).delete()
+        self.db.session.query(BinObject).filter_by(id=key).delete()
+        self._transaction.released.add(blob_hash[0])
+        return True
 
     def delete(self, key: UID) -> None:
         try:
-            object_to_delete = (
-                self.db.session.query(BinObject).filter_by(id=str(key.value)).first()
-            )
-            metadata_to_delete = (
-                self.db.session.query(ObjectMetadata)
-                .filter_by(obj=str(key.value))
-                .first()
-            )
-            self.db.session.delete(object_to_delete)
-            self.db.session.delete(metadata_to_delete)
-            self.db.session.commit()
+            with self.transaction():
+                if not self._delete_rows(str(key.value)):
+                    raise Exception("Object not found!")
         except Exception as e:
             print(f"{type(self)} Exception in __delitem__ error {key}. {e}")
 
+    def delete_many(self, keys: Iterable[UID]) -> None:
+        """Delete several objects in one transaction, ignoring missing keys."""
+        with self.transaction():
+            for key in keys:
+                self._delete_rows(str(key.value))
+
     def clear(self) -> None:
-        self.db.session.query(BinObject).delete()
+        if self.cache is not None:
+            self.cache.clear()
+
+        paths = self.db.session.query(BinBlob.path).filter(BinBlob.path.isnot(None))
+        paths = [path for path, in paths]
+
+        self.db.session.query(ObjectTag).delete()
+        self.db.session.query(ObjectPermission).delete()
         self.db.session.query(ObjectMetadata).delete()
+        self.db.session.query(BinObject).delete()
+        self.db.session.query(BinObjectChunk).delete()
+        self.db.session.query(BinBlob).delete()
         self.db.session.commit()
 
+        for path in paths:
+            remove_array_file(path)
+
     def __repr__(self) -> str:
         return self._objects.__repr__()
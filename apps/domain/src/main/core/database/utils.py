@@ -1,3 +1,9 @@
+# stdlib
+from typing import Iterable
+
+# third party
+from sqlalchemy import func
+
 # grid relative
 from . import db
 from .groups.groups import Group
@@ -19,6 +25,26 @@ def model_to_json(model):
     return json
 
 
+def tagged_with(key, tag, tags: Iterable[str]):
+    """Query the keys tagged with every one of tags, using an indexed tag
+    table rather than the JSON tags columns.
+
+    Args:
+        key: Key column of the tag table, e.g. ObjectTag.obj.
+        tag: Tag column of the tag table, e.g. ObjectTag.tag.
+        tags: Tags that must all be present.
+    Returns:
+        query: Query over the matching keys, usable in an IN clause.
+    """
+    tags = set(tags)
+    return (
+        db.session.query(key)
+        .filter(tag.in_(tags))
+        .group_by(key)
+        .having(func.count() == len(tags))
+    )
+
+
 def expand_user_object(user):
     def get_group(user_group):
         query = db.session().query
@@ -1,9 +1,11 @@
 # stdlib
+from contextlib import nullcontext
 from copy import deepcopy
 import csv
 from io import StringIO
 import tarfile
 from typing import Iterable
+from typing import List
 from typing import Optional
 
 # third party
@@ -21,15 +23,15 @@ import torch as th
 
 # grid relative
 from ..database import db
-from ..database.bin_storage.bin_obj import BinObject
-from ..database.bin_storage.bin_obj import ObjectMetadata
 from ..database.bin_storage.json_obj import JsonObject
 from ..database.bin_storage.metadata import get_metadata
 from ..database.dataset.datasetgroup import BinObjDataset
 from ..database.dataset.datasetgroup import Dataset
 from ..database.dataset.datasetgroup import DatasetGroup
+from ..database.dataset.datasetgroup import DatasetTag
 from ..database.store_disk import DiskObjectStore
 from ..database.utils import model_to_json
+from ..database.utils import tagged_with
 
 
 def decompress(file_obj):
@@ -65,56 +67,65 @@ def process_items(node, tar_obj, user_key):
         id=str(UID().value), manifest=manifest, description=description, tags=tags
     )
     db.session.add(dataset_db)
+    index_dataset_tags(dataset_db.id, tags)
     data = list()
-    for item in tar_obj.members:
-        if not item.isdir() and (not item.name in skip_files):
-            reader = csv.reader(
-                tar_obj.extractfile(item.name).read().decode().split("\n"),
-                delimiter=",",
-            )
-
-            dataset = []
-
-            for row in reader:
-                if len(row) != 0:
-                    dataset.append(row)
-            dataset = np.array(dataset, dtype=np.float)
-            df = th.tensor(dataset, dtype=th.float32)
-            id_at_location = UID()
-
-            # Step 2: create message which contains object to send
-            storable = StorableObject(
-                id=id_at_location,
-                data=df,
-                tags=tags + ["#" + item.name.split("/")[-1]],
-                search_permissions={VERIFYALL: None},
-            )
-
-            obj_msg = SaveObjectAction(obj=storable, address=node.address)
-
-            signed_message = obj_msg.sign(
-                signing_key=SigningKey(user_key.encode("utf-8"), encoder=HexEncoder)
-            )
-
-            node.recv_immediate_msg_without_reply(msg=signed_message)
-
-            obj_dataset_relation = BinObjDataset(
-                name=item.name,
-                dataset=dataset_db.id,
-                obj=str(id_at_location.value),
-                dtype=df.__class__.__name__,
-                shape=str(tuple(df.shape)),
-            )
-            db.session.add(obj_dataset_relation)
-            data.append(
-                {
-                    "name": obj_dataset_relation.name,
-                    "id": str(id_at_location.value),
-                    "tags": tags + ["#" + item.name.split("/")[-1]],
-                    "dtype": obj_dataset_relation.dtype,
-                    "shape": obj_dataset_relation.shape,
-                }
-            )
+    # Objects saved by the node are committed together with the dataset
+    # rows, instead of once per file
+    transaction = (
+        node.store.transaction()
+        if isinstance(node.store, DiskObjectStore)
+        else nullcontext()
+    )
+    with transaction:
+        for item in tar_obj.members:
+            if not item.isdir() and (not item.name in skip_files):
+                reader = csv.reader(
+                    tar_obj.extractfile(item.name).read().decode().split("\n"),
+                    delimiter=",",
+                )
+
+                dataset = []
+
+                for row in reader:
+                    if len(row) != 0:
+                        dataset.append(row)
+                dataset = np.array(dataset, dtype=np.float)
+                df = th.tensor(dataset, dtype=th.float32)
+                id_at_location = UID()
+
+                # Step 2: create message which contains object to send
+                storable = StorableObject(
+                    id=id_at_location,
+                    data=df,
+                    tags=tags + ["#" + item.name.split("/")[-1]],
+                    search_permissions={VERIFYALL: None},
+                )
+
+                obj_msg = SaveObjectAction(obj=storable, address=node.address)
+
+                signed_message = obj_msg.sign(
+                    signing_key=SigningKey(user_key.encode("utf-8"), encoder=HexEncoder)
+                )
+
+                node.recv_immediate_msg_without_reply(msg=signed_message)
+
+                obj_dataset_relation = BinObjDataset(
+                    name=item.name,
+                    dataset=dataset_db.id,
+                    obj=str(id_at_location.value),
+                    dtype=df.__class__.__name__,
+                    shape=str(tuple(df.shape)),
+                )
+                db.session.add(obj_dataset_relation)
+                data.append(
+                    {
+                        "name": obj_dataset_relation.name,
+                        "id": str(id_at_location.value),
+                        "tags": tags + ["#" + item.name.split("/")[-1]],
+                        "dtype": obj_dataset_relation.dtype,
+                        "shape": obj_dataset_relation.shape,
+                    }
+                )
 
     db.session.commit()
     ds = model_to_json(dataset_db)
@@ -131,9 +142,8 @@ def create_df_dataset(node, tarfile, key):
         return {"error": str(e)}, 400
 
 
-def create_dataset(df_json: dict) -> dict:
+def create_dataset(df_json: dict, storage: DiskObjectStore) -> dict:
     _json = deepcopy(df_json)
-    storage = DiskObjectStore(db)
     mapping = []
 
     # Separate CSV from metadata
@@ -154,7 +164,7 @@ def create_dataset(df_json: dict) -> dict:
 
         _json["tensors"][name]["shape"] = [int(x) for x in _tensor.size()]
         _json["tensors"][name]["dtype"] = "{}".format(_tensor.dtype)
-        storage.__setitem__(_id, StorableObject(id=_id, data=_tensor))
+        storables.append((_id, StorableObject(id=_id, data=_tensor)))
         # Ensure we have same ID in metadata and dataset
         db.session.add(
             DatasetGroup(bin_object=str(_id.value), dataset=str(df_id.value))
@@ -165,7 +175,8 @@ def create_dataset(df_json: dict) -> dict:
     metadata.length += 1
 
     db.session.add(json_obj)
-    db.session.commit()
+    # Objects, dataset rows and metadata are committed in one transaction
+    storage.set_many(storables)
     return _json
 
 
@@ -176,8 +187,26 @@ def get_dataset_metadata(key: str) -> Optional[dict]:
     return obj
 
 
-def get_all_datasets():
-    return list(db.session.query(Dataset).all())
+def get_all_datasets(tags: Optional[Iterable[str]] = None) -> List[Dataset]:
+    query = db.session.query(Dataset)
+    if tags:
+        matches = tagged_with(DatasetTag.dataset, DatasetTag.tag, tags)
+        query = query.filter(Dataset.id.in_(matches))
+    return list(query.all())
+
+
+def index_dataset_tags(key: str, tags: Optional[Iterable[str]]) -> None:
+    """Replace the entries of a dataset in the tag index."""
+    db.session.query(DatasetTag).filter_by(dataset=key).delete()
+    db.session.add_all(DatasetTag(tag=tag, dataset=key) for tag in set(tags or []))
+
+
+def reindex_dataset_tags() -> None:
+    """Rebuild the dataset tag index from the tags stored in Dataset, in the
+    transaction of the caller."""
+    db.session.query(DatasetTag).delete()
+    for key, tags in db.session.query(Dataset.id, Dataset.tags):
+        index_dataset_tags(key, tags)
 
 
 def get_all_relations(key):
@@ -216,6 +245,7 @@ def update_dataset_metadata(key: str, **kwargs) -> None:
 def update_dataset(key: str, tags: list, manifest: str, description: str):
     if tags:
         db.session.query(Dataset).filter_by(id=key).update({"tags": tags})
+        index_dataset_tags(key, tags)
     elif manifest:
         db.session.query(Dataset).filter_by(id=key).update({"manifest": manifest})
     elif description:
@@ -224,12 +254,17 @@ def update_dataset(key: str, tags: list, manifest: str, description: str):
     db.session.commit()
 
 
-def delete_dataset(key: str) -> None:
+def delete_dataset(key: str, storage: DiskObjectStore) -> None:
     ds_objs = get_all_relations(key)
-    for ds_obj in ds_objs:
-        db.session.query(BinObject).filter_by(id=ds_obj.obj).delete()
-        db.session.query(ObjectMetadata).filter_by(obj=ds_obj.obj).delete()
-        db.session.delete(ds_obj)
-
-    db.session.query(Dataset).filter_by(id=key).delete()
-    db.session.commit()
+    keys = [UID.from_string(ds_obj.obj) for ds_obj in ds_objs]
+    with storage.transaction():
+        # Relations go first, they reference the objects
+        for ds_obj in ds_objs:
+            db.session.delete(ds_obj)
+        db.session.flush()
+        # The objects are dropped from the cache of the store, and blobs
+        # still referenced by objects outside of this dataset are kept
+        storage.delete_many(keys)
+
+        db.session.query(DatasetTag).filter_by(dataset=key).delete()
+        db.session.query(Dataset).filter_by(id=key).delete()
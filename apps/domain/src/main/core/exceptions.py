@@ -172,3 +172,10 @@ class AppInSleepyMode(PyGridError):
                 "This app is in sleep mode. Please undergo the initial setup first"
             )
         super().__init__(message)
+
+
+class MessageTooLargeError(PyGridError):
+    def __init__(self, message=""):
+        if not message:
+            message = "Message exceeds the maximum allowed size!"
+        super().__init__(message)
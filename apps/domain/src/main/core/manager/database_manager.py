@@ -1,9 +1,15 @@
 # stdlib
+from typing import Any
 from typing import Dict
 from typing import List
+from typing import Optional
 from typing import Type
 from typing import Union
 
+# third party
+from sqlalchemy import func
+from sqlalchemy import tuple_
+
 # grid relative
 from ..database import BaseModel
 from ..database import db
@@ -39,17 +45,76 @@ class DatabaseManager:
         objects = self.db.session.query(self._schema).filter_by(**kwargs).first()
         return objects
 
-    def last(self, **kwargs):
-        """Query and return the last occurrence.
+    def last(self, **kwargs) -> Optional[BaseModel]:
+        """Query and return the last occurrence, by primary key.
 
         Args:
             parameters: List of parameters used to filter.
         Return:
-            obj: Last object instance.
+            obj: Last object instance, or None if nothing matches. Callers
+                raise their own not found error for None.
         """
+        primary_key = self._schema.__mapper__.primary_key
+        return (
+            self.db.session.query(self._schema)
+            .filter_by(**kwargs)
+            .order_by(*[column.desc() for column in primary_key])
+            .first()
+        )
+
+    def count(self, **kwargs) -> int:
+        """Count the objects matching the parameters, without loading them.
 
-        obj = self.db.session.query(self._schema).filter_by(**kwargs).all()[-1]
-        return obj
+        Args:
+            parameters: List of parameters used to filter.
+        """
+        primary_key = self._schema.__mapper__.primary_key[0]
+        return (
+            self.db.session.query(self._schema)
+            .filter_by(**kwargs)
+            .with_entities(func.count(primary_key))
+            .scalar()
+        )
+
+    def exists(self, **kwargs) -> bool:
+        """Check if any object matches the parameters, without loading it.
+
+        Args:
+            parameters: List of parameters used to filter.
+        """
+        query = self.db.session.query(self._schema).filter_by(**kwargs)
+        return self.db.session.query(query.exists()).scalar()
+
+    def paginate(
+        self, after: Optional[Any] = None, limit: int = 100, **kwargs
+    ) -> List[BaseModel]:
+        """Keyset pagination over the objects matching the parameters,
+        ordered by primary key. Unlike OFFSET, the cost of a page does not
+        depend on how deep it is.
+
+        Args:
+            after: Primary key of the last object of the previous page, None
+                for the first page. A tuple of the primary key columns, in
+                their order, for composite primary keys.
+            limit: Maximum number of objects in the page.
+            parameters: List of parameters used to filter.
+        Returns:
+            page: Objects of the page, the next one starts after the last.
+        Raises:
+            ValueError: If after does not match the primary key columns.
+        """
+        primary_key = self._schema.__mapper__.primary_key
+        query = self.db.session.query(self._schema).filter_by(**kwargs)
+        if after is not None and len(primary_key) == 1:
+            query = query.filter(primary_key[0] > after)
+        elif after is not None:
+            if not isinstance(after, tuple) or len(after) != len(primary_key):
+                raise ValueError(
+                    f"after must be a tuple of {len(primary_key)} values, "
+                    f"the primary key of {self._schema.__name__}"
+                )
+            query = query.filter(tuple_(*primary_key) > tuple_(*after))
+        return query.order_by(*primary_key).limit(limit).all()
 
     def all(self) -> List[BaseModel]:
         return list(self.db.session.query(self._schema).all())
@@ -70,8 +135,7 @@ class DatabaseManager:
         self.db.session.commit()
 
     def contain(self, **kwargs) -> bool:
-        objects = self.db.session.query(self._schema).filter_by(**kwargs).all()
-        return len(objects) != 0
+        return self.exists(**kwargs)
 
     def __len__(self) -> int:
         return self.db.session.query(self._schema).count()
@@ -77,7 +77,7 @@ class FLController:
         Return:
             last_participation: Index of the last cycle assigned to this worker.
         """
-        process = process_manager.first(name=name, version=version)
+        process = process_manager.get_info(name=name, version=version)
         return cycle_manager.last_participation(process, worker_id)
 
     def assign(self, name: str, version: str, worker, last_participation: int):
@@ -93,13 +93,11 @@ class FLController:
         _accepted = False
 
         if version:
-            _fl_process = process_manager.first(name=name, version=version)
+            _fl_process = process_manager.get_info(name=name, version=version)
         else:
-            _fl_process = process_manager.last(name=name)
+            _fl_process = process_manager.get_info(name=name)
 
-        server_config, client_config = process_manager.get_configs(
-            name=name, version=version
-        )
+        server_config, client_config = process_manager.get_configs(id=_fl_process.id)
 
         # Retrieve the last cycle used by this fl process/ version
         _cycle = cycle_manager.last(_fl_process.id, None)
@@ -0,0 +1,212 @@
+# stdlib
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+
+# third party
+from gevent import get_hub
+from gevent.monkey import get_original
+from gevent.monkey import is_module_patched
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+import torch as th
+
+# grid relative
+from ..models.model_manager import ModelManager
+from ..syft_assets import plans
+from .cycle_aggregate import CycleAggregate
+from .fed_avg import average_diffs
+from .fed_avg import avg_dtype
+from .fed_avg import unflatten_params
+from .worker_cycle import WorkerCycle
+
+# Number of processes averaging cycles. With 0, cycles are averaged in the
+# thread completing them, which holds the GIL of the server meanwhile.
+AGGREGATION_PROCESSES = int(os.environ.get("AGGREGATION_PROCESSES", 0))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def apply_avg(
+    checkpoint: bytes,
+    diffs: Iterable[bytes],
+    avg_plan: Optional[Tuple[int, bytes]] = None,
+    iterative_plan: bool = False,
+    aggregate: Optional[bytes] = None,
+    num_diffs: int = 0,
+) -> bytes:
+    """Average the diffs of a cycle and subtract them from the model params.
+
+    Args:
+        checkpoint: Serialized model params of the current checkpoint.
+        diffs: Serialized diffs reported during the cycle, read one at a time.
+        avg_plan: Tuple (plan_id, serialized plan) of the hosted avg plan, None
+            for the hardcoded average.
+        iterative_plan: If the avg plan averages one diff at a time.
+        aggregate: Serialized running aggregate of the diffs, used instead of
+            diffs (see CycleManager._fold_diff).
+        num_diffs: Number of diffs folded into aggregate.
+    Returns:
+        params: Serialized updated model params.
+    """
+    model_params = ModelManager.unserialize_model_params(checkpoint)
+    logging.info("model params shapes: %s" % str([p.shape for p in model_params]))
+
+    params = (ModelManager.unserialize_model_params(diff) for diff in diffs)
+
+    if aggregate is not None:
+        logging.info("Using running aggregate of %d diffs" % num_diffs)
+        value = ModelManager.unserialize_model_params(aggregate)
+        if iterative_plan:
+            diff_avg = value
+        else:
+            # The types of the diffs are those of the params they update
+            diff_avg = unflatten_params(
+                value[0].div_(num_diffs),
+                [p.shape for p in model_params],
+                [avg_dtype(p.dtype) for p in model_params],
+            )
+
+    elif avg_plan is not None:
+        logging.info("Doing hosted avg plan")
+        plan = plans.load_plan(*avg_plan)
+
+        # diffs if list [diff1, diff2, ...] of len == received_diffs
+        # each diff is list [param1, param2, ...] of len == model params
+        # diff_avg is list [param1_avg, param2_avg, ...] of len == model params
+        if iterative_plan:
+            diff_avg = next(params)
+            for i, diff in enumerate(params):
+                diff_avg = plan(avg=list(diff_avg), item=diff, num=th.tensor([i + 1]))
+        else:
+            diff_avg = plan(list(params))
+
+    else:
+        # Fallback to simple hardcoded avg plan
+        logging.info("Doing hardcoded avg plan")
+        diff_avg = average_diffs(params)
+
+    logging.info("diff_avg shapes: %s" % str([d.shape for d in diff_avg]))
+
+    updated_params = [
+        model_param - diff_param
+        for model_param, diff_param in zip(model_params, diff_avg)
+    ]
+    return ModelManager.serialize_model_params(updated_params)
+
+
+def reported_diffs(session, cycle_id: int) -> Iterator[bytes]:
+    """Read the diffs reported during a cycle, one at a time."""
+    # The deferred diff column is selected alone, rather than loaded by one
+    # more query per report
+    reports = (
+        session.query(WorkerCycle.diff)
+        .filter_by(cycle_id=cycle_id, is_completed=True)
+        .yield_per(1)
+    )
+    for (diff,) in reports:
+        yield diff
+
+
+# Engine of the database, in aggregation worker processes
+_engine = None
+
+
+def _init_worker(database_url: str) -> None:
+    global _engine
+    _engine = create_engine(database_url)
+
+
+def _apply_avg_cycle(
+    cycle_id: int,
+    checkpoint: bytes,
+    avg_plan: Optional[Tuple[int, bytes]],
+    iterative_plan: bool,
+    use_aggregate: bool,
+) -> bytes:
+    """Run apply_avg in a worker process, reading the diffs or the running
+    aggregate of the cycle from the database."""
+    session = Session(bind=_engine)
+    try:
+        aggregate, num_diffs = None, 0
+        if use_aggregate:
+            aggregate, num_diffs = (
+                session.query(CycleAggregate.value, CycleAggregate.num_diffs)
+                .filter_by(cycle_id=cycle_id)
+                .one()
+            )
+        return apply_avg(
+            checkpoint=checkpoint,
+            diffs=reported_diffs(session, cycle_id),
+            avg_plan=avg_plan,
+            iterative_plan=iterative_plan,
+            aggregate=aggregate,
+            num_diffs=num_diffs,
+        )
+    finally:
+        session.close()
+
+
+def get_pool(database_url: str) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Workers are spawned, forking the gevent server is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=AGGREGATION_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(database_url,),
+            )
+    return _pool
+
+
+def _wait(future: Future) -> bytes:
+    if is_module_patched("threading"):
+        # Wait in a thread of the gevent threadpool, on an unpatched event,
+        # so that the hub keeps serving requests meanwhile
+        done = get_original("threading", "Event")()
+        future.add_done_callback(lambda _: done.set())
+        get_hub().threadpool.apply(done.wait)
+    return future.result()
+
+
+def apply_avg_in_pool(
+    database_url: str,
+    cycle_id: int,
+    checkpoint: bytes,
+    avg_plan: Optional[Tuple[int, bytes]] = None,
+    iterative_plan: bool = False,
+    use_aggregate: bool = False,
+) -> bytes:
+    """Run apply_avg in the aggregation process pool.
+
+    The worker process reads the diffs, or the running aggregate, of the
+    cycle from the database itself, so that they never go through the
+    server process. The database must then be reachable from other
+    processes, which rules out in-memory SQLite.
+
+    Args:
+        database_url: URL of the database, used by the worker processes.
+        cycle_id: ID of the cycle whose diffs are averaged.
+        checkpoint: Serialized model params of the current checkpoint.
+        avg_plan: Tuple (plan_id, serialized plan) of the hosted avg plan, None
+            for the hardcoded average.
+        iterative_plan: If the avg plan averages one diff at a time.
+        use_aggregate: If the running aggregate of the cycle is averaged
+            rather than its diffs.
+    Returns:
+        params: Serialized updated model params.
+    """
+    future = get_pool(database_url).submit(
+        _apply_avg_cycle, cycle_id, checkpoint, avg_plan, iterative_plan, use_aggregate
+    )
+    return _wait(future)
@@ -0,0 +1,28 @@
+# grid relative
+from ...database import BaseModel
+from ...database import db
+
+
+class CycleAggregate(BaseModel):
+    """Running aggregate of the diffs reported during a cycle.
+
+    Columns:
+        cycle_id (Integer, ForeignKey, Primary Key): Cycle whose diffs are aggregated.
+        num_diffs (Integer): Number of diffs folded into the aggregate.
+        iterative_plan (Boolean): If value is the running output of an iterative avg plan, rather than the flat sum of the diffs.
+        value (LargeBinary): Serialized model params holding the running sum or average.
+        is_closed (Boolean): If the cycle is closing, diffs reported since then are not folded.
+    """
+
+    __tablename__ = "model_centric_cycle_aggregate"
+
+    cycle_id = db.Column(
+        db.Integer, db.ForeignKey("model_centric_cycle.id"), primary_key=True
+    )
+    num_diffs = db.Column(db.Integer, default=0)
+    iterative_plan = db.Column(db.Boolean, default=False)
+    value = db.deferred(db.Column(db.LargeBinary))
+    is_closed = db.Column(db.Boolean, default=False)
+
+    def __str__(self):
+        return f"<CycleAggregate cycle: {self.cycle_id}, num_diffs: {self.num_diffs}, iterative_plan: {self.iterative_plan}>"
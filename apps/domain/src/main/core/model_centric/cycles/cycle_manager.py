@@ -1,22 +1,32 @@
 # stdlib
+from collections import defaultdict
 from datetime import datetime
 from datetime import timedelta
-from functools import reduce
 import json
 import logging
+import threading
 
 # third party
+from sqlalchemy import func
 import torch as th
 
 # grid relative
+from ....utils.executor import aggregation_executor
 from ...exceptions import CycleNotFoundError
 from ...manager.database_manager import DatabaseManager
 from ..models import model_manager
 from ..processes import process_manager
-from ..syft_assets import PlanManager
+from ..syft_assets import plans
+from ..tasks.cycle import compact_checkpoints
 from ..tasks.cycle import complete_cycle
 from ..tasks.cycle import run_task_once
+from .averaging import AGGREGATION_PROCESSES
+from .averaging import apply_avg
+from .averaging import apply_avg_in_pool
+from .averaging import reported_diffs
 from .cycle import Cycle
+from .cycle_aggregate import CycleAggregate
+from .fed_avg import add_diff
 from .worker_cycle import WorkerCycle
 
 
@@ -36,12 +46,27 @@ class _CycleManager(DatabaseManager):
         self.db = database
 
 
+class CycleAggregateManager(DatabaseManager):
+    schema = CycleAggregate
+
+    def __init__(self, database):
+        self._schema = CycleAggregateManager.schema
+        self.db = database
+
+
+# Folding a diff into the aggregate of a cycle, and closing the aggregate,
+# must not interleave. The aggregate row is locked for that across workers,
+# these locks cover databases without row locks, such as SQLite.
+_cycle_locks = defaultdict(threading.Lock)
+
+
 class CycleManager(DatabaseManager):
     def __init__(self, database):
         self.db = database
 
         self._cycles = _CycleManager(database)
         self._worker_cycles = WorkerCycleManager(database)
+        self._aggregates = CycleAggregateManager(database)
 
     def create(self, fl_process_id: int, version: str, cycle_time: int):
         """Create a new federated learning cycle.
@@ -56,8 +81,8 @@ class CycleManager(DatabaseManager):
         _new_cycle = None
 
         # Retrieve a list of cycles using the same model_id/version
-        sequence_number = len(
-            self._cycles.query(fl_process_id=fl_process_id, version=version)
+        sequence_number = self._cycles.count(
+            fl_process_id=fl_process_id, version=version
         )
         _now = datetime.now()
         _end = _now + timedelta(seconds=cycle_time) if cycle_time is not None else None
@@ -68,6 +93,9 @@ class CycleManager(DatabaseManager):
             version=version,
             fl_process_id=fl_process_id,
         )
+        # Created along with the cycle, so that reporters always have a row
+        # to lock
+        self._aggregates.register(cycle_id=_new_cycle.id)
 
         return _new_cycle
 
@@ -80,20 +108,14 @@ class CycleManager(DatabaseManager):
         Returns:
             last_participation: last cycle.
         """
-        _cycles = self._cycles.query(fl_process_id=process.id)
-
-        last = 0
-        if not len(_cycles):
-            return last
-
-        for cycle in _cycles:
-            worker_cycle = self._worker_cycles.first(
-                cycle_id=cycle.id, worker_id=worker_id
-            )
-            if worker_cycle and cycle.sequence > last:
-                last = cycle.sequence
-
-        return last
+        last = (
+            self.db.session.query(func.max(Cycle.sequence))
+            .join(WorkerCycle, WorkerCycle.cycle_id == Cycle.id)
+            .filter(Cycle.fl_process_id == process.id)
+            .filter(WorkerCycle.worker_id == worker_id)
+            .scalar()
+        )
+        return last or 0
 
     def last(self, fl_process_id: int, version: str = None):
         """Retrieve the last not completed registered cycle.
@@ -133,7 +155,7 @@ class CycleManager(DatabaseManager):
         Returns:
             result : Boolean Flag.
         """
-        return self._worker_cycles.first(worker_id=worker_id, cycle_id=cycle_id) != None
+        return self._worker_cycles.exists(worker_id=worker_id, cycle_id=cycle_id)
 
     def assign(self, worker, cycle, hash_key: str):
         _worker_cycle = self._worker_cycles.register(
@@ -164,7 +186,7 @@ class CycleManager(DatabaseManager):
         return _worker_cycle.request_key == request_key
 
     def count(self, **kwargs):
-        return len(self._cycles)
+        return self._cycles.count(**kwargs)
 
     def submit_worker_diff(self, worker_id: str, request_key: str, diff: bytes):
         """Submit reported diff
@@ -184,20 +206,120 @@ class CycleManager(DatabaseManager):
         if not _worker_cycle:
             raise ProcessLookupError
 
-        logging.info(f"Updating worker cycle: {str(_worker_cycle)}")
+        if _worker_cycle.is_completed:
+            # A diff can't be taken out of the aggregate, so the first one
+            # reported is the one averaged, whether it was folded or not
+            logging.warning("Worker cycle already reported a diff")
+            return
 
-        _worker_cycle.is_completed = True
-        _worker_cycle.completed_at = datetime.utcnow()
-        _worker_cycle.diff = diff
+        logging.info(f"Updating worker cycle: {str(_worker_cycle)}")
 
-        self._worker_cycles.db.session.commit()
+        cycle = _worker_cycle.cycle
+        server_config, _ = process_manager.get_configs(id=cycle.fl_process_id)
+        if server_config.get("incremental_avg", False):
+            if not self._fold_report(server_config, cycle, _worker_cycle, diff):
+                return
+        else:
+            self._record_report(_worker_cycle, diff)
+            self._worker_cycles.db.session.commit()
 
         # Run cycle end task async to we don't block report request
         # (for prod we probably should be replace this with Redis queue + separate worker)
-        run_task_once("complete_cycle", complete_cycle, self, _worker_cycle.cycle_id)
+        run_task_once(
+            f"complete_cycle_{_worker_cycle.cycle_id}",
+            complete_cycle,
+            self,
+            _worker_cycle.cycle_id,
+            task_executor=aggregation_executor,
+        )
+
+    @staticmethod
+    def _record_report(worker_cycle, diff: bytes):
+        worker_cycle.is_completed = True
+        worker_cycle.completed_at = datetime.utcnow()
+        worker_cycle.diff = diff
+
+    def _lock_aggregate(self, cycle_id: int):
+        """Load the aggregate of a cycle, locked until the transaction ends.
+
+        Returns:
+            aggregate: CycleAggregate, None for cycles created without one.
+        """
+        return (
+            self._aggregates.db.session.query(CycleAggregate)
+            .filter_by(cycle_id=cycle_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+
+    def _fold_report(self, server_config: dict, cycle, worker_cycle, diff: bytes):
+        """Record a report and fold its diff into the aggregate of the cycle,
+        in one transaction.
+
+        Reports of a cycle wait for each other and are folded one at a time.
+        Once the cycle is closing, diffs are only recorded.
+
+        Returns:
+            recorded: False if the worker reported a diff concurrently.
+        """
+        with _cycle_locks[cycle.id]:
+            aggregate = self._lock_aggregate(cycle.id)
+            self._worker_cycles.db.session.refresh(worker_cycle)
+            if worker_cycle.is_completed:
+                self._worker_cycles.db.session.rollback()
+                logging.warning("Worker cycle already reported a diff")
+                return False
+
+            if aggregate is not None and not aggregate.is_closed:
+                self._fold_diff(server_config, cycle.fl_process_id, aggregate, diff)
+            self._record_report(worker_cycle, diff)
+            self._worker_cycles.db.session.commit()
+        return True
+
+    def _fold_diff(
+        self, server_config: dict, fl_process_id: int, aggregate, diff: bytes
+    ):
+        """Fold a reported diff into the running aggregate of its cycle, so
+        that closing the cycle does not depend on the number of diffs.
+
+        With the hardcoded avg plan the aggregate is the flat sum of the
+        diffs, with an iterative hosted avg plan it is the plan's running
+        output. Hosted avg plans taking all diffs at once are left to
+        _average_plan_diffs.
+        """
+        avg_plan = plans.load_avg_plan(fl_process_id)
+        iterative_plan = avg_plan is not None
+        if iterative_plan and not server_config.get("iterative_plan", False):
+            return
+
+        params = model_manager.unserialize_model_params(diff)
+        if aggregate.num_diffs == 0:
+            aggregate.iterative_plan = iterative_plan
+            value = None
+        else:
+            value = model_manager.unserialize_model_params(aggregate.value)
+
+        if not iterative_plan:
+            value = [add_diff(value[0] if value else None, params)]
+        elif value is None:
+            value = params
+        else:
+            value = plans.load_plan(*avg_plan)(
+                avg=list(value), item=params, num=th.tensor([aggregate.num_diffs])
+            )
+
+        aggregate.value = model_manager.serialize_model_params(value)
+        aggregate.num_diffs += 1
+        logging.info("Folded diff into aggregate: %s" % str(aggregate))
 
     def complete_cycle(self, cycle_id: int):
         """Checks if the cycle is completed and runs plan avg."""
+        self._complete_cycle(cycle_id)
+        if self._cycles.contain(id=cycle_id, is_completed=True):
+            _cycle_locks.pop(cycle_id, None)
+
+    def _complete_cycle(self, cycle_id: int):
         logging.info("running complete_cycle for cycle_id: %s" % cycle_id)
         cycle = self._cycles.first(id=cycle_id)
         logging.info("found cycle: %s" % str(cycle))
@@ -209,9 +331,7 @@ class CycleManager(DatabaseManager):
         server_config, _ = process_manager.get_configs(id=cycle.fl_process_id)
         logging.info("server_config: %s" % json.dumps(server_config, indent=2))
 
-        received_diffs = len(
-            self._worker_cycles.query(cycle_id=cycle_id, is_completed=True)
-        )
+        received_diffs = self._worker_cycles.count(cycle_id=cycle_id, is_completed=True)
         logging.info("# of diffs: %d" % received_diffs)
 
         min_diffs = server_config.get("min_diffs", None)
@@ -237,6 +357,10 @@ class CycleManager(DatabaseManager):
         if ready_to_average and no_protocol:
             self._average_plan_diffs(server_config, cycle)
 
+    def _reported_diffs(self, cycle_id: int):
+        """Read the diffs reported during a cycle, one at a time."""
+        return reported_diffs(self._worker_cycles.db.session, cycle_id)
+
     def _average_plan_diffs(self, server_config: dict, cycle):
         """skeleton code Plan only.
 
@@ -244,7 +368,7 @@ class CycleManager(DatabaseManager):
         - track how many has reported successfully
         - get diffs: list of (worker_id, diff_from_this_worker) on cycle._diffs
         - check if we have enough diffs? vs. max_worker
-        - if enough diffs => average every param (by turning tensors into python matrices => reduce th.add => torch.div by number of diffs)
+        - if enough diffs => average every param (by accumulating the flattened diffs into one buffer => divide by number of diffs)
         - save as new model value => M_prime (save params new values)
         - create new cycle & new checkpoint
         at this point new workers can join because a cycle for a model exists
@@ -258,81 +382,84 @@ class CycleManager(DatabaseManager):
         logging.info("model id: %d" % model_id)
         _checkpoint = model_manager.load(model_id=model_id)
         logging.info("current checkpoint: %s" % str(_checkpoint))
-        model_params = model_manager.unserialize_model_params(_checkpoint.value)
-        logging.info("model params shapes: %s" % str([p.shape for p in model_params]))
 
-        reports_to_average = self._worker_cycles.query(
-            cycle_id=cycle.id, is_completed=True
+        # Closed, the aggregate holds every diff folded so far, later reports
+        # are only recorded. Reporters aren't kept waiting while averaging.
+        with _cycle_locks[cycle.id]:
+            aggregate = self._lock_aggregate(cycle.id)
+            if aggregate is not None:
+                aggregate.is_closed = True
+            received_diffs = self._worker_cycles.count(
+                cycle_id=cycle.id, is_completed=True
+            )
+            self._aggregates.db.session.commit()
+
+        # Usable if every diff was folded, which is not the case if
+        # incremental_avg was turned on during the cycle
+        use_aggregate = (
+            aggregate is not None
+            and aggregate.num_diffs > 0
+            and aggregate.num_diffs == received_diffs
         )
 
-        diffs = [
-            model_manager.unserialize_model_params(report.diff)
-            for report in reports_to_average
-        ]
-
-        avg_plan_rec = process_manager.get_plan(
-            fl_process_id=cycle.fl_process_id, is_avg_plan=True
+        checkpoint = model_manager.load_value(_checkpoint)
+        avg_plan = plans.load_avg_plan(cycle.fl_process_id)
+        iterative_plan = (
+            aggregate.iterative_plan
+            if use_aggregate
+            else server_config.get("iterative_plan", False)
         )
-
-        if avg_plan_rec and avg_plan_rec.value:
-            logging.info("Doing hosted avg plan")
-            avg_plan = PlanManager.deserialize_plan(avg_plan_rec.value)
-
-            # check if the uploaded avg plan is iterative or not
-            iterative_plan = server_config.get("iterative_plan", False)
-
-            # diffs if list [diff1, diff2, ...] of len == received_diffs
-            # each diff is list [param1, param2, ...] of len == model params
-            # diff_avg is list [param1_avg, param2_avg, ...] of len == model params
-            if iterative_plan:
-                diff_avg = diffs[0]
-                for i, diff in enumerate(diffs[1:]):
-                    diff_avg = avg_plan(
-                        avg=list(diff_avg), item=diff, num=th.tensor([i + 1])
-                    )
-            else:
-                diff_avg = avg_plan(diffs)
-
+        if AGGREGATION_PROCESSES:
+            logging.info("Averaging in the aggregation process pool")
+            serialized_params = apply_avg_in_pool(
+                self.db.engine.url.render_as_string(hide_password=False),
+                cycle.id,
+                checkpoint,
+                avg_plan=avg_plan,
+                iterative_plan=iterative_plan,
+                use_aggregate=use_aggregate,
+            )
         else:
-            # Fallback to simple hardcoded avg plan
-            logging.info("Doing hardcoded avg plan")
-            raw_diffs = [
-                [diff[model_param] for diff in diffs]
-                for model_param in range(len(model_params))
-            ]
-            # raw_diffs is [param1_diffs, param2_diffs, ...] with len == num of model params
-            # each param1_diffs is [ diff1, diff2, ... ] with len == num of received_diffs
-            # diff_avg going to be [ param1_diffs_avg, param2_diffs_avg, ...] with len == num of model params
-            # where param1_diffs_avg is avg of tensors in param1_diffs
-            logging.info("raw diffs lengths: %s" % str([len(row) for row in raw_diffs]))
-            logging.info("raw diffs lengths: %s" % str([len(row) for row in raw_diffs]))
-            sums = [reduce(th.add, param) for param in raw_diffs]
-            logging.info("sums shapes: %s" % str([sum.shape for sum in sums]))
-            diff_avg = [th.div(param, len(diffs)) for param in sums]
-
-        logging.info("diff_avg shapes: %s" % str([d.shape for d in diff_avg]))
-
-        _updated_model_params = [
-            model_param - diff_param
-            for model_param, diff_param in zip(model_params, diff_avg)
-        ]
-
-        logging.info(
-            "_updated_model_params shapes: %s"
-            % str([p.shape for p in _updated_model_params])
-        )
+            serialized_params = apply_avg(
+                checkpoint=checkpoint,
+                # Diffs are read lazily, the hardcoded avg plan needs one at a
+                # time
+                diffs=self._reported_diffs(cycle.id),
+                avg_plan=avg_plan,
+                iterative_plan=iterative_plan,
+                aggregate=aggregate.value if use_aggregate else None,
+                num_diffs=aggregate.num_diffs if use_aggregate else 0,
+            )
 
         # make new checkpoint
-        serialized_params = model_manager.serialize_model_params(_updated_model_params)
-        _new_checkpoint = model_manager.save(model_id, serialized_params)
+        _new_checkpoint = model_manager.save(
+            model_id,
+            serialized_params,
+            keyframe_interval=server_config.get("checkpoint_keyframe_interval", 0),
+        )
         logging.info("new checkpoint: %s" % str(_new_checkpoint))
 
+        # Drop the checkpoints left out by the retention policy, off the
+        # path of cycle completion
+        keep_latest = server_config.get("checkpoints_keep_latest", 0)
+        if keep_latest:
+            run_task_once(
+                f"compact_checkpoints_{model_id}",
+                compact_checkpoints,
+                model_manager,
+                model_id,
+                keep_latest,
+                server_config.get("checkpoints_keep_every", 0),
+            )
+
         # mark current cycle completed
         cycle.is_completed = True
+        if aggregate is not None:
+            self._aggregates.db.session.delete(aggregate)
         self._cycles.db.session.commit()
 
-        completed_cycles_num = len(
-            self._cycles.query(fl_process_id=cycle.fl_process_id, is_completed=True)
+        completed_cycles_num = self._cycles.count(
+            fl_process_id=cycle.fl_process_id, is_completed=True
         )
         logging.info("completed_cycles_num: %d" % completed_cycles_num)
         max_cycles = server_config.get("num_cycles", 0)
@@ -0,0 +1,94 @@
+# stdlib
+from functools import reduce
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+# third party
+import torch as th
+
+
+def flat_dtype(params: List[th.Tensor]) -> th.dtype:
+    """Floating point type able to hold every one of params."""
+    return avg_dtype(reduce(th.promote_types, [param.dtype for param in params]))
+
+
+def avg_dtype(dtype: th.dtype) -> th.dtype:
+    """Type of the average of params of type dtype: floating point types are
+    kept, others average to the default floating point type, as with th.div."""
+    return dtype if dtype.is_floating_point else th.get_default_dtype()
+
+
+def flatten_params(
+    params: List[th.Tensor], dtype: th.dtype, out: Optional[th.Tensor] = None
+) -> th.Tensor:
+    """Copy params into a single contiguous 1-d buffer, reusing out if given."""
+    flat = [param.reshape(-1).to(dtype) for param in params]
+    if out is None:
+        return th.cat(flat)
+    return th.cat(flat, out=out)
+
+
+def unflatten_params(
+    flat: th.Tensor, shapes: List[th.Size], dtypes: Optional[List[th.dtype]] = None
+) -> List[th.Tensor]:
+    """Split a flat buffer back into views shaped like the parameters.
+
+    Args:
+        flat: Flat buffer, in the promoted type of the parameters.
+        shapes: Shapes of the parameters.
+        dtypes: If set, types the parameters are cast back to, slices
+            already of their type are left as views.
+    """
+    numels = [th.Size(shape).numel() for shape in shapes]
+    params = [view.view(shape) for view, shape in zip(flat.split(numels), shapes)]
+    if dtypes is None:
+        return params
+    return [param.to(dtype) for param, dtype in zip(params, dtypes)]
+
+
+def average_diffs(diffs: Iterable[List[th.Tensor]]) -> List[th.Tensor]:
+    """Average the diffs reported by workers, parameter by parameter.
+
+    Each diff is flattened into a reused buffer and added in place to a flat
+    running sum, so a diff costs a few kernels whatever its number of
+    parameters, and diffs can be deserialized one at a time.
+
+    Args:
+        diffs: Diffs [param1, param2, ...] with the shapes of the model params.
+    Returns:
+        diff_avg: Averages [param1_avg, param2_avg, ...] in the average type
+            of each param (see avg_dtype), views of one buffer unless cast.
+    Raises:
+        ValueError: If there is no diff, or diffs differ in shapes.
+    """
+    total = scratch = shapes = dtypes = None
+    count = 0
+    for diff in diffs:
+        if total is None:
+            shapes = [param.shape for param in diff]
+            dtypes = [avg_dtype(param.dtype) for param in diff]
+            total = flatten_params(diff, flat_dtype(diff))
+            scratch = th.empty_like(total)
+        elif [param.shape for param in diff] != shapes:
+            raise ValueError("Diff shapes do not match the first diff!")
+        else:
+            total.add_(flatten_params(diff, total.dtype, out=scratch))
+        count += 1
+
+    if total is None:
+        raise ValueError("No diff to average!")
+    return unflatten_params(total.div_(count), shapes, dtypes)
+
+
+def add_diff(flat_sum: Optional[th.Tensor], diff: List[th.Tensor]) -> th.Tensor:
+    """Fold a diff into a flat running sum, starting one if flat_sum is None.
+
+    Raises:
+        ValueError: If diff does not have as many values as flat_sum.
+    """
+    if flat_sum is None:
+        return flatten_params(diff, flat_dtype(diff))
+    if sum(param.numel() for param in diff) != flat_sum.numel():
+        raise ValueError("Diff size does not match the running sum!")
+    return flat_sum.add_(flatten_params(diff, flat_sum.dtype))
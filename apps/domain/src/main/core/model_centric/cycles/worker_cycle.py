@@ -25,7 +25,7 @@ class WorkerCycle(BaseModel):
     started_at = db.Column(db.DateTime(), default=datetime.datetime.utcnow())
     is_completed = db.Column(db.Boolean(), default=False)
     completed_at = db.Column(db.DateTime())
-    diff = db.Column(db.LargeBinary)
+    diff = db.deferred(db.Column(db.LargeBinary))
 
     def __str__(self):
         return f"<WorkerCycle id: {self.id}, cycle: {self.cycle_id}, worker: {self.worker_id}, is_completed: {self.is_completed}>"
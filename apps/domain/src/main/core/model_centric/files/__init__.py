@@ -0,0 +1,5 @@
+# grid relative
+from ...database import db
+from .asset_file_manager import AssetFileManager
+
+asset_files = AssetFileManager(db)
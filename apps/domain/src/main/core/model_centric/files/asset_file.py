@@ -0,0 +1,26 @@
+# grid relative
+from ...database import BaseModel
+from ...database import db
+
+
+class AssetFile(BaseModel):
+    """File holding the value of a checkpoint, plan or protocol.
+
+    Columns:
+        kind (String, Primary Key): "checkpoint", "plan" or "protocol".
+        ref_id (Integer, Primary Key): ID of the checkpoint, plan or protocol.
+        format (String, Primary Key): Format of the value, empty for checkpoints.
+        digest (String): SHA256 of the value, naming its file.
+        size (BigInteger): Size of the value in bytes.
+    """
+
+    __tablename__ = "model_centric_asset_file"
+
+    kind = db.Column(db.String(64), primary_key=True)
+    ref_id = db.Column(db.Integer, primary_key=True)
+    format = db.Column(db.String(64), primary_key=True, default="")
+    digest = db.Column(db.String(64))
+    size = db.Column(db.BigInteger)
+
+    def __str__(self):
+        return f"<AssetFile kind: {self.kind}, ref_id: {self.ref_id}, format: {self.format}, digest: {self.digest}>"
@@ -0,0 +1,185 @@
+# stdlib
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# third party
+from sqlalchemy.exc import IntegrityError
+
+# grid relative
+from ...manager.database_manager import DatabaseManager
+from .asset_file import AssetFile
+
+# Directory holding the values of checkpoints, plans and protocols as files
+# named by their SHA256, sent without reading the database. The files are
+# disabled when unset.
+ASSET_FILES_DIR = os.environ.get("ASSET_FILES_DIR", None)
+
+# Internal location under which a nginx front proxy serves ASSET_FILES_DIR.
+# When set, files are sent by nginx through X-Accel-Redirect.
+ASSET_FILES_ACCEL_LOCATION = os.environ.get("ASSET_FILES_ACCEL_LOCATION", None)
+
+
+class AssetFileManager(DatabaseManager):
+    schema = AssetFile
+
+    def __init__(
+        self,
+        database,
+        directory: Optional[str] = ASSET_FILES_DIR,
+        accel_location: Optional[str] = ASSET_FILES_ACCEL_LOCATION,
+    ):
+        self._schema = AssetFileManager.schema
+        self.db = database
+        self.directory = directory
+        self.accel_location = accel_location
+        # Digests by (kind, ref_id, format). The value of an asset never
+        # changes, entries are only dropped when assets are released.
+        self._digests: Dict[Tuple[str, int, str], str] = {}
+        self._lock = threading.Lock()
+
+    def _file_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def store(
+        self, kind: str, ref_id: int, value: Optional[bytes], format: str = ""
+    ) -> Optional[str]:
+        """Write the value of an asset to the file named by its digest, unless
+        an identical value was written before.
+
+        Files only spare database reads, failing to write one is logged and
+        the asset is sent from the database.
+
+        Returns:
+            path: Path of the file, None if files are disabled, value is None
+                or the file could not be written.
+        """
+        if not self.directory or value is None:
+            return None
+
+        digest = hashlib.sha256(value).hexdigest()
+        path = self._file_path(digest)
+        try:
+            self._write_file(path, value)
+        except OSError:
+            logging.exception(f"Failed to write the file of {kind} {ref_id}")
+            return None
+
+        try:
+            self.db.session.merge(
+                AssetFile(
+                    kind=kind,
+                    ref_id=ref_id,
+                    format=format,
+                    digest=digest,
+                    size=len(value),
+                )
+            )
+            self.db.session.commit()
+        except IntegrityError:
+            # Stored concurrently by another process, with the same value
+            self.db.session.rollback()
+
+        with self._lock:
+            self._digests[(kind, ref_id, format)] = digest
+        return path
+
+    @staticmethod
+    def _write_file(path: str, value: bytes) -> None:
+        if os.path.exists(path):
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(value)
+            # Readers never see a partially written file
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def path(
+        self,
+        kind: str,
+        ref_id: int,
+        load: Callable[[], Optional[bytes]],
+        format: str = "",
+    ) -> Optional[str]:
+        """Path of the file of an asset, written from load() if it is missing,
+        e.g. for assets stored before files were enabled.
+
+        Returns:
+            path: Path of the file, None if files are disabled or the asset
+                has no value.
+        """
+        if not self.directory:
+            return None
+
+        key = (kind, ref_id, format)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = (
+                self.db.session.query(AssetFile.digest)
+                .filter_by(kind=kind, ref_id=ref_id, format=format)
+                .scalar()
+            )
+
+        if digest is not None and os.path.exists(self._file_path(digest)):
+            with self._lock:
+                self._digests[key] = digest
+            return self._file_path(digest)
+        return self.store(kind, ref_id, load(), format)
+
+    def accel_uri(self, path: str) -> Optional[str]:
+        """URI of a file in the internal location of the front proxy, None if
+        files are sent by the server."""
+        if not self.accel_location:
+            return None
+        relative_path = os.path.relpath(path, self.directory)
+        return f"{self.accel_location.rstrip('/')}/{relative_path}"
+
+    def release(self, kind: str, ref_ids: Iterable[int]) -> List[str]:
+        """Forget the files of deleted assets.
+
+        Args:
+            kind: Kind of the assets.
+            ref_ids: IDs of the assets, or a query selecting them.
+        Returns:
+            paths: Files no other asset uses anymore, to be removed with
+                remove_files once the transaction is committed.
+        """
+        rows = self.db.session.query(AssetFile).filter(
+            AssetFile.kind == kind, AssetFile.ref_id.in_(ref_ids)
+        )
+        digests = {digest for (digest,) in rows.with_entities(AssetFile.digest)}
+        if not digests:
+            return []
+
+        rows.delete(synchronize_session=False)
+        with self._lock:
+            self._digests.clear()
+
+        used = {
+            digest
+            for (digest,) in self.db.session.query(AssetFile.digest).filter(
+                AssetFile.digest.in_(digests)
+            )
+        }
+        return [self._file_path(digest) for digest in digests - used]
+
+    @staticmethod
+    def remove_files(paths: List[str]) -> None:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
@@ -34,14 +34,14 @@ class ModelCheckPoint(BaseModel):
 
     Columns:
         id (Integer, Primary Key): Checkpoint ID.
-        value (Binary): Value of the model at a given checkpoint.
+        value (Binary): Value of the model at a given checkpoint, empty if delta encoded (see ModelCheckPointDelta).
         model_id (String, Foreign Key): Model's ID.
     """
 
     __tablename__ = "model_centric_model_checkpoint"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    value = db.Column(db.LargeBinary)
+    value = db.deferred(db.Column(db.LargeBinary))
     number = db.Column(db.Integer)
     alias = db.Column(db.String(255))
     model_id = db.Column(db.Integer, db.ForeignKey("model_centric_model.id"))
@@ -56,3 +56,27 @@ class ModelCheckPoint(BaseModel):
 
     def __str__(self):
         return f"<CheckPoint id: {self.id}, number: {self.number}, alias: {self.alias}, model_id: {self.model_id}>"
+
+
+class ModelCheckPointDelta(BaseModel):
+    """Checkpoint stored as its difference with the previous one, whose own
+    value is left empty.
+
+    Columns:
+        checkpoint_id (Integer, Primary Key, Foreign Key): Delta encoded checkpoint.
+        base_id (Integer, Foreign Key): Checkpoint the delta applies to.
+        codec (String): Codec compressing the delta.
+        value (Binary): Compressed delta.
+    """
+
+    __tablename__ = "model_centric_model_checkpoint_delta"
+
+    checkpoint_id = db.Column(
+        db.Integer, db.ForeignKey("model_centric_model_checkpoint.id"), primary_key=True
+    )
+    base_id = db.Column(db.Integer, db.ForeignKey("model_centric_model_checkpoint.id"))
+    codec = db.Column(db.String(64))
+    value = db.deferred(db.Column(db.LargeBinary))
+
+    def __str__(self):
+        return f"<CheckPointDelta checkpoint_id: {self.checkpoint_id}, base_id: {self.base_id}, codec: {self.codec}>"
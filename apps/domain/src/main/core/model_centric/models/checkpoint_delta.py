@@ -0,0 +1,88 @@
+# stdlib
+from typing import List
+from typing import Optional
+
+# third party
+import numpy as np
+import torch as th
+
+# grid relative
+from ...database.bin_storage.bin_obj import FAST_CODEC
+from ...database.bin_storage.bin_obj import codecs
+from ...database.bin_storage.mmap_file import as_array
+from ...database.bin_storage.native_format import pack
+from ...database.bin_storage.native_format import read_array
+from ...database.bin_storage.native_format import unpack
+
+
+def _arrays(params: List[th.Tensor]) -> Optional[List[np.ndarray]]:
+    arrays = [as_array(param) for param in params]
+    if any(array is None for array in arrays):
+        return None
+    return [np.require(array, requirements="C") for array in arrays]
+
+
+def _bytes(array: np.ndarray) -> np.ndarray:
+    return array.reshape(-1).view(np.uint8)
+
+
+def encode_delta(
+    base: List[th.Tensor], params: List[th.Tensor], codec: str = FAST_CODEC
+) -> Optional[bytes]:
+    """Encode params as their difference with base.
+
+    The difference is the XOR of the raw values, so that decoding gives back
+    the exact params. Close values share their sign, exponent and leading
+    mantissa bits, which XOR to zeros; the bytes of the values are grouped
+    by significance so those zeros form long runs for the codec.
+
+    Returns:
+        delta: Compressed delta, or None if params do not have the dtypes and
+            shapes of base, or are not dense arrays.
+    """
+    base_arrays, arrays = _arrays(base), _arrays(params)
+    if (
+        base_arrays is None
+        or arrays is None
+        or len(base_arrays) != len(arrays)
+        or any(
+            b.dtype != a.dtype or b.shape != a.shape
+            for b, a in zip(base_arrays, arrays)
+        )
+    ):
+        return None
+
+    planes = []
+    for b, a in zip(base_arrays, arrays):
+        bits = np.bitwise_xor(_bytes(b), _bytes(a))
+        planes.append(np.ascontiguousarray(bits.reshape(-1, a.itemsize).T))
+
+    header = {
+        "dtypes": [array.dtype.str for array in arrays],
+        "shapes": [list(array.shape) for array in arrays],
+    }
+    return codecs[codec].compress(bytes(pack(header, planes)))
+
+
+def decode_delta(
+    base: List[th.Tensor], delta: bytes, codec: str = FAST_CODEC
+) -> List[th.Tensor]:
+    """Apply a delta from encode_delta to the params it was computed from.
+
+    Raises:
+        ValueError: If base does not match the params the delta encodes.
+    """
+    header, buffer, offset = unpack(codecs[codec].decompress(delta))
+    base_arrays = _arrays(base)
+    if base_arrays is None or len(base_arrays) != len(header["dtypes"]):
+        raise ValueError("Delta does not apply to the base checkpoint!")
+
+    params = []
+    for b, dtype, shape in zip(base_arrays, header["dtypes"], header["shapes"]):
+        dtype = np.dtype(dtype)
+        if b.dtype != dtype or list(b.shape) != shape:
+            raise ValueError("Delta does not apply to the base checkpoint!")
+        planes, offset = read_array(buffer, offset, "|u1", [dtype.itemsize, b.size])
+        bits = np.bitwise_xor(np.ascontiguousarray(planes.T).reshape(-1), _bytes(b))
+        params.append(th.from_numpy(bits.view(dtype).reshape(shape)))
+    return params
@@ -1,4 +1,12 @@
+# stdlib
+import os
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
 # third party
+from sqlalchemy import func
+from sqlalchemy import or_
 import syft as sy
 from syft import deserialize
 from syft import serialize
@@ -7,10 +15,27 @@ from syft.federated.model_serialization import wrap_model_params
 from syft.lib.python.list import List
 
 # grid relative
+from ...database.bin_storage.bin_obj import FAST_CODEC
+from ...database.store_cache import ObjectCache
 from ...exceptions import ModelNotFoundError
 from ...manager.database_manager import DatabaseManager
+from ..files import asset_files
 from ..models.ai_model import Model
 from ..models.ai_model import ModelCheckPoint
+from ..models.ai_model import ModelCheckPointDelta
+from .checkpoint_delta import decode_delta
+from .checkpoint_delta import encode_delta
+
+# Size in bytes of the cache of checkpoint values, disabled when 0.
+CHECKPOINT_CACHE_SIZE = int(os.environ.get("CHECKPOINT_CACHE_SIZE", 256 * 1024 * 1024))
+
+
+class CheckpointInfo(NamedTuple):
+    """Identity of a model checkpoint, safe to share across sessions."""
+
+    id: int
+    number: int
+    model_id: int
 
 
 class ModelCheckPointManager(DatabaseManager):
@@ -21,6 +46,28 @@ class ModelCheckPointManager(DatabaseManager):
         self._schema = ModelCheckPointManager.schema
         self.db = database
 
+    def last_number(self, model_id: int) -> int:
+        """Highest checkpoint number of a model, 0 if it has none.
+
+        Checkpoints may have been compacted away, so their count is not a
+        valid next number.
+        """
+        number = (
+            self.db.session.query(func.max(self._schema.number))
+            .filter_by(model_id=model_id)
+            .scalar()
+        )
+        return number or 0
+
+
+class ModelCheckPointDeltaManager(DatabaseManager):
+
+    schema = ModelCheckPointDelta
+
+    def __init__(self, database):
+        self._schema = ModelCheckPointDeltaManager.schema
+        self.db = database
+
 
 class _ModelManager(DatabaseManager):
 
@@ -36,39 +83,77 @@ class ModelManager(DatabaseManager):
         self.db = database
         self._models = _ModelManager(database)
         self._model_checkpoints = ModelCheckPointManager(database)
+        self._deltas = ModelCheckPointDeltaManager(database)
+        # Full values of checkpoints by id. A checkpoint's value never
+        # changes, delta encoded ones are only rewritten as the same value.
+        self.cache = ObjectCache(max_bytes=CHECKPOINT_CACHE_SIZE)
 
     def create(self, model, process):
         # Register new model
         _model_obj = self._models.register(flprocess=process)
 
         # Save model initial weights into ModelCheckpoint
-        self._model_checkpoints.register(
+        _checkpoint = self._model_checkpoints.register(
             value=model, model=_model_obj, number=1, alias="latest"
         )
+        asset_files.store("checkpoint", _checkpoint.id, model)
 
         return _model_obj
 
-    def save(self, model_id: int, data: bytes):
+    def save(self, model_id: int, data: bytes, keyframe_interval: int = 0):
         """Create a new model checkpoint.
 
+        With a keyframe_interval, checkpoints are stored as deltas against
+        the previous one, except every keyframe_interval-th one which is a
+        full snapshot bounding the deltas applied to rebuild a checkpoint.
+
         Args:
             model_id: Model ID.
             data: Model data.
+            keyframe_interval: Checkpoints between full snapshots, 0 or 1 to
+                store every checkpoint in full.
         Returns:
             model_checkpoint: ModelCheckpoint instance.
         """
 
-        checkpoints_count = len(self._model_checkpoints.query(model_id=model_id))
+        number = self._model_checkpoints.last_number(model_id) + 1
+
+        delta = None
+        base = self._model_checkpoints.last(model_id=model_id)
+        if keyframe_interval > 1 and base and (number - 1) % keyframe_interval:
+            delta = encode_delta(
+                self.unserialize_model_params(self.load_value(base)),
+                self.unserialize_model_params(data),
+            )
 
         # Reset "latest" alias
         self._model_checkpoints.modify(
             {"model_id": model_id, "alias": "latest"}, {"alias": ""}
         )
 
-        # Create new checkpoint
-        new_checkpoint = self._model_checkpoints.register(
-            model_id=model_id, value=data, number=checkpoints_count + 1, alias="latest"
+        # Create new checkpoint, along with its delta in the same transaction
+        new_checkpoint = ModelCheckPoint(
+            model_id=model_id,
+            value=data if delta is None else None,
+            number=number,
+            alias="latest",
         )
+        self.db.session.add(new_checkpoint)
+        if delta is not None:
+            self.db.session.flush()
+            self.db.session.add(
+                ModelCheckPointDelta(
+                    checkpoint_id=new_checkpoint.id,
+                    base_id=base.id,
+                    codec=FAST_CODEC,
+                    value=delta,
+                )
+            )
+        self.db.session.commit()
+
+        # The next checkpoint is encoded against this one
+        self.cache.put(new_checkpoint.id, data, len(data))
+        asset_files.store("checkpoint", new_checkpoint.id, data)
         return new_checkpoint
 
     def load(self, **kwargs):
@@ -80,6 +165,142 @@ class ModelManager(DatabaseManager):
 
         return _check_point
 
+    def load_info(self, **kwargs) -> CheckpointInfo:
+        """Load the identity of a model's Checkpoint, which load_value and
+        load_delta accept in place of the checkpoint."""
+        _check_point = self.load(**kwargs)
+        return CheckpointInfo(
+            _check_point.id, _check_point.number, _check_point.model_id
+        )
+
+    def load_value(self, checkpoint: ModelCheckPoint) -> bytes:
+        """Serialized model params of a checkpoint, rebuilt from the last
+        full snapshot before it if the checkpoint is delta encoded.
+
+        Raises:
+            ModelNotFoundError (PyGridError) : If a checkpoint of the chain is missing.
+        """
+        found, value = self.cache.get(checkpoint.id)
+        if found:
+            return value
+
+        # Walk back to a full snapshot or a cached value
+        deltas = []
+        checkpoint_id = checkpoint.id
+        while True:
+            found, base = self.cache.get(checkpoint_id)
+            if found:
+                break
+            base = (
+                self.db.session.query(ModelCheckPoint.value)
+                .filter_by(id=checkpoint_id)
+                .scalar()
+            )
+            if base is not None:
+                break
+            delta = self._deltas.first(checkpoint_id=checkpoint_id)
+            if delta is None:
+                raise ModelNotFoundError
+            deltas.append(delta)
+            checkpoint_id = delta.base_id
+
+        if deltas:
+            params = self.unserialize_model_params(base)
+            for delta in reversed(deltas):
+                params = decode_delta(params, delta.value, delta.codec)
+            value = self.serialize_model_params(params)
+        else:
+            value = base
+
+        self.cache.put(checkpoint.id, value, len(value))
+        return value
+
+    def load_delta(
+        self, checkpoint: ModelCheckPoint, base_number: int
+    ) -> Optional[Tuple[bytes, str]]:
+        """Delta turning the checkpoint numbered base_number into checkpoint,
+        for clients already holding the former.
+
+        The stored delta is used when base_number is the previous checkpoint,
+        others are encoded once and cached.
+
+        Returns:
+            result: Tuple (delta, codec), or None if the base checkpoint does
+                not exist or the params changed shapes since.
+        """
+        base = self._model_checkpoints.first(
+            model_id=checkpoint.model_id, number=base_number
+        )
+        if base is None or base.id == checkpoint.id:
+            return None
+
+        stored = self._deltas.first(checkpoint_id=checkpoint.id, base_id=base.id)
+        if stored is not None:
+            return stored.value, stored.codec
+
+        key = ("delta", checkpoint.id, base.id)
+        found, delta = self.cache.get(key)
+        if not found:
+            delta = encode_delta(
+                self.unserialize_model_params(self.load_value(base)),
+                self.unserialize_model_params(self.load_value(checkpoint)),
+            )
+            self.cache.put(key, delta, len(delta or b""))
+        return (delta, FAST_CODEC) if delta is not None else None
+
+    def compact(self, model_id: int, keep_latest: int, keep_every: int = 0) -> int:
+        """Delete the checkpoints of a model left out by its retention policy.
+
+        Checkpoints with an alias, the keep_latest most recent ones and, if
+        keep_every is set, those whose number is a multiple of keep_every
+        are kept. Rows are deleted in a single statement, without loading
+        their values. Kept delta encoded checkpoints whose base is deleted
+        are rewritten as full snapshots first.
+
+        Args:
+            model_id: Model ID.
+            keep_latest: Number of most recent checkpoints kept, 0 keeps all.
+            keep_every: Also keep every keep_every-th checkpoint, 0 for none.
+        Returns:
+            deleted: Number of deleted checkpoints.
+        """
+        if keep_latest <= 0:
+            return 0
+
+        schema = self._model_checkpoints.schema
+        query = self.db.session.query(schema).filter(
+            schema.model_id == model_id,
+            schema.number
+            <= self._model_checkpoints.last_number(model_id) - keep_latest,
+            or_(schema.alias.is_(None), schema.alias == ""),
+        )
+        if keep_every > 0:
+            query = query.filter(schema.number % keep_every != 0)
+        deleted_ids = query.with_entities(schema.id)
+
+        orphans = (
+            self.db.session.query(schema)
+            .join(ModelCheckPointDelta, ModelCheckPointDelta.checkpoint_id == schema.id)
+            .filter(ModelCheckPointDelta.base_id.in_(deleted_ids))
+            .filter(~schema.id.in_(deleted_ids))
+            .all()
+        )
+        for orphan in orphans:
+            orphan.value = self.load_value(orphan)
+        for orphan in orphans:
+            self.db.session.query(ModelCheckPointDelta).filter_by(
+                checkpoint_id=orphan.id
+            ).delete(synchronize_session=False)
+
+        self.db.session.query(ModelCheckPointDelta).filter(
+            ModelCheckPointDelta.checkpoint_id.in_(deleted_ids)
+        ).delete(synchronize_session=False)
+        paths = asset_files.release("checkpoint", deleted_ids)
+        deleted = query.delete(synchronize_session=False)
+        self.db.session.commit()
+        asset_files.remove_files(paths)
+        return deleted
+
     def get(self, **kwargs):
         """Retrieve the model instance object.
 
@@ -1,14 +1,32 @@
+# stdlib
+from copy import deepcopy
+import os
+from threading import RLock
+import time
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+
 # grid relative
 from ...exceptions import FLProcessConflict
 from ...exceptions import PlanNotFoundError
 from ...exceptions import ProcessNotFoundError
 from ...exceptions import ProtocolNotFoundError
 from ...manager.database_manager import DatabaseManager
+from ..files import asset_files
+from ..models.ai_model import Model
+from ..models.ai_model import ModelCheckPoint
 from ..syft_assets import plans
 from ..syft_assets import protocols
+from ..syft_assets.plan import Plan
+from ..syft_assets.protocol import Protocol
 from .config import Config
 from .fl_process import FLProcess
 
+# Seconds the latest version of a process, looked up by name only, is cached
+# by a worker, 0 to always look it up.
+PROCESS_LATEST_TTL = float(os.environ.get("PROCESS_LATEST_TTL", 5))
+
 
 class ConfigManager(DatabaseManager):
     schema = Config
@@ -26,6 +44,14 @@ class FLProcessManager(DatabaseManager):
         self.db = database
 
 
+class ProcessInfo(NamedTuple):
+    """Metadata of a hosted FL Process, safe to keep across sessions."""
+
+    id: int
+    name: str
+    version: str
+
+
 class ProcessManager(DatabaseManager):
 
     schema = FLProcess
@@ -37,6 +63,20 @@ class ProcessManager(DatabaseManager):
         self._configs = ConfigManager(database)
         self._processes = FLProcessManager(database)
 
+        # Processes and their configs never change once hosted. Entries are
+        # keyed by process id, and (name, version) pairs map to process ids.
+        # Names map to the id of their latest version for
+        # PROCESS_LATEST_TTL seconds, as a new version may be hosted.
+        #
+        # The caches are kept per worker process: create and delete only
+        # update those of the worker handling them. Other workers see a new
+        # version once PROCESS_LATEST_TTL expired, and keep serving a deleted
+        # process until they restart.
+        self._cache = {}
+        self._cache_ids = {}
+        self._cache_latest = {}
+        self._cache_lock = RLock()
+
     def create(
         self,
         client_config,
@@ -88,6 +128,10 @@ class ProcessManager(DatabaseManager):
             client_flprocess_config=fl_process,
         )
 
+        # The new version is now the latest one of its name
+        with self._cache_lock:
+            self._cache_latest.pop(name, None)
+
         return fl_process
 
     def get_configs(self, **kwargs):
@@ -100,8 +144,33 @@ class ProcessManager(DatabaseManager):
         Raises:
             ProcessFoundError (PyGridError) : If FL Process not found.
         """
-        _process = self._processes.last(**kwargs)
+        _, server, client = self._lookup(**kwargs)
+        # Copied, so that callers can't alter the cached configs
+        return deepcopy(server), deepcopy(client)
+
+    def get_info(self, **kwargs) -> ProcessInfo:
+        """Return the metadata of the last FL Process matching a query,
+        without touching the database once it is cached.
+
+        Args:
+            query: Query attributes used to identify and retrieve the FL Process.
+        Returns:
+            process (ProcessInfo) : Process ID, name and version.
+        Raises:
+            ProcessFoundError (PyGridError) : If FL Process not found.
+        """
+        info, _, _ = self._lookup(**kwargs)
+        return info
 
+    def _lookup(self, **kwargs) -> Tuple[ProcessInfo, dict, dict]:
+        process_id = self._process_id(**kwargs)
+
+        with self._cache_lock:
+            entry = self._cache.get(process_id)
+        if entry is not None:
+            return entry
+
+        _process = self._processes.first(id=process_id)
         if not _process:
             raise ProcessNotFoundError
 
@@ -111,7 +180,56 @@ class ProcessManager(DatabaseManager):
         # Client configs
         client = self._configs.first(fl_process_id=_process.id, is_server_config=False)
 
-        return (server.config, client.config)
+        entry = (
+            ProcessInfo(_process.id, _process.name, _process.version),
+            server.config,
+            client.config,
+        )
+        with self._cache_lock:
+            self._cache[process_id] = entry
+        return entry
+
+    def _process_id(self, **kwargs) -> int:
+        """Resolve a query to the id of the last matching process.
+
+        Queries by id, or by name and version, are answered from the cache.
+        The latest version of a name is cached for PROCESS_LATEST_TTL
+        seconds. Other queries always go to the database.
+        """
+        if set(kwargs) == {"id"}:
+            return int(kwargs["id"])
+
+        key = None
+        if set(kwargs) == {"name", "version"}:
+            key = (kwargs["name"], kwargs["version"])
+            with self._cache_lock:
+                if key in self._cache_ids:
+                    return self._cache_ids[key]
+        elif set(kwargs) == {"name"}:
+            with self._cache_lock:
+                process_id, expires = self._cache_latest.get(kwargs["name"], (None, 0))
+            if process_id is not None and expires > time.monotonic():
+                return process_id
+
+        row = (
+            self.db.session.query(FLProcess.id)
+            .filter_by(**kwargs)
+            .order_by(FLProcess.id.desc())
+            .first()
+        )
+        if row is None:
+            raise ProcessNotFoundError
+
+        if key is not None:
+            with self._cache_lock:
+                self._cache_ids[key] = row[0]
+        elif set(kwargs) == {"name"} and PROCESS_LATEST_TTL > 0:
+            with self._cache_lock:
+                self._cache_latest[kwargs["name"]] = (
+                    row[0],
+                    time.monotonic() + PROCESS_LATEST_TTL,
+                )
+        return row[0]
 
     def get_plans(self, **kwargs):
         """Return FL Process Plans.
@@ -213,4 +331,35 @@ class ProcessManager(DatabaseManager):
         Args:
             model_id: Model's ID.
         """
-        self._processes.delete(**kwargs)
+        _process = self._processes.query(**kwargs)[0]
+        plans.invalidate(fl_process_id=_process.id)
+        paths = self._release_files(_process.id)
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_ids.clear()
+            self._cache_latest.clear()
+        self._processes.delete(id=_process.id)
+        asset_files.remove_files(paths)
+
+    def _release_files(self, fl_process_id: int) -> List[str]:
+        """Release the files of the plans, protocols and checkpoints of a
+        process, in the transaction deleting it.
+
+        Returns:
+            paths: Files to remove once the transaction is committed.
+        """
+        session = self.db.session
+        paths = asset_files.release(
+            "plan", session.query(Plan.id).filter_by(fl_process_id=fl_process_id)
+        )
+        paths += asset_files.release(
+            "protocol",
+            session.query(Protocol.id).filter_by(fl_process_id=fl_process_id),
+        )
+        paths += asset_files.release(
+            "checkpoint",
+            session.query(ModelCheckPoint.id)
+            .join(Model, ModelCheckPoint.model_id == Model.id)
+            .filter(Model.fl_process_id == fl_process_id),
+        )
+        return paths
@@ -1,3 +1,8 @@
+# stdlib
+import os
+from typing import Optional
+from typing import Tuple
+
 # third party
 import syft as sy
 from syft import deserialize
@@ -5,12 +10,20 @@ from syft import serialize
 from syft.proto.core.plan.plan_pb2 import Plan as PlanPB
 
 # grid relative
+from ...database.store_cache import ObjectCache
 from ...exceptions import PlanInvalidError
 from ...exceptions import PlanNotFoundError
 from ...exceptions import PlanTranslationError
 from ...manager.database_manager import DatabaseManager
+from ..files import asset_files
 from .plan import Plan
 
+# Size in bytes of the cache of plans, disabled when 0.
+PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", 64 * 1024 * 1024))
+
+# Plan columns by format, as named when the plans are hosted.
+PLAN_FORMATS = {"syft": "value", "ts": "value_ts", "tfjs": "value_tfjs"}
+
 
 class PlanManager(DatabaseManager):
     schema = Plan
@@ -18,6 +31,13 @@ class PlanManager(DatabaseManager):
     def __init__(self, database):
         self._schema = PlanManager.schema
         self.db = database
+        # Plans are immutable once hosted, entries are only dropped when the
+        # plans are deleted, along with their process.
+        #
+        # The cache is kept per worker process: deleting plans only drops the
+        # entries of the worker handling it, other workers keep serving the
+        # deleted plans until their entries are evicted or they restart.
+        self.cache = ObjectCache(max_bytes=PLAN_CACHE_SIZE)
 
     def register(self, process, plans: dict, avg_plan: bool):
         if not avg_plan:
@@ -34,13 +54,16 @@ class PlanManager(DatabaseManager):
 
             # Register new Plans into the database
             for key, plans in plans_types.items():
-                super().register(
+                plan = super().register(
                     name=key,
                     value=plans.get("syft", None),
                     value_ts=plans.get("ts", None),
                     value_tfjs=plans.get("tfjs", None),
                     plan_flprocess=process,
                 )
+                # Written once here, downloads are then sent from the files
+                for format in PLAN_FORMATS:
+                    asset_files.store("plan", plan.id, plans.get(format), format)
         else:
             # Register the average plan into the database
             super().register(value=plans, avg_flprocess=process, is_avg_plan=True)
@@ -85,8 +108,96 @@ class PlanManager(DatabaseManager):
         Args:
             query: Query used to identify the plan object.
         """
+        self.invalidate(**kwargs)
         super().delete(**kwargs)
 
+    def load_value(self, plan_id: int, format: str = "syft") -> Tuple[int, bytes]:
+        """Retrieve a serialized client plan, from the cache if possible.
+
+        Only the requested column is read from the database.
+
+        Args:
+            plan_id: Plan ID.
+            format: Format of the plan, "syft", "ts" or "tfjs".
+        Returns:
+            result: Tuple (fl_process_id, serialized plan).
+        Raises:
+            PlanNotFoundError (PyGridError) : If Plan not found.
+        """
+        try:
+            plan_id = int(plan_id)
+        except (TypeError, ValueError):
+            raise PlanNotFoundError
+
+        key = ("value", plan_id, format)
+        found, entry = self.cache.get(key)
+        if found:
+            return entry
+
+        entry = (
+            self.db.session.query(
+                Plan.fl_process_id, getattr(Plan, PLAN_FORMATS[format])
+            )
+            .filter_by(id=plan_id, is_avg_plan=False)
+            .first()
+        )
+        if entry is None:
+            raise PlanNotFoundError
+
+        entry = tuple(entry)
+        self.cache.put(key, entry, len(entry[1] or b""))
+        return entry
+
+    def load_avg_plan(self, fl_process_id: int) -> Optional[Tuple[int, bytes]]:
+        """Retrieve the serialized avg plan of a process, from the cache if
+        possible.
+
+        Returns:
+            result: Tuple (plan_id, serialized avg plan), None if the process
+                has no avg plan.
+        """
+        plan_id = (
+            self.db.session.query(Plan.id)
+            .filter_by(fl_process_id=fl_process_id, is_avg_plan=True)
+            .scalar()
+        )
+        if plan_id is None:
+            return None
+
+        # Not shared with load_value, which only serves client plans
+        key = ("avg", plan_id)
+        found, value = self.cache.get(key)
+        if not found:
+            value = self.db.session.query(Plan.value).filter_by(id=plan_id).scalar()
+            self.cache.put(key, value, len(value or b""))
+        return (plan_id, value) if value else None
+
+    def load_plan(self, plan_id: int, value: bytes) -> "sy.Plan":
+        """Deserialize a plan once, later calls return the cached Plan.
+
+        The Plan is shared, it must not run concurrently. Avg plans run while
+        folding a diff or completing a cycle, under the lock of the cycle, and
+        a process has one open cycle at a time.
+
+        Args:
+            plan_id: Plan ID.
+            value: Serialized plan, deserialized on a cache miss.
+        """
+        key = ("plan", plan_id)
+        found, plan = self.cache.get(key)
+        if not found:
+            plan = self.deserialize_plan(value)
+            self.cache.put(key, plan, len(value))
+        return plan
+
+    def invalidate(self, **kwargs):
+        """Drop the cached entries of the plans matching a query."""
+        for (plan_id,) in self.db.session.query(Plan.id).filter_by(**kwargs):
+            self.cache.invalidate(("plan", plan_id))
+            self.cache.invalidate(("avg", plan_id))
+            for format in PLAN_FORMATS:
+                self.cache.invalidate(("value", plan_id, format))
+
     @staticmethod
     def deserialize_plan(bin: bytes) -> "sy.Plan":
         """Deserialize a Plan."""
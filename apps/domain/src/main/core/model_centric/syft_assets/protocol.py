@@ -18,10 +18,11 @@ class Protocol(BaseModel):
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(255))
-    value = db.Column(db.LargeBinary)
-    value_ts = db.Column(db.LargeBinary)
-    value_tfjs = db.Column(db.LargeBinary)
+    value = db.deferred(db.Column(db.LargeBinary))
+    value_ts = db.deferred(db.Column(db.LargeBinary))
+    value_tfjs = db.deferred(db.Column(db.LargeBinary))
     fl_process_id = db.Column(db.Integer, db.ForeignKey("model_centric_fl_process.id"))
 
     def __str__(self):
-        return f"<Protocol id: {self.id}, values: {self.value}, torchscript: {self.value_ts}>"
+        # Values are deferred, printing them would load every format
+        return f"<Protocol id: {self.id}, name: {self.name}, fl_process_id: {self.fl_process_id}>"
@@ -1,6 +1,7 @@
 # grid relative
 from ...exceptions import ProtocolNotFoundError
 from ...manager.database_manager import DatabaseManager
+from ..files import asset_files
 from .protocol import Protocol
 
 
@@ -15,7 +16,10 @@ class ProtocolManager(DatabaseManager):
     def register(self, process, protocols: dict):
         # Register new Protocols into the database
         for key, value in protocols.items():
-            super().register(name=key, value=value, protocol_flprocess=process)
+            protocol = super().register(
+                name=key, value=value, protocol_flprocess=process
+            )
+            asset_files.store("protocol", protocol.id, value)
 
     def get(self, **kwargs):
         """Retrieve the desired protocol.
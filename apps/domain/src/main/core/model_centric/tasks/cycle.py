@@ -1,28 +1,49 @@
 # stdlib
 import logging
+import threading
 import traceback
 
 # grid relative
 from ....utils.executor import executor
 
+# Tasks currently running, by name
+_running = {}
+# Names of the running tasks requested again meanwhile
+_rerun = set()
+_lock = threading.RLock()
 
-def run_task_once(name, func, *args):
-    future = executor.futures._futures.get(name)
-    logging.info("future: %s" % str(future))
-    logging.info("futures count: %d" % len(executor.futures._futures))
-    # prevent running multiple threads
-    if future is None or future.done() is True:
-        executor.futures.pop(name)
-        try:
-            executor.submit_stored(name, func, *args)
-        except Exception as e:
-            logging.error(
-                "Failed to start new thread: %s %s" % (str(e), traceback.format_exc())
-            )
-    else:
-        logging.warning(
-            "Skipping %s execution because previous one is not finished" % name
+
+def run_task_once(name, func, *args, task_executor=executor):
+    """Run func(*args) in task_executor, unless a task with the same name is
+    running. In that case the task runs once more when the current run
+    finishes, so that work submitted meanwhile is never dropped."""
+    with _lock:
+        if name in _running:
+            logging.info("%s is running, it will run again once done" % name)
+            _rerun.add(name)
+        else:
+            _submit_task(name, func, args, task_executor)
+
+
+def _submit_task(name, func, args, task_executor):
+    try:
+        future = task_executor.submit(func, *args)
+    except Exception as e:
+        logging.error(
+            "Failed to start new thread: %s %s" % (str(e), traceback.format_exc())
         )
+        return
+
+    _running[name] = future
+    future.add_done_callback(lambda _: _task_done(name, func, args, task_executor))
+
+
+def _task_done(name, func, args, task_executor):
+    with _lock:
+        del _running[name]
+        if name in _rerun:
+            _rerun.discard(name)
+            _submit_task(name, func, args, task_executor)
 
 
 def complete_cycle(cycle_manager, cycle_id):
@@ -34,3 +55,16 @@ def complete_cycle(cycle_manager, cycle_id):
             "Error in complete_cycle task: %s %s" % (str(e), traceback.format_exc())
         )
         return e
+
+
+def compact_checkpoints(model_manager, model_id, keep_latest, keep_every):
+    logging.info("running compact_checkpoints")
+    try:
+        deleted = model_manager.compact(model_id, keep_latest, keep_every)
+        logging.info("compacted %d checkpoints of model %d" % (deleted, model_id))
+    except Exception as e:
+        logging.error(
+            "Error in compact_checkpoints task: %s %s"
+            % (str(e), traceback.format_exc())
+        )
+        return e
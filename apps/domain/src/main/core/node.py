@@ -14,6 +14,8 @@ from ..routes import root_blueprint
 from ..routes import search_blueprint
 from ..routes import setup_blueprint
 from ..routes import users_blueprint
+from ..utils.executor import AGGREGATION_WORKERS
+from ..utils.executor import aggregation_executor
 from ..utils.executor import executor
 from .nodes.domain import GridDomain
 from .nodes.network import GridNetwork
@@ -131,9 +133,12 @@ def create_domain_app(app, args, testing=False):
     from .database import Role
     from .database import SetupConfig
     from .database import User
+    from .database import apply_data_migration
     from .database import db
     from .database import seed_db
     from .database import set_database_config
+    from .database.bin_storage.bin_obj import migrate_inline_binaries
+    from .datasets.dataset_ops import reindex_dataset_tags
 
     global node
     node = GridDomain(name=args.name)
@@ -150,6 +155,18 @@ def create_domain_app(app, args, testing=False):
         if len(db.session.query(SetupConfig).all()) != 0:
             node.name = db.session.query(SetupConfig).first().domain_name
 
+        # Fill the tag and permission indexes of databases created before
+        # they existed. Both run in the migration's transaction, committed
+        # along with its marker.
+        def index_tags_and_permissions():
+            node.disk_store.reindex()
+            reindex_dataset_tags()
+
+        apply_data_migration("index_tags_and_permissions", index_tags_and_permissions)
+        apply_data_migration(
+            "migrate_inline_binaries", lambda: migrate_inline_binaries(db.session)
+        )
+
         role = db.session.query(Role.id).filter_by(name="Owner").first()
         user = User.query.filter_by(role=role.id).first()
         if user:
@@ -168,5 +185,8 @@ def create_domain_app(app, args, testing=False):
     app.config["EXECUTOR_PROPAGATE_EXCEPTIONS"] = True
     app.config["EXECUTOR_TYPE"] = "thread"
     executor.init_app(app)
+    app.config["AGGREGATION_EXECUTOR_TYPE"] = "thread"
+    app.config["AGGREGATION_EXECUTOR_MAX_WORKERS"] = AGGREGATION_WORKERS
+    aggregation_executor.init_app(app)
 
     return app
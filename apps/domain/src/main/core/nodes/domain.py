@@ -51,6 +51,7 @@ import tenseal as ts
 
 # grid relative
 from ..database import db
+from ..database.store_cache import ObjectCache
 from ..database.store_disk import DiskObjectStore
 from ..manager.association_request_manager import AssociationRequestManager
 from ..manager.environment_manager import EnvironmentManager
@@ -104,9 +105,13 @@ class GridDomain(Domain):
         self.users = UserManager(db)
         self.roles = RoleManager(db)
         self.groups = GroupManager(db)
-        self.disk_store = DiskObjectStore(db)
+        # Optional byte-bounded cache of deserialized objects, shared by both
+        # stores so writes through either of them invalidate it.
+        cache_size = int(os.getenv("OBJECT_CACHE_SIZE", 0))
+        self.object_cache = ObjectCache(max_bytes=cache_size) if cache_size else None
+        self.disk_store = DiskObjectStore(db, cache=self.object_cache)
         if not os.getenv("MEMORY_STORE", None):
-            self.store = DiskObjectStore(db)
+            self.store = DiskObjectStore(db, cache=self.object_cache)
         self.environments = EnvironmentManager(db)
         self.setup = SetupManager(db)
         self.association_requests = AssociationRequestManager(db)
@@ -66,7 +66,7 @@ def create_dataset_msg(
     if _allowed:
         _dataset = msg.content.get("dataset", None)
         storage = node.disk_store
-        _json = create_dataset(_dataset)
+        _json = create_dataset(_dataset, storage)
     else:
         raise AuthorizationError("You're not allowed to upload data!")
 
@@ -128,7 +128,9 @@ def get_all_datasets_metadata_msg(
 
     storage = node.disk_store
     datasets = []
-    for dataset in get_all_datasets():
+    # Optional tag filter, answered from the dataset tag index
+    _tags = msg.content.get("tags", None)
+    for dataset in get_all_datasets(tags=_tags):
         ds = model_to_json(dataset)
         objs = get_all_relations(dataset.id)
         ds["data"] = [
@@ -202,7 +204,7 @@ def delete_dataset_msg(
 
     if _allowed:
         storage = node.disk_store
-        delete_dataset(_dataset_id)
+        delete_dataset(_dataset_id, storage)
     else:
         raise AuthorizationError("You're not allowed to upload data!")
 
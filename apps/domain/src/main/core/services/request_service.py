@@ -50,6 +50,7 @@ from syft.grid.messages.request_messages import UpdateRequestResponse
 from syft.util import validate_type
 
 # grid relative
+from ..database.store_disk import DiskObjectStore
 from ..database.utils import model_to_json
 from ..datasets.dataset_ops import update_dataset_metadata
 from ..exceptions import AuthorizationError
@@ -197,6 +198,20 @@ def get_all_request_msg(
     )
 
 
+def grant_read_permission(node: AbstractNode, request) -> None:
+    """Give the author of an accepted request read access to its object."""
+    object_id = UID.from_string(request.object_id)
+    if isinstance(node.store, DiskObjectStore):
+        # Updates the metadata and permission index in place
+        node.store.grant_permission(object_id, request.verify_key)
+    else:
+        tmp_obj = node.store[object_id]
+        tmp_obj.read_permissions[
+            VerifyKey(request.verify_key.encode("utf-8"), encoder=HexEncoder)
+        ] = request.id
+        node.store[object_id] = tmp_obj
+
+
 def update_request_msg(
     msg: DeleteRequestMessage,
     node: AbstractNode,
@@ -237,11 +252,7 @@ def update_request_msg(
     _req_owner = _current_user_key == _req.verify_key
 
     if status == "accepted" and _can_triage_request:
-        tmp_obj = node.store[UID.from_string(_req.object_id)]
-        tmp_obj.read_permissions[
-            VerifyKey(_req.verify_key.encode("utf-8"), encoder=HexEncoder)
-        ] = _req.id
-        node.store[UID.from_string(_req.object_id)] = tmp_obj
+        grant_read_permission(node, _req)
         node.data_requests.set(request_id=_req.id, status=status)
     elif status == "denied" and (_can_triage_request or _req_owner):
         node.data_requests.set(request_id=_req.id, status=status)
@@ -488,11 +499,7 @@ def accept_or_deny_request(
     _can_triage_request = node.users.can_triage_requests(user_id=current_user.id)
     if _msg.accept:
         if _req and _can_triage_request:
-            tmp_obj = node.store[UID.from_string(_req.object_id)]
-            tmp_obj.read_permissions[
-                VerifyKey(_req.verify_key.encode("utf-8"), encoder=HexEncoder)
-            ] = _req.id
-            node.store[UID.from_string(_req.object_id)] = tmp_obj
+            grant_read_permission(node, _req)
             node.data_requests.set(request_id=_req.id, status="accepted")
     else:
         _req_owner = current_user.verify_key == _req.verify_key
@@ -102,6 +102,10 @@ def get_dataset_info(current_user, dataset_id):
 def get_all_datasets_info(current_user):
     content = {}
     content["current_user"] = current_user
+    # e.g. /datasets?tags=#diabetes&tags=#2020
+    tags = request.args.getlist("tags")
+    if tags:
+        content["tags"] = tags
     status_code, response_msg = error_handler(
         route_logic, 200, GetDatasetsMessage, current_user, content
     )
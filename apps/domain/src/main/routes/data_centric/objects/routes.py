@@ -0,0 +1,54 @@
+# stdlib
+from json import dumps
+
+# third party
+from flask import Response
+from flask import request
+from nacl.encoding import HexEncoder
+from nacl.signing import VerifyKey
+
+# grid relative
+from ...auth import token_required
+from ..blueprint import dcfl_blueprint as dcfl_route
+
+
+@dcfl_route.route("/objects", methods=["GET"])
+@token_required
+def get_readable_objects(current_user):
+    # grid relative
+    from ....core.database.store_disk import DiskObjectStore
+    from ....core.node import get_node  # TODO: fix circular import
+
+    # Filtered by tags through the tag index, e.g. ?tags=#diabetes&tags=#2020.
+    # Stores without the index (MEMORY_STORE) are filtered in place.
+    node = get_node()
+    tags = request.args.getlist("tags")
+    if isinstance(node.store, DiskObjectStore):
+        objects = node.store.get_objects_with_tags(
+            tags, readable_by=current_user.verify_key
+        )
+    else:
+        verify_key = VerifyKey(
+            current_user.verify_key.encode("utf-8"), encoder=HexEncoder
+        )
+        objects = [
+            obj
+            for obj in node.store.get_objects_of_type(object)
+            if set(tags) <= set(obj.tags or []) and verify_key in obj.read_permissions
+        ]
+    response = {
+        "objects": [
+            {
+                "id": str(obj.id.value),
+                "tags": obj.tags,
+                "description": obj.description,
+            }
+            for obj in objects
+        ]
+    }
+
+    return Response(
+        dumps(response),
+        status=200,
+        mimetype="application/json",
+    )
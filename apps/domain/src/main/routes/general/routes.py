@@ -1,9 +1,13 @@
 # stdlib
+from contextlib import ExitStack
 import json
+from typing import Optional
+from typing import Tuple
 
 # third party
 from flask import Response
 from flask import request
+from flask import stream_with_context
 from nacl.encoding import HexEncoder
 from syft import deserialize
 from syft import serialize
@@ -13,10 +17,24 @@ from syft.core.common.message import SignedImmediateSyftMessageWithReply
 from syft.core.common.message import SignedImmediateSyftMessageWithoutReply
 from syft.core.common.serde.deserialize import _deserialize
 from syft.core.common.serde.serialize import _serialize
+from syft.util import index_syft_by_module_name
 
 # grid relative
 from ...core.exceptions import AuthorizationError
+from ...core.exceptions import InvalidParameterValueError
+from ...core.exceptions import MessageTooLargeError
 from ...core.exceptions import UserNotFoundError
+from ...utils.streaming import FRAME_ERROR
+from ...utils.streaming import FRAME_NO_REPLY
+from ...utils.streaming import FRAME_REPLY
+from ...utils.streaming import check_message_size
+from ...utils.streaming import message_buffer
+from ...utils.streaming import release
+from ...utils.streaming import request_message
+from ...utils.streaming import split_data_message
+from ...utils.streaming import split_frames
+from ...utils.streaming import stream_frames
+from ...utils.streaming import stream_response
 from ..auth import token_required
 from .blueprint import root_blueprint as root_route
 
@@ -61,50 +79,131 @@ def metadata_route():
     return Response(json.dumps(response_body), status=200, mimetype="application/json")
 
 
-@root_route.route("/pysyft", methods=["POST"])
-def syft_route():
+def recv_syft_message(data) -> Optional[bytes]:
+    """Deserialize a signed syft message and deliver it to the node.
+
+    Returns:
+        reply: Serialized reply, or None for messages without reply.
+    """
     # grid relative
     from ...core.node import get_node  # TODO: fix circular import
 
-    data = request.get_data()
-    obj_msg = deserialize(blob=data, from_bytes=True)
+    # The envelope is parsed here rather than by deserialize(from_bytes=True),
+    # which would copy the content out of the request buffer
+    obj_type, content = split_data_message(data)
+    try:
+        get_protobuf_schema = getattr(
+            index_syft_by_module_name(fully_qualified_name=obj_type),
+            "get_protobuf_schema",
+            None,
+        )
+        if not callable(get_protobuf_schema):
+            raise InvalidParameterValueError("Invalid message!")
+        proto = get_protobuf_schema()()
+        proto.ParseFromString(content)
+    finally:
+        release(content)
+
+    obj_msg = deserialize(blob=proto)
     if isinstance(obj_msg, SignedImmediateSyftMessageWithReply):
         reply = get_node().recv_immediate_msg_with_reply(msg=obj_msg)
-        r = Response(response=_serialize(obj=reply, to_bytes=True), status=200)
-        r.headers["Content-Type"] = "application/octet-stream"
-        return r
+        return _serialize(obj=reply, to_bytes=True)
     elif isinstance(obj_msg, SignedImmediateSyftMessageWithoutReply):
         get_node().recv_immediate_msg_without_reply(msg=obj_msg)
     else:
         get_node().recv_eventual_msg_without_reply(msg=obj_msg)
-    return ""
+    return None
 
 
-@root_route.route("/pysyft_multipart", methods=["POST"])
-def syft_multipart_route():
-    # grid relative
-    from ...core.node import get_node  # TODO: fix circular import
+def process_syft_message(data):
+    reply = recv_syft_message(data)
+    if reply is None:
+        return ""
+    return stream_response(reply)
 
-    if "file" not in request.files:
-        response = {"error": "Invalid message!"}
-        status_code = 403
 
-    file_obj = request.files["file"]
+def process_syft_frame(frame) -> Tuple[int, bytes]:
+    """Deliver one message of a batch, turning any failure into an error
+    frame so that the following messages are still processed."""
+    try:
+        reply = recv_syft_message(frame)
+    except Exception as e:
+        return FRAME_ERROR, json.dumps({"error": str(e)}).encode("utf-8")
+    if reply is None:
+        return FRAME_NO_REPLY, b""
+    return FRAME_REPLY, reply
 
-    msg = file_obj.stream.read()
 
-    obj_msg = deserialize(blob=msg, from_bytes=True)
+@root_route.route("/pysyft", methods=["POST"])
+def syft_route():
+    try:
+        with request_message(request.stream, request.content_length) as data:
+            return process_syft_message(data)
+    except MessageTooLargeError as e:
+        return Response(
+            json.dumps({"error": str(e)}), status=413, mimetype="application/json"
+        )
+    except InvalidParameterValueError as e:
+        return Response(
+            json.dumps({"error": str(e)}), status=400, mimetype="application/json"
+        )
 
-    if isinstance(obj_msg, SignedImmediateSyftMessageWithReply):
-        reply = get_node().recv_immediate_msg_with_reply(msg=obj_msg)
-        r = Response(response=_serialize(obj=reply, to_bytes=True), status=200)
-        r.headers["Content-Type"] = "application/octet-stream"
-        del msg
-        del obj_msg
-        return r
-    elif isinstance(obj_msg, SignedImmediateSyftMessageWithoutReply):
-        get_node().recv_immediate_msg_without_reply(msg=obj_msg)
-    else:
-        get_node().recv_eventual_msg_without_reply(msg=obj_msg)
 
-    return ""
+@root_route.route("/pysyft_multipart", methods=["POST"])
+def syft_multipart_route():
+    try:
+        # Checked before the form is parsed, as parsing reads the whole body
+        check_message_size(request.content_length)
+        if "file" not in request.files:
+            return Response(
+                json.dumps({"error": "Invalid message!"}),
+                status=403,
+                mimetype="application/json",
+            )
+
+        # Werkzeug already spools large parts to a temporary file
+        with message_buffer(request.files["file"].stream) as data:
+            return process_syft_message(data)
+    except MessageTooLargeError as e:
+        return Response(
+            json.dumps({"error": str(e)}), status=413, mimetype="application/json"
+        )
+    except InvalidParameterValueError as e:
+        return Response(
+            json.dumps({"error": str(e)}), status=400, mimetype="application/json"
+        )
+
+
+@root_route.route("/pysyft_batch", methods=["POST"])
+def syft_batch_route():
+    """Deliver a batch of length prefixed signed messages in order, and
+    answer with one status frame per message, sent once it is processed."""
+    body = ExitStack()
+    try:
+        data = body.enter_context(
+            request_message(request.stream, request.content_length)
+        )
+        frames = split_frames(data)
+    except MessageTooLargeError as e:
+        body.close()
+        return Response(
+            json.dumps({"error": str(e)}), status=413, mimetype="application/json"
+        )
+    except InvalidParameterValueError as e:
+        body.close()
+        return Response(
+            json.dumps({"error": str(e)}), status=400, mimetype="application/json"
+        )
+
+    def replies():
+        # The body is closed once the response is sent, or abandoned
+        with body:
+            try:
+                for frame in frames:
+                    yield process_syft_frame(frame)
+                    release(frame)
+            finally:
+                for frame in frames:
+                    release(frame)
+
+    return stream_frames(stream_with_context(replies()))
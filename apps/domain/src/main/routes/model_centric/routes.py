@@ -1,5 +1,4 @@
 # stdlib
-import io
 import json
 import logging
 from math import floor
@@ -10,7 +9,6 @@ from flask import Response
 from flask import current_app
 from flask import render_template
 from flask import request
-from flask import send_file
 import numpy as np
 from requests_toolbelt import MultipartEncoder
 
@@ -18,16 +16,18 @@ from requests_toolbelt import MultipartEncoder
 from scipy.stats import poisson
 
 # grid relative
-from ...core.codes import CYCLE
 from ...core.codes import MSG_FIELD
 from ...core.codes import RESPONSE_MSG
 from ...core.exceptions import InvalidRequestKeyError
 from ...core.exceptions import ModelNotFoundError
+from ...core.exceptions import ProtocolNotFoundError
 from ...core.exceptions import PyGridError
 from ...core.model_centric.auth.federated import verify_token
 from ...core.model_centric.controller import processes
 from ...core.model_centric.cycles import cycle_manager
+from ...core.model_centric.files import asset_files
 from ...core.model_centric.models import model_manager
+from ...core.model_centric.models.model_manager import CheckpointInfo
 from ...core.model_centric.processes import process_manager
 from ...core.model_centric.syft_assets import plans
 from ...core.model_centric.syft_assets import protocols
@@ -36,9 +36,64 @@ from ...events.model_centric.fl_events import assign_worker_id
 from ...events.model_centric.fl_events import cycle_request
 from ...events.model_centric.fl_events import report
 from ...events.model_centric.fl_events import requires_speed_test
+from ...utils.http_cache import conditional_download
+from ...utils.http_cache import downloads
 from .blueprint import mcfl_blueprint
 
 
+def checkpoint_download(checkpoint: CheckpointInfo, immutable: bool) -> Response:
+    """Send a checkpoint, or only its delta from the checkpoint numbered by
+    the diff_from argument, which the client already holds.
+
+    Loads are shared with the concurrent requests for the same checkpoint.
+
+    The checkpoint number is sent in X-Checkpoint-Number. Deltas are sent
+    with X-Delta-From and X-Delta-Codec, and are applied as described in
+    checkpoint_delta.decode_delta. The full checkpoint is sent when no delta
+    can be computed.
+    """
+    headers = {"X-Checkpoint-Number": str(checkpoint.number)}
+    etag = f"checkpoint-{checkpoint.id}"
+
+    diff_from = request.args.get("diff_from", "")
+    if diff_from.isdecimal() and not request.if_none_match.contains(etag):
+        delta = downloads.do(
+            ("checkpoint-delta", checkpoint.id, int(diff_from)),
+            lambda: model_manager.load_delta(checkpoint, int(diff_from)),
+        )
+        if delta is not None:
+            value, codec = delta
+            headers["X-Delta-From"] = str(int(diff_from))
+            headers["X-Delta-Codec"] = codec
+            return conditional_download(
+                f"{etag}-from-{int(diff_from)}",
+                lambda: value,
+                immutable=immutable,
+                headers=headers,
+            )
+
+    def load():
+        return downloads.do(
+            ("checkpoint-value", checkpoint.id),
+            lambda: model_manager.load_value(checkpoint),
+        )
+
+    def load_file():
+        return downloads.do(
+            ("checkpoint-file", checkpoint.id),
+            lambda: asset_files.path("checkpoint", checkpoint.id, load),
+        )
+
+    return conditional_download(
+        etag,
+        load,
+        immutable=immutable,
+        headers=headers,
+        load_file=load_file,
+        accel_uri=asset_files.accel_uri,
+    )
+
+
 @mcfl_blueprint.route("/cycle-request", methods=["POST"])
 def worker_cycle_request():
     """This endpoint is where the worker is attempting to join an active
@@ -134,7 +189,9 @@ def download_protocol():
         protocol_id = request.args.get("protocol_id", None)
 
         # Retrieve Process Entities
-        _protocol = protocols.get(id=protocol_id)
+        _protocol = protocols.first(id=protocol_id)
+        if _protocol is None:
+            raise ProtocolNotFoundError
         _cycle = cycle_manager.last(_protocol.fl_process_id)
         _worker = worker_manager.get(id=worker_id)
         _accepted = cycle_manager.validate(_worker.id, _cycle.id, request_key)
@@ -142,8 +199,15 @@ def download_protocol():
         if not _accepted:
             raise InvalidRequestKeyError
 
-        status_code = 200  # Success
-        response_body[CYCLE.PROTOCOLS] = _protocol.value
+        return conditional_download(
+            f"protocol-{_protocol.id}",
+            lambda: _protocol.value,
+            immutable=True,
+            load_file=lambda: asset_files.path(
+                "protocol", _protocol.id, lambda: _protocol.value
+            ),
+            accel_uri=asset_files.accel_uri,
+        )
     except InvalidRequestKeyError as e:
         status_code = 401  # Unauthorized
         response_body[RESPONSE_MSG.ERROR] = str(e)
@@ -171,20 +235,27 @@ def download_model():
         model_id = request.args.get("model_id", None)
 
         # Retrieve Process Entities
-        _model = model_manager.get(id=model_id)
-        _cycle = cycle_manager.last(_model.fl_process_id)
+        fl_process_id = downloads.do(
+            ("model", model_id),
+            lambda: model_manager.get(id=model_id).fl_process_id,
+        )
+        _cycle = cycle_manager.last(fl_process_id)
         _worker = worker_manager.get(id=worker_id)
         _accepted = cycle_manager.validate(_worker.id, _cycle.id, request_key)
 
         if not _accepted:
             raise InvalidRequestKeyError
 
-        _last_checkpoint = model_manager.load(model_id=model_id)
-
-        return send_file(
-            io.BytesIO(_last_checkpoint.value), mimetype="application/octet-stream"
+        # Checkpoints are saved before the cycle they start, so the latest
+        # checkpoint of a cycle can be shared while the cycle is open
+        _last_checkpoint = downloads.do(
+            ("latest-checkpoint", model_id, _cycle.id),
+            lambda: model_manager.load_info(model_id=model_id),
         )
 
+        # The latest checkpoint changes every cycle, clients revalidate it
+        return checkpoint_download(_last_checkpoint, immutable=False)
+
     except InvalidRequestKeyError as e:
         status_code = 401  # Unauthorized
         response_body[RESPONSE_MSG.ERROR] = str(e)
@@ -213,25 +284,41 @@ def download_plan():
         plan_id = request.args.get("plan_id", None)
         receive_operations_as = request.args.get("receive_operations_as", None)
 
+        if receive_operations_as == "torchscript":
+            plan_format = "ts"
+        elif receive_operations_as == "tfjs":
+            plan_format = "tfjs"
+        else:
+            plan_format = "syft"
+
         # Retrieve Process Entities
-        _plan = process_manager.get_plan(id=plan_id, is_avg_plan=False)
-        _cycle = cycle_manager.last(fl_process_id=_plan.fl_process_id)
+        fl_process_id, plan_value = downloads.do(
+            ("plan", plan_id, plan_format),
+            lambda: plans.load_value(plan_id, plan_format),
+        )
+        _cycle = cycle_manager.last(fl_process_id=fl_process_id)
         _worker = worker_manager.get(id=worker_id)
         _accepted = cycle_manager.validate(_worker.id, _cycle.id, request_key)
 
         if not _accepted:
             raise InvalidRequestKeyError
 
-        status_code = 200  # Success
-
-        if receive_operations_as == "torchscript":
-            response_body = _plan.value_ts
-        elif receive_operations_as == "tfjs":
-            response_body = _plan.value_tfjs
-        else:
-            response_body = _plan.value
-
-        return send_file(io.BytesIO(response_body), mimetype="application/octet-stream")
+        # Formats the plan wasn't hosted in are sent empty
+        if plan_value is None:
+            plan_value = b""
+
+        return conditional_download(
+            f"plan-{plan_id}-{plan_format}",
+            lambda: plan_value,
+            immutable=True,
+            load_file=lambda: downloads.do(
+                ("plan-file", plan_id, plan_format),
+                lambda: asset_files.path(
+                    "plan", int(plan_id), lambda: plan_value, plan_format
+                ),
+            ),
+            accel_uri=asset_files.accel_uri,
+        )
 
     except InvalidRequestKeyError as e:
         status_code = 401  # Unauthorized
@@ -481,12 +568,12 @@ def get_model():
         process_query = {"name": name}
         if version:
             process_query["version"] = version
-        _fl_process = process_manager.last(**process_query)
+        _fl_process = process_manager.get_info(**process_query)
         _model = model_manager.get(fl_process_id=_fl_process.id)
 
         checkpoint_query = {"model_id": _model.id}
         if checkpoint:
-            if checkpoint.isnumeric():
+            if checkpoint.isdecimal():
                 checkpoint_query["number"] = int(checkpoint)
             else:
                 checkpoint_query["alias"] = checkpoint
@@ -494,10 +581,11 @@ def get_model():
             checkpoint_query["alias"] = "latest"
 
         logging.info(f"Looking for checkpoint: {checkpoint_query}")
-        _model_checkpoint = model_manager.load(**checkpoint_query)
+        _model_checkpoint = model_manager.load_info(**checkpoint_query)
 
-        return send_file(
-            io.BytesIO(_model_checkpoint.value), mimetype="application/octet-stream"
+        # Numbered checkpoints never change, aliases move
+        return checkpoint_download(
+            _model_checkpoint, immutable="number" in checkpoint_query
         )
 
     except ModelNotFoundError as e:
@@ -1,4 +1,12 @@
+# stdlib
+import os
+
 # third party
 from flask_executor import Executor
 
+# Threads completing FL cycles. Cycles of different FL processes complete
+# in parallel, up to this many at a time, others wait in the queue.
+AGGREGATION_WORKERS = int(os.environ.get("AGGREGATION_WORKERS", 4))
+
 executor = Executor()
+aggregation_executor = Executor(name="aggregation")
@@ -0,0 +1,94 @@
+# stdlib
+import io
+import os
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Union
+
+# third party
+from flask import Response
+from flask import request
+from flask import send_file
+
+# grid relative
+from .single_flight import SingleFlight
+
+# Seconds the loads shared by concurrent downloads are kept for the next
+# ones, 0 to only share loads in flight.
+DOWNLOAD_SHARE_TTL = float(os.environ.get("DOWNLOAD_SHARE_TTL", 2))
+
+# Loads of download routes, shared between the requests for the same asset.
+# Requests are still authorized one by one before using them.
+downloads = SingleFlight(ttl=DOWNLOAD_SHARE_TTL)
+
+# Cache-Control of downloads whose URL always designates the same content.
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+# Cache-Control of downloads whose content may change, e.g. the latest
+# checkpoint: clients keep them but revalidate them on every use.
+REVALIDATE = "private, no-cache"
+
+
+def conditional_download(
+    etag: str,
+    load: Callable[[], Union[bytes, str]],
+    immutable: bool = False,
+    mimetype: str = "application/octet-stream",
+    headers: Optional[Dict[str, str]] = None,
+    load_file: Optional[Callable[[], Optional[str]]] = None,
+    accel_uri: Optional[Callable[[str], Optional[str]]] = None,
+) -> Response:
+    """Send a download, or 304 Not Modified if the client already holds it.
+
+    Range requests are supported. Content available as a file is sent from
+    the file, through the front proxy if accel_uri gives its internal URI.
+
+    Args:
+        etag: Strong entity tag of the content, built from the ids of rows
+            whose values never change.
+        load: Loads the content, only called when it has to be sent.
+        immutable: If the URL always designates the same content.
+        mimetype: Type of the content.
+        headers: Extra headers, sent with the 304 as well.
+        load_file: Returns the path of a file holding the content, or None
+            to fall back to load.
+        accel_uri: Returns the URI of a file for X-Accel-Redirect, or None to
+            send it from the server.
+    Returns:
+        response: The download, or an empty 304 response.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+    else:
+        response = _send(etag, load, mimetype, load_file, accel_uri)
+
+    response.headers["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+    response.headers.extend(headers or {})
+    return response
+
+
+def _send(etag, load, mimetype, load_file, accel_uri) -> Response:
+    path = load_file() if load_file else None
+    uri = accel_uri(path) if path and accel_uri else None
+    if uri is not None:
+        # The proxy sends the file, ranges included
+        response = Response(status=200, mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = uri
+        response.set_etag(etag)
+        return response
+
+    if path is not None:
+        file, size = path, os.path.getsize(path)
+    else:
+        content = load()
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        file, size = io.BytesIO(content), len(content)
+
+    # Ranges are handled below, once the etag If-Range refers to is set
+    response = send_file(file, mimetype=mimetype, add_etags=False, conditional=False)
+    response.set_etag(etag)
+    response.make_conditional(request, accept_ranges=True, complete_length=size)
+    return response
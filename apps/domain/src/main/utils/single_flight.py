@@ -0,0 +1,86 @@
+# stdlib
+from collections import deque
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.thread = threading.get_ident()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.expires = 0.0
+
+
+class SingleFlight:
+    """Share one call of a function between the concurrent callers asking
+    for the same key, and its result with the callers arriving within ttl
+    seconds after it returned. Errors are raised to the concurrent callers
+    but never kept.
+
+    Results are shared as they are, they must not be tied to a database
+    session or modified by the callers.
+
+    Args:
+        ttl: Seconds a result is kept once computed, 0 to only share it
+            between concurrent callers.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self.shared = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        # Kept results in the order they expire, as they share one ttl
+        self._kept: "deque[Tuple[Hashable, _Call]]" = deque()
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            elif not call.done.is_set() and call.thread == threading.get_ident():
+                # Greenlets of one thread can't wait on each other
+                return func()
+            else:
+                leader = False
+                self.shared += 1
+
+        if leader:
+            self._run(key, call, func)
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _run(self, key: Hashable, call: _Call, func: Callable[[], Any]) -> None:
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+        with self._lock:
+            call.expires = time.monotonic() + self.ttl
+            if call.error is None and self.ttl > 0:
+                self._kept.append((key, call))
+            elif self._calls.get(key) is call:
+                del self._calls[key]
+            call.done.set()
+
+    def _prune(self, now: float) -> None:
+        """Drop the kept results that expired, oldest first."""
+        while self._kept and self._kept[0][1].expires <= now:
+            key, call = self._kept.popleft()
+            if self._calls.get(key) is call:
+                del self._calls[key]
@@ -0,0 +1,302 @@
+# stdlib
+from contextlib import contextmanager
+import io
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import BinaryIO
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# third party
+from flask import Response
+
+# grid relative
+from ..core.exceptions import InvalidParameterValueError
+from ..core.exceptions import MessageTooLargeError
+
+# Message bodies larger than this are rejected, unlimited when 0.
+MAX_MESSAGE_SIZE = int(os.environ.get("MAX_MESSAGE_SIZE", 1024 * 1024 * 1024))
+
+# Message bodies are kept in memory up to this size, larger ones are spooled
+# to a temporary file and memory mapped.
+MESSAGE_SPOOL_SIZE = int(os.environ.get("MESSAGE_SPOOL_SIZE", 16 * 1024 * 1024))
+
+# Total size of the message bodies kept in memory by concurrent requests,
+# bodies read past it are spooled to a temporary file whatever their size.
+MESSAGE_MEMORY_SIZE = int(os.environ.get("MESSAGE_MEMORY_SIZE", 256 * 1024 * 1024))
+
+# Replies larger than this are streamed back in chunks of this size.
+RESPONSE_CHUNK_SIZE = int(os.environ.get("RESPONSE_CHUNK_SIZE", 1024 * 1024))
+
+# Size of the reads from the request stream.
+READ_SIZE = 64 * 1024
+
+# Messages of a batch are each prefixed by their little endian length.
+FRAME_LENGTH = struct.Struct("<Q")
+
+# Replies of a batch are prefixed by a status byte and their length.
+REPLY_HEADER = struct.Struct("<BQ")
+FRAME_REPLY = 0  # serialized reply
+FRAME_NO_REPLY = 1  # empty, the message expected no reply
+FRAME_ERROR = 2  # UTF-8 JSON object with an "error" key
+
+# Bytes of message bodies currently kept in memory, see MESSAGE_MEMORY_SIZE
+_memory_used = 0
+_memory_lock = threading.Lock()
+
+
+def _reserve_memory(size: int) -> bool:
+    global _memory_used
+    with _memory_lock:
+        if _memory_used + size > MESSAGE_MEMORY_SIZE:
+            return False
+        _memory_used += size
+        return True
+
+
+def _release_memory(size: int) -> None:
+    global _memory_used
+    with _memory_lock:
+        _memory_used -= size
+
+
+def check_message_size(size: Optional[int], max_size: int = MAX_MESSAGE_SIZE) -> None:
+    if max_size and size is not None and size > max_size:
+        raise MessageTooLargeError(
+            f"Message exceeds the maximum allowed size of {max_size} bytes!"
+        )
+
+
+@contextmanager
+def spool_stream(
+    stream: BinaryIO,
+    max_size: int = MAX_MESSAGE_SIZE,
+    spool_size: int = MESSAGE_SPOOL_SIZE,
+) -> Iterator[BinaryIO]:
+    """Copy a request stream into memory, moving it to a temporary file once
+    more than spool_size bytes have been read, or once MESSAGE_MEMORY_SIZE
+    is used up by concurrent requests.
+
+    Raises:
+        MessageTooLargeError: If the stream holds more than max_size bytes.
+    """
+    spool = io.BytesIO()
+    size = 0
+    in_memory = 0
+    try:
+        while True:
+            chunk = stream.read(READ_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            check_message_size(size, max_size)
+            if isinstance(spool, io.BytesIO):
+                if size <= spool_size and _reserve_memory(len(chunk)):
+                    in_memory += len(chunk)
+                else:
+                    spooled = tempfile.TemporaryFile()
+                    spooled.write(spool.getbuffer())
+                    spool.close()
+                    spool = spooled
+                    _release_memory(in_memory)
+                    in_memory = 0
+            spool.write(chunk)
+        spool.seek(0)
+        yield spool
+    finally:
+        spool.close()
+        _release_memory(in_memory)
+
+
+def release(view: memoryview) -> None:
+    try:
+        view.release()
+    except BufferError:
+        # Something still views the buffer, it is released once collected
+        pass
+
+
+@contextmanager
+def message_buffer(file: BinaryIO) -> Iterator[memoryview]:
+    """View the contents of a file without copying them: the buffer of an
+    in-memory file, or a read-only memory map of a file on disk.
+
+    The view is only valid inside the with block.
+    """
+    if isinstance(file, io.BytesIO):
+        view = file.getbuffer()
+        try:
+            yield view
+        finally:
+            release(view)
+        return
+
+    file.seek(0, os.SEEK_END)
+    if file.tell() == 0:
+        # Empty files can not be memory mapped
+        yield memoryview(b"")
+        return
+
+    mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        release(view)
+        try:
+            mapped.close()
+        except BufferError:
+            pass
+
+
+@contextmanager
+def request_message(
+    stream: BinaryIO,
+    content_length: Optional[int],
+    max_size: int = MAX_MESSAGE_SIZE,
+    spool_size: int = MESSAGE_SPOOL_SIZE,
+) -> Iterator[memoryview]:
+    """Read a message body from a request stream into a spooled buffer.
+
+    Args:
+        stream: Stream of the request body.
+        content_length: Announced length of the body, checked before reading.
+        max_size: Maximum size of the body in bytes, unlimited when 0.
+        spool_size: Size above which the body is kept on disk.
+    Returns:
+        buffer: Memory view of the body, valid inside the with block.
+    Raises:
+        MessageTooLargeError: If the body is larger than max_size.
+    """
+    check_message_size(content_length, max_size)
+    with spool_stream(stream, max_size, spool_size) as spool:
+        with message_buffer(spool) as buffer:
+            yield buffer
+
+
+def stream_response(
+    payload: bytes,
+    chunk_size: int = RESPONSE_CHUNK_SIZE,
+    mimetype: str = "application/octet-stream",
+) -> Response:
+    """Send a payload as is, or as a chunked response when it is larger than
+    chunk_size, so the server never copies it whole into its write buffer."""
+    if len(payload) <= chunk_size:
+        return Response(response=payload, status=200, mimetype=mimetype)
+
+    def chunks() -> Iterator[bytes]:
+        view = memoryview(payload)
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset : offset + chunk_size])
+
+    return Response(
+        response=chunks(), status=200, mimetype=mimetype, direct_passthrough=True
+    )
+
+
+def _read_varint(buffer: memoryview, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(buffer):
+            raise InvalidParameterValueError("Truncated message!")
+        byte = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def split_data_message(buffer: memoryview) -> Tuple[str, memoryview]:
+    """Read the envelope of a serialized syft message, a DataMessage of
+    obj_type (field 1) and content (field 2), without copying the content.
+
+    Returns:
+        result: Tuple (obj_type, content), content being a view of buffer.
+    Raises:
+        InvalidParameterValueError: If buffer is not a DataMessage.
+    """
+    obj_type, content = "", buffer[0:0]
+    offset = 0
+    try:
+        while offset < len(buffer):
+            key, offset = _read_varint(buffer, offset)
+            field, wire_type = key >> 3, key & 0x7
+            if wire_type == 0:
+                _, offset = _read_varint(buffer, offset)
+                continue
+            if wire_type in (1, 5):
+                offset += 8 if wire_type == 1 else 4
+                continue
+            if wire_type != 2:
+                raise InvalidParameterValueError("Invalid message!")
+            length, offset = _read_varint(buffer, offset)
+            if offset + length > len(buffer):
+                raise InvalidParameterValueError("Truncated message!")
+            if field == 1:
+                obj_type = str(buffer[offset : offset + length], "utf-8")
+            elif field == 2:
+                content.release()
+                content = buffer[offset : offset + length]
+            offset += length
+    except BaseException:
+        content.release()
+        raise
+    return obj_type, content
+
+
+def split_frames(buffer: memoryview) -> List[memoryview]:
+    """Split a batch into views of its length prefixed messages.
+
+    The whole batch is checked before any message is returned, so that a
+    malformed batch is rejected without delivering part of it.
+
+    Raises:
+        InvalidParameterValueError: If a frame runs past the end of the batch.
+    """
+    frames = []
+    offset = 0
+    try:
+        while offset < len(buffer):
+            if offset + FRAME_LENGTH.size > len(buffer):
+                raise InvalidParameterValueError("Truncated message frame!")
+            (length,) = FRAME_LENGTH.unpack_from(buffer, offset)
+            offset += FRAME_LENGTH.size
+            if offset + length > len(buffer):
+                raise InvalidParameterValueError("Truncated message frame!")
+            frames.append(buffer[offset : offset + length])
+            offset += length
+    except BaseException:
+        # Views left on the buffer would keep it from being closed
+        for frame in frames:
+            frame.release()
+        raise
+    return frames
+
+
+def stream_frames(
+    replies: Iterable[Tuple[int, bytes]],
+    chunk_size: int = RESPONSE_CHUNK_SIZE,
+    mimetype: str = "application/octet-stream",
+) -> Response:
+    """Stream the (status, payload) replies of a batch as a chunked response
+    of status and length prefixed frames, each sent as soon as replies
+    produces it."""
+
+    def chunks() -> Iterator[bytes]:
+        for status, payload in replies:
+            yield REPLY_HEADER.pack(status, len(payload))
+            view = memoryview(payload)
+            for offset in range(0, len(view), chunk_size):
+                yield bytes(view[offset : offset + chunk_size])
+
+    return Response(
+        response=chunks(), status=200, mimetype=mimetype, direct_passthrough=True
+    )
@@ -0,0 +1,57 @@
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.database.dataset.datasetgroup import BinObjDataset
+from src.main.core.database.dataset.datasetgroup import Dataset
+from src.main.core.database.dataset.datasetgroup import DatasetTag
+from src.main.core.database.store_cache import ObjectCache
+from src.main.core.database.store_disk import DiskObjectStore
+from src.main.core.datasets.dataset_ops import delete_dataset
+from src.main.core.datasets.dataset_ops import index_dataset_tags
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObjDataset).delete()
+        database.session.query(DatasetTag).delete()
+        database.session.query(Dataset).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(BinObject).delete()
+        database.session.query(BinObjectChunk).delete()
+        database.session.query(BinBlob).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def test_delete_dataset_invalidates_cache(client, database, cleanup):
+    disk_store = DiskObjectStore(database, cache=ObjectCache(max_bytes=1024 * 1024))
+    _id = UID()
+    disk_store[_id] = StorableObject(id=_id, data=th.tensor([1, 2, 3]))
+
+    database.session.add(Dataset(id="dataset", tags=["tag"]))
+    index_dataset_tags("dataset", ["tag"])
+    database.session.add(
+        BinObjDataset(name="tensor", dataset="dataset", obj=str(_id.value))
+    )
+    database.session.commit()
+
+    # Cached by the read
+    assert th.equal(disk_store[_id].data, th.tensor([1, 2, 3]))
+    assert disk_store.cache.get(str(_id.value))[0]
+
+    delete_dataset("dataset", disk_store)
+
+    assert not disk_store.cache.get(str(_id.value))[0]
+    assert disk_store.get_object(_id) is None
+    assert database.session.query(BinBlob).count() == 0
+    assert database.session.query(Dataset).count() == 0
+    assert database.session.query(DatasetTag).count() == 0
+    assert database.session.query(BinObjDataset).count() == 0
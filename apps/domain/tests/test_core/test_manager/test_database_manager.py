@@ -0,0 +1,96 @@
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.manager.database_manager import DatabaseManager
+from src.main.core.model_centric.files.asset_file import AssetFile
+
+
+class Groups(DatabaseManager):
+    schema = Group
+
+    def __init__(self, database):
+        self._schema = Groups.schema
+        self.db = database
+
+
+class AssetFiles(DatabaseManager):
+    schema = AssetFile
+
+    def __init__(self, database):
+        self._schema = AssetFiles.schema
+        self.db = database
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(Group).delete()
+        database.session.query(AssetFile).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def groups(database, cleanup):
+    groups = Groups(database)
+    for name in ["a", "b", "a", "c", "a"]:
+        groups.register(name=name)
+    return groups
+
+
+def test_last(groups):
+    ids = [group.id for group in groups.query(name="a")]
+    assert groups.last(name="a").id == max(ids)
+    assert groups.last(name="missing") is None
+
+
+def test_count(groups):
+    assert groups.count() == 5
+    assert groups.count(name="a") == 3
+    assert groups.count(name="missing") == 0
+
+
+def test_exists(groups):
+    assert groups.exists(name="b")
+    assert not groups.exists(name="missing")
+    assert groups.contain(name="c")
+
+
+def test_paginate(groups):
+    ids = sorted(group.id for group in groups.all())
+
+    first = groups.paginate(limit=2)
+    assert [group.id for group in first] == ids[:2]
+
+    second = groups.paginate(after=first[-1].id, limit=2)
+    assert [group.id for group in second] == ids[2:4]
+
+    last = groups.paginate(after=second[-1].id, limit=2)
+    assert [group.id for group in last] == ids[4:]
+    assert groups.paginate(after=ids[-1]) == []
+
+
+def test_paginate_filter(groups):
+    ids = sorted(group.id for group in groups.query(name="a"))
+    page = groups.paginate(after=ids[0], name="a")
+    assert [group.id for group in page] == ids[1:]
+
+
+def test_paginate_composite_primary_key(database, cleanup):
+    asset_files = AssetFiles(database)
+    keys = [("plan", 2, ""), ("checkpoint", 1, ""), ("plan", 1, "ts"), ("plan", 1, "")]
+    for kind, ref_id, format in keys:
+        asset_files.register(kind=kind, ref_id=ref_id, format=format)
+    keys.sort()
+
+    first = asset_files.paginate(limit=2)
+    assert [(f.kind, f.ref_id, f.format) for f in first] == keys[:2]
+
+    last = first[-1]
+    second = asset_files.paginate(after=(last.kind, last.ref_id, last.format))
+    assert [(f.kind, f.ref_id, f.format) for f in second] == keys[2:]
+
+    with pytest.raises(ValueError):
+        asset_files.paginate(after="plan")
@@ -0,0 +1,89 @@
+# stdlib
+import os
+
+# third party
+import pytest
+from src.main.core.model_centric.files.asset_file import AssetFile
+from src.main.core.model_centric.files.asset_file_manager import AssetFileManager
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(AssetFile).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def asset_files(database, cleanup, tmp_path):
+    return AssetFileManager(database, directory=str(tmp_path))
+
+
+def test_store(asset_files):
+    path = asset_files.store("checkpoint", 1, b"value")
+    with open(path, "rb") as f:
+        assert f.read() == b"value"
+
+    # Content addressed: identical values share their file
+    assert asset_files.store("plan", 1, b"value", "ts") == path
+    assert asset_files.store("plan", 2, b"other", "ts") != path
+    assert asset_files.store("plan", 3, None, "tfjs") is None
+
+
+def test_store_write_failure(database, cleanup, tmp_path):
+    # A file where the directory should be makes every write fail
+    directory = tmp_path / "assets"
+    directory.write_bytes(b"")
+    asset_files = AssetFileManager(database, directory=str(directory))
+
+    assert asset_files.store("checkpoint", 1, b"value") is None
+    assert asset_files.path("checkpoint", 1, lambda: b"value") is None
+    assert database.session.query(AssetFile).count() == 0
+
+
+def test_path_materializes_missing_files(asset_files):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return b"value"
+
+    path = asset_files.path("checkpoint", 1, load)
+    assert asset_files.path("checkpoint", 1, load) == path
+    assert loads == [1]
+
+    os.remove(path)
+    assert asset_files.path("checkpoint", 1, load) == path
+    assert os.path.exists(path)
+    assert loads == [1, 1]
+
+
+def test_release(asset_files):
+    shared = asset_files.store("checkpoint", 1, b"value")
+    asset_files.store("checkpoint", 2, b"value")
+    single = asset_files.store("checkpoint", 3, b"other")
+
+    paths = asset_files.release("checkpoint", [1, 3])
+    asset_files.db.session.commit()
+    assert paths == [single]
+
+    asset_files.remove_files(paths)
+    assert not os.path.exists(single)
+    assert os.path.exists(shared)
+
+
+def test_disabled(database, cleanup):
+    asset_files = AssetFileManager(database, directory=None)
+    assert asset_files.store("checkpoint", 1, b"value") is None
+    assert asset_files.path("checkpoint", 1, lambda: b"value") is None
+
+
+def test_accel_uri(database, tmp_path):
+    asset_files = AssetFileManager(
+        database, directory=str(tmp_path), accel_location="/_assets/"
+    )
+    path = os.path.join(str(tmp_path), "ab", "abcd")
+    assert asset_files.accel_uri(path) == "/_assets/ab/abcd"
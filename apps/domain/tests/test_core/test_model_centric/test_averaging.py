@@ -0,0 +1,47 @@
+# third party
+from src.main.core.model_centric.cycles.averaging import apply_avg
+from src.main.core.model_centric.cycles.fed_avg import add_diff
+from src.main.core.model_centric.models.model_manager import ModelManager
+import torch as th
+
+SHAPES = [(4, 3), (4,), (2, 2)]
+
+
+def serialize(params):
+    return ModelManager.serialize_model_params(params)
+
+
+def test_apply_avg():
+    model_params = [th.randn(shape) for shape in SHAPES]
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(3)]
+
+    params = ModelManager.unserialize_model_params(
+        apply_avg(serialize(model_params), [serialize(diff) for diff in diffs])
+    )
+
+    for i, param in enumerate(params):
+        expected = model_params[i] - sum(diff[i] for diff in diffs) / len(diffs)
+        assert th.allclose(param, expected)
+
+
+def test_apply_avg_aggregate():
+    model_params = [th.randn(shape) for shape in SHAPES]
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(3)]
+
+    flat_sum = None
+    for diff in diffs:
+        flat_sum = add_diff(flat_sum, diff)
+
+    from_aggregate = apply_avg(
+        serialize(model_params),
+        [],
+        aggregate=serialize([flat_sum]),
+        num_diffs=len(diffs),
+    )
+    from_diffs = apply_avg(serialize(model_params), [serialize(diff) for diff in diffs])
+
+    for a, b in zip(
+        ModelManager.unserialize_model_params(from_aggregate),
+        ModelManager.unserialize_model_params(from_diffs),
+    ):
+        assert th.allclose(a, b)
@@ -0,0 +1,39 @@
+# third party
+import pytest
+from src.main.core.model_centric.models.checkpoint_delta import decode_delta
+from src.main.core.model_centric.models.checkpoint_delta import encode_delta
+import torch as th
+
+SHAPES = [(64, 32), (32,), ()]
+
+
+def test_delta_round_trip():
+    base = [th.randn(shape) for shape in SHAPES]
+    params = [param - 0.01 * th.randn(param.shape) for param in base]
+
+    delta = encode_delta(base, params)
+    decoded = decode_delta(base, delta)
+
+    for param, expected in zip(decoded, params):
+        assert param.dtype == expected.dtype
+        assert th.equal(param, expected)
+
+
+def test_delta_smaller_than_params():
+    base = [th.randn(shape) for shape in SHAPES]
+    params = [param - 1e-4 * th.randn(param.shape) for param in base]
+
+    delta = encode_delta(base, params)
+    assert len(delta) < sum(param.numel() * 4 for param in params)
+
+
+def test_delta_mismatch():
+    base = [th.randn(shape) for shape in SHAPES]
+
+    assert encode_delta(base, base[:-1]) is None
+    assert encode_delta(base, [th.randn(4, 4)] + base[1:]) is None
+    assert encode_delta(base, [base[0].double()] + base[1:]) is None
+
+    delta = encode_delta(base, base)
+    with pytest.raises(ValueError):
+        decode_delta(base[:-1], delta)
@@ -0,0 +1,165 @@
+# stdlib
+import importlib
+
+# third party
+import pytest
+from src.main.core.model_centric.cycles import averaging
+from src.main.core.model_centric.cycles.cycle import Cycle
+from src.main.core.model_centric.cycles.cycle_aggregate import CycleAggregate
+from src.main.core.model_centric.cycles.cycle_manager import CycleManager
+from src.main.core.model_centric.cycles.worker_cycle import WorkerCycle
+from src.main.core.model_centric.models import model_manager
+from src.main.core.model_centric.models.ai_model import Model
+from src.main.core.model_centric.models.ai_model import ModelCheckPoint
+from src.main.core.model_centric.models.ai_model import ModelCheckPointDelta
+from src.main.core.model_centric.processes import process_manager
+from src.main.core.model_centric.processes.config import Config
+from src.main.core.model_centric.syft_assets.plan import Plan
+from src.main.core.model_centric.workers.worker import Worker
+import torch as th
+
+# The package exports the CycleManager instance under the module's name
+cycle_manager_module = importlib.import_module(
+    "src.main.core.model_centric.cycles.cycle_manager"
+)
+
+SHAPES = [(4, 3), (4,)]
+NUM_WORKERS = 3
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        for table in [
+            WorkerCycle,
+            CycleAggregate,
+            Cycle,
+            Worker,
+            ModelCheckPointDelta,
+            ModelCheckPoint,
+            Model,
+            Plan,
+            Config,
+        ]:
+            database.session.query(table).delete()
+        database.session.commit()
+        # Drops the cached configs along with the processes
+        process_manager.delete()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def no_tasks(monkeypatch):
+    # Cycles are completed explicitly by the tests
+    monkeypatch.setattr(cycle_manager_module, "run_task_once", lambda *a, **kw: None)
+
+
+def start_cycle(database, incremental_avg):
+    process = process_manager.create(
+        {"name": "process", "version": "1.0"},
+        {},
+        {},
+        {"incremental_avg": incremental_avg, "num_cycles": 1},
+        None,
+    )
+    model_params = [th.randn(shape) for shape in SHAPES]
+    model_manager.create(model_manager.serialize_model_params(model_params), process)
+
+    manager = CycleManager(database)
+    cycle = manager.create(process.id, "1.0", None)
+    for i in range(NUM_WORKERS):
+        worker = Worker(id=f"worker-{i}")
+        database.session.add(worker)
+        manager.assign(worker, cycle, f"key-{i}")
+    database.session.commit()
+    return manager, process, cycle, model_params
+
+
+def report(manager, diffs):
+    for i, diff in enumerate(diffs):
+        manager.submit_worker_diff(
+            f"worker-{i}", f"key-{i}", model_manager.serialize_model_params(diff)
+        )
+
+
+def assert_averaged(process, model_params, diffs):
+    model = model_manager.get(fl_process_id=process.id)
+    checkpoint = model_manager.load(model_id=model.id)
+    assert checkpoint.number == 2
+
+    params = model_manager.unserialize_model_params(
+        model_manager.load_value(checkpoint)
+    )
+    for i, param in enumerate(params):
+        expected = model_params[i] - sum(diff[i] for diff in diffs) / len(diffs)
+        assert th.allclose(param, expected)
+
+
+def test_complete_cycle_from_aggregate(database, cleanup, no_tasks, monkeypatch):
+    manager, process, cycle, model_params = start_cycle(database, True)
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(NUM_WORKERS)]
+    report(manager, diffs)
+
+    aggregate = database.session.query(CycleAggregate).get(cycle.id)
+    assert aggregate.num_diffs == NUM_WORKERS
+
+    # Averaged without reading the reported diffs again
+    monkeypatch.setattr(manager, "_reported_diffs", lambda cycle_id: iter([]))
+    manager.complete_cycle(cycle.id)
+
+    assert_averaged(process, model_params, diffs)
+    assert database.session.query(CycleAggregate).get(cycle.id) is None
+
+
+def test_complete_cycle_from_diffs(database, cleanup, no_tasks):
+    manager, process, cycle, model_params = start_cycle(database, False)
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(NUM_WORKERS)]
+    report(manager, diffs)
+
+    aggregate = database.session.query(CycleAggregate).get(cycle.id)
+    assert aggregate.num_diffs == 0
+
+    manager.complete_cycle(cycle.id)
+
+    assert_averaged(process, model_params, diffs)
+
+
+@pytest.mark.parametrize("incremental_avg", [True, False])
+def test_report_keeps_first_diff(database, cleanup, no_tasks, incremental_avg):
+    manager, process, cycle, model_params = start_cycle(database, incremental_avg)
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(NUM_WORKERS)]
+    report(manager, diffs)
+    report(manager, [[th.randn(shape) for shape in SHAPES]])
+
+    if incremental_avg:
+        aggregate = database.session.query(CycleAggregate).get(cycle.id)
+        assert aggregate.num_diffs == NUM_WORKERS
+
+    manager.complete_cycle(cycle.id)
+
+    assert_averaged(process, model_params, diffs)
+
+
+@pytest.mark.parametrize("incremental_avg", [True, False])
+def test_complete_cycle_in_pool(
+    database, cleanup, no_tasks, monkeypatch, incremental_avg
+):
+    # The worker side runs in this process, on the engine of the tests
+    monkeypatch.setattr(averaging, "_engine", database.engine)
+    monkeypatch.setattr(cycle_manager_module, "AGGREGATION_PROCESSES", 1)
+    monkeypatch.setattr(
+        cycle_manager_module,
+        "apply_avg_in_pool",
+        lambda database_url, *args, **kwargs: averaging._apply_avg_cycle(
+            *args, **kwargs
+        ),
+    )
+
+    manager, process, cycle, model_params = start_cycle(database, incremental_avg)
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(NUM_WORKERS)]
+    report(manager, diffs)
+    manager.complete_cycle(cycle.id)
+
+    assert_averaged(process, model_params, diffs)
@@ -0,0 +1,70 @@
+# stdlib
+from functools import reduce
+
+# third party
+import pytest
+from src.main.core.model_centric.cycles.fed_avg import add_diff
+from src.main.core.model_centric.cycles.fed_avg import average_diffs
+from src.main.core.model_centric.cycles.fed_avg import unflatten_params
+import torch as th
+
+SHAPES = [(4, 3, 3, 3), (4,), (), (10, 4)]
+
+
+def test_average_diffs():
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(5)]
+
+    diff_avg = average_diffs(iter(diffs))
+
+    for i, param_avg in enumerate(diff_avg):
+        expected = reduce(th.add, [diff[i] for diff in diffs]) / len(diffs)
+        assert param_avg.shape == expected.shape
+        assert th.allclose(param_avg, expected)
+
+
+def test_average_diffs_promotes_integers():
+    diffs = [[th.tensor([1, 2])], [th.tensor([2, 2])]]
+    (param_avg,) = average_diffs(diffs)
+    assert param_avg.is_floating_point()
+    assert th.equal(param_avg, th.tensor([1.5, 2.0]))
+
+
+def test_average_diffs_mixed_dtypes():
+    dtypes = [th.float16, th.float64, th.int64]
+    diffs = [
+        [th.tensor([1, 2], dtype=dtype) * (i + 1) for dtype in dtypes] for i in range(2)
+    ]
+
+    diff_avg = average_diffs(diffs)
+
+    # Each param keeps its own type, integers average to floats
+    assert [param.dtype for param in diff_avg] == [
+        th.float16,
+        th.float64,
+        th.get_default_dtype(),
+    ]
+    for param_avg in diff_avg:
+        assert th.equal(param_avg, th.tensor([1.5, 3.0], dtype=param_avg.dtype))
+
+
+def test_average_diffs_errors():
+    with pytest.raises(ValueError):
+        average_diffs([])
+
+    with pytest.raises(ValueError):
+        average_diffs([[th.zeros(2)], [th.zeros(3)]])
+
+
+def test_add_diff():
+    diffs = [[th.randn(shape) for shape in SHAPES] for _ in range(5)]
+
+    flat_sum = None
+    for diff in diffs:
+        flat_sum = add_diff(flat_sum, diff)
+    diff_avg = unflatten_params(flat_sum / len(diffs), [th.Size(s) for s in SHAPES])
+
+    for param_avg, expected in zip(diff_avg, average_diffs(diffs)):
+        assert th.allclose(param_avg, expected)
+
+    with pytest.raises(ValueError):
+        add_diff(flat_sum, [th.zeros(2)])
@@ -0,0 +1,161 @@
+# third party
+import pytest
+from src.main.core.exceptions import ModelNotFoundError
+from src.main.core.model_centric.models.ai_model import Model
+from src.main.core.model_centric.models.ai_model import ModelCheckPoint
+from src.main.core.model_centric.models.ai_model import ModelCheckPointDelta
+from src.main.core.model_centric.models.checkpoint_delta import decode_delta
+from src.main.core.model_centric.models.model_manager import ModelManager
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(ModelCheckPointDelta).delete()
+        database.session.query(ModelCheckPoint).delete()
+        database.session.query(Model).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def model(database, cleanup):
+    manager = ModelManager(database)
+    model = manager._models.register()
+    for i in range(10):
+        manager.save(model.id, bytes([i]))
+    return model
+
+
+def numbers(database, model_id):
+    return sorted(
+        number
+        for (number,) in database.session.query(ModelCheckPoint.number).filter_by(
+            model_id=model_id
+        )
+    )
+
+
+def test_save_numbers_checkpoints(database, model):
+    manager = ModelManager(database)
+    assert numbers(database, model.id) == list(range(1, 11))
+    assert manager.load(model_id=model.id, alias="latest").number == 10
+
+
+def test_load_not_found(database, cleanup):
+    manager = ModelManager(database)
+    # DatabaseManager.last returns None, mapped to the not found error
+    with pytest.raises(ModelNotFoundError):
+        manager.load(model_id=1, alias="latest")
+    with pytest.raises(ModelNotFoundError):
+        manager.get(fl_process_id=1)
+
+
+def test_load_info(database, model):
+    manager = ModelManager(database)
+    checkpoint = manager.load(model_id=model.id, alias="latest")
+    info = manager.load_info(model_id=model.id, alias="latest")
+    assert info == (checkpoint.id, 10, model.id)
+    assert manager.load_value(info) == checkpoint.value
+
+
+def test_compact_keep_latest(database, model):
+    manager = ModelManager(database)
+
+    assert manager.compact(model.id, keep_latest=3) == 7
+    assert numbers(database, model.id) == [8, 9, 10]
+
+    # Numbers keep growing once older checkpoints are gone
+    assert manager.save(model.id, b"new").number == 11
+    assert manager.load(model_id=model.id, alias="latest").value == b"new"
+
+
+def test_compact_keep_every_and_aliases(database, model):
+    manager = ModelManager(database)
+    manager._model_checkpoints.modify(
+        {"model_id": model.id, "number": 1}, {"alias": "initial"}
+    )
+
+    manager.compact(model.id, keep_latest=2, keep_every=4)
+    assert numbers(database, model.id) == [1, 4, 8, 9, 10]
+
+
+def test_compact_disabled(database, model):
+    manager = ModelManager(database)
+    assert manager.compact(model.id, keep_latest=0) == 0
+    assert numbers(database, model.id) == list(range(1, 11))
+
+
+def params_checkpoints(database, model, count, keyframe_interval):
+    manager = ModelManager(database)
+    params = [th.randn(8, 4), th.randn(4)]
+    values = []
+    for _ in range(count):
+        params = [param - 0.01 * th.randn(param.shape) for param in params]
+        values.append(params)
+        manager.save(
+            model.id,
+            ModelManager.serialize_model_params(params),
+            keyframe_interval=keyframe_interval,
+        )
+    return values
+
+
+def assert_checkpoint(manager, model, number, expected):
+    checkpoint = manager.load(model_id=model.id, number=number)
+    params = ModelManager.unserialize_model_params(manager.load_value(checkpoint))
+    for param, value in zip(params, expected):
+        assert th.equal(param, value)
+
+
+def test_delta_checkpoints(database, cleanup):
+    manager = ModelManager(database)
+    model = manager._models.register()
+    values = params_checkpoints(database, model, 10, keyframe_interval=4)
+
+    deltas = database.session.query(ModelCheckPointDelta).count()
+    # Checkpoints 1, 5 and 9 are full snapshots
+    assert deltas == 7
+
+    # Rebuilt from the database rather than the cache
+    manager = ModelManager(database)
+    for number, expected in enumerate(values, start=1):
+        assert_checkpoint(manager, model, number, expected)
+
+
+def test_compact_delta_checkpoints(database, cleanup):
+    manager = ModelManager(database)
+    model = manager._models.register()
+    values = params_checkpoints(database, model, 10, keyframe_interval=4)
+
+    manager = ModelManager(database)
+    manager.compact(model.id, keep_latest=3, keep_every=3)
+    assert numbers(database, model.id) == [3, 6, 8, 9, 10]
+
+    manager = ModelManager(database)
+    for number in numbers(database, model.id):
+        assert_checkpoint(manager, model, number, values[number - 1])
+
+
+def test_load_delta(database, cleanup):
+    manager = ModelManager(database)
+    model = manager._models.register()
+    values = params_checkpoints(database, model, 6, keyframe_interval=4)
+    latest = manager.load(model_id=model.id, alias="latest")
+
+    for base_number in [5, 2]:
+        base = manager.load(model_id=model.id, number=base_number)
+        delta, codec = manager.load_delta(latest, base_number)
+        params = decode_delta(
+            ModelManager.unserialize_model_params(manager.load_value(base)),
+            delta,
+            codec,
+        )
+        for param, value in zip(params, values[-1]):
+            assert th.equal(param, value)
+
+    assert manager.load_delta(latest, 6) is None
+    assert manager.load_delta(latest, 42) is None
@@ -0,0 +1,107 @@
+# third party
+import pytest
+from sqlalchemy import event
+from src.main.core.exceptions import PlanNotFoundError
+from src.main.core.model_centric.processes.fl_process import FLProcess
+from src.main.core.model_centric.syft_assets.plan import Plan
+from src.main.core.model_centric.syft_assets.plan_manager import PlanManager
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(Plan).delete()
+        database.session.query(FLProcess).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def test_load_value_skips_avg_plan(database, cleanup):
+    manager = PlanManager(database)
+    process = FLProcess(name="process", version="1.0")
+    database.session.add(process)
+    database.session.commit()
+    manager.register(process, b"avg plan", avg_plan=True)
+
+    plan_id, value = manager.load_avg_plan(process.id)
+    assert value == b"avg plan"
+
+    # The cached avg plan is not served as a client plan
+    with pytest.raises(PlanNotFoundError):
+        manager.load_value(plan_id)
+
+
+@pytest.fixture
+def queries(database):
+    """Statements sent to the database."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(database.engine, "before_cursor_execute", count)
+
+
+def host(database, manager):
+    process = FLProcess(name="process", version="1.0")
+    database.session.add(process)
+    database.session.commit()
+    manager.register(process, {"training_plan": b"plan"}, avg_plan=False)
+    return process, manager.first(fl_process_id=process.id)
+
+
+def test_load_value_cached(database, cleanup, queries):
+    manager = PlanManager(database)
+    process, plan = host(database, manager)
+
+    assert manager.load_value(plan.id) == (process.id, b"plan")
+    queries.clear()
+    assert manager.load_value(plan.id) == (process.id, b"plan")
+    assert queries == []
+
+    # Formats are cached apart
+    assert manager.load_value(plan.id, "ts") == (process.id, None)
+
+
+def test_load_value_not_found(database, cleanup):
+    manager = PlanManager(database)
+    with pytest.raises(PlanNotFoundError):
+        manager.load_value(1)
+    with pytest.raises(PlanNotFoundError):
+        manager.load_value("not an id")
+
+    # Misses are not cached
+    process, plan = host(database, manager)
+    assert manager.load_value(plan.id) == (process.id, b"plan")
+
+
+def test_load_plan_deserialized_once(database, cleanup, monkeypatch):
+    manager = PlanManager(database)
+    deserialized = []
+
+    def deserialize_plan(value):
+        deserialized.append(value)
+        return object()
+
+    monkeypatch.setattr(manager, "deserialize_plan", deserialize_plan)
+    plan = manager.load_plan(1, b"plan")
+    assert manager.load_plan(1, b"plan") is plan
+    assert deserialized == [b"plan"]
+
+
+def test_delete_invalidates(database, cleanup, monkeypatch):
+    manager = PlanManager(database)
+    process, plan = host(database, manager)
+    monkeypatch.setattr(manager, "deserialize_plan", lambda value: object())
+    manager.load_value(plan.id)
+    cached_plan = manager.load_plan(plan.id, b"plan")
+
+    manager.delete(fl_process_id=process.id)
+
+    with pytest.raises(PlanNotFoundError):
+        manager.load_value(plan.id)
+    assert manager.load_plan(plan.id, b"plan") is not cached_plan
@@ -0,0 +1,149 @@
+# stdlib
+import importlib
+from types import SimpleNamespace
+
+# third party
+import pytest
+from sqlalchemy import event
+from src.main.core.exceptions import ProcessNotFoundError
+from src.main.core.model_centric.files import asset_files
+from src.main.core.model_centric.files.asset_file import AssetFile
+from src.main.core.model_centric.models import model_manager
+from src.main.core.model_centric.models.ai_model import Model
+from src.main.core.model_centric.models.ai_model import ModelCheckPoint
+from src.main.core.model_centric.processes.config import Config
+from src.main.core.model_centric.processes.fl_process import FLProcess
+from src.main.core.model_centric.processes.process_manager import ProcessManager
+from src.main.core.model_centric.syft_assets.plan import Plan
+from src.main.core.model_centric.syft_assets.protocol import Protocol
+
+# The package exports the ProcessManager instance under the module's name
+process_manager_module = importlib.import_module(
+    "src.main.core.model_centric.processes.process_manager"
+)
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        for table in [
+            AssetFile,
+            ModelCheckPoint,
+            Model,
+            Plan,
+            Protocol,
+            Config,
+            FLProcess,
+        ]:
+            database.session.query(table).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def queries(database):
+    """Statements sent to the database."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(database.engine, "before_cursor_execute", count)
+
+
+def host(manager, version, plans=None, protocols=None):
+    return manager.create(
+        {"name": "process", "version": version},
+        plans or {},
+        protocols or {},
+        {"version": version},
+        None,
+    )
+
+
+@pytest.mark.parametrize(
+    "query", [{"name": "process"}, {"name": "process", "version": "1.0"}]
+)
+def test_get_configs_cached(database, cleanup, queries, query):
+    manager = ProcessManager(database)
+    process = host(manager, "1.0")
+
+    server, _ = manager.get_configs(**query)
+    assert server == {"version": "1.0"}
+    assert manager.get_info(**query).id == process.id
+
+    queries.clear()
+    server, _ = manager.get_configs(**query)
+    assert server == {"version": "1.0"}
+    assert queries == []
+
+    # Callers get copies of the cached configs
+    server["version"] = "changed"
+    assert manager.get_configs(**query)[0] == {"version": "1.0"}
+
+
+def test_get_configs_not_found(database, cleanup):
+    manager = ProcessManager(database)
+    with pytest.raises(ProcessNotFoundError):
+        manager.get_configs(name="process")
+
+    # Misses are not cached
+    host(manager, "1.0")
+    assert manager.get_info(name="process").version == "1.0"
+
+
+def test_latest_version_invalidated(database, cleanup, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(
+        process_manager_module, "time", SimpleNamespace(monotonic=lambda: now[0])
+    )
+    manager = ProcessManager(database)
+    host(manager, "1.0")
+    assert manager.get_info(name="process").version == "1.0"
+
+    # Hosted by this worker, the new version is seen at once
+    host(manager, "2.0")
+    assert manager.get_info(name="process").version == "2.0"
+
+    # Hosted by another worker, it is seen once the cached entry expired
+    other = ProcessManager(database)
+    host(other, "3.0")
+    assert manager.get_info(name="process").version == "2.0"
+    now[0] += process_manager_module.PROCESS_LATEST_TTL
+    assert manager.get_info(name="process").version == "3.0"
+
+
+def test_delete_invalidates(database, cleanup):
+    manager = ProcessManager(database)
+    process = host(manager, "1.0")
+    assert manager.get_info(id=process.id).version == "1.0"
+
+    database.session.query(Plan).delete()
+    database.session.query(Config).delete()
+    database.session.commit()
+    manager.delete(id=process.id)
+
+    with pytest.raises(ProcessNotFoundError):
+        manager.get_configs(id=process.id)
+    with pytest.raises(ProcessNotFoundError):
+        manager.get_configs(name="process")
+
+
+def test_delete_releases_files(database, cleanup, monkeypatch, tmp_path):
+    monkeypatch.setattr(asset_files, "directory", str(tmp_path))
+    manager = ProcessManager(database)
+    process = host(
+        manager, "1.0", {"training_plan": b"plan"}, {"protocol": b"protocol"}
+    )
+    model_manager.create(b"checkpoint", process)
+    paths = [path for path in tmp_path.rglob("*") if path.is_file()]
+    assert len(paths) == 3
+
+    manager.delete(id=process.id)
+
+    assert database.session.query(AssetFile).count() == 0
+    assert not any(path.exists() for path in paths)
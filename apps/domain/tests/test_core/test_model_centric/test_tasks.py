@@ -0,0 +1,33 @@
+# stdlib
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+# third party
+from src.main.core.model_centric.tasks import cycle
+from src.main.core.model_centric.tasks.cycle import run_task_once
+
+
+def test_run_task_once_reruns_instead_of_dropping():
+    runs = []
+    release = threading.Event()
+    done = threading.Semaphore(0)
+
+    def task(key):
+        runs.append(key)
+        release.wait()
+        done.release()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        run_task_once("task_1", task, 1, task_executor=pool)
+        # Requested while task_1 runs: coalesced into a single rerun
+        run_task_once("task_1", task, 1, task_executor=pool)
+        run_task_once("task_1", task, 1, task_executor=pool)
+        # Independent tasks run in parallel
+        run_task_once("task_2", task, 2, task_executor=pool)
+
+        release.set()
+        for _ in range(3):
+            assert done.acquire(timeout=5)
+
+    assert sorted(runs) == [1, 1, 2]
+    assert not cycle._running and not cycle._rerun
@@ -0,0 +1,151 @@
+# third party
+import numpy as np
+import pandas as pd
+import pytest
+from src.main.core.database.bin_storage.bin_obj import BinBlob
+from src.main.core.database.bin_storage.bin_obj import BinObject
+from src.main.core.database.bin_storage.bin_obj import COMPRESSION_THRESHOLD
+from src.main.core.database.bin_storage.bin_obj import codecs
+from src.main.core.database.bin_storage.bin_obj import decode_chunks
+from src.main.core.database.bin_storage.bin_obj import encode_chunks
+from src.main.core.database.bin_storage.bin_obj import insert_blob
+from src.main.core.database.bin_storage.bin_obj import migrate_inline_binaries
+from src.main.core.database.bin_storage.bin_obj import put_blob
+from src.main.core.database.bin_storage.bin_obj import select_codec
+from src.main.core.database.bin_storage.native_format import native_encode
+from src.main.core.database.bin_storage.native_format import native_formats
+from syft import serialize
+import torch as th
+
+
+@pytest.mark.parametrize("codec", list(codecs))
+def test_codec_roundtrip(codec):
+    data = b"pygrid" * 1024
+    assert codecs[codec].decompress(codecs[codec].compress(data)) == data
+
+
+def test_select_codec_by_size():
+    assert select_codec("torch.Tensor", COMPRESSION_THRESHOLD - 1) == "none"
+    assert select_codec("torch.Tensor", COMPRESSION_THRESHOLD) != "none"
+
+
+def test_object_compressed_roundtrip(client, database):
+    tensor = th.zeros(COMPRESSION_THRESHOLD)
+    bin_obj = BinObject(id="compressed", object=tensor)
+
+    assert bin_obj.blob.codec != "none"
+    assert bin_obj.blob.size < COMPRESSION_THRESHOLD
+    assert th.all(th.eq(bin_obj.object, tensor))
+    database.session.rollback()
+
+
+@pytest.mark.parametrize(
+    "value,format_name",
+    [
+        (th.arange(12, dtype=th.float32).reshape(3, 4), "RawTensor"),
+        (np.arange(6, dtype=np.int64).reshape(2, 3).T, "RawArray"),
+        (pd.DataFrame({"a": [1, 2, 3], "b": [0.5, 1.5, 2.5]}), "RawDataFrame"),
+    ],
+)
+def test_native_format_roundtrip(value, format_name):
+    name, payload = native_encode(value)
+    assert name == format_name
+
+    decoded = native_formats[name].decode(bytes(payload))
+    if isinstance(value, pd.DataFrame):
+        pd.testing.assert_frame_equal(decoded, value)
+    else:
+        assert decoded.shape == value.shape
+        assert (decoded == value).all()
+
+
+def test_native_format_falls_back_to_protobuf():
+    assert native_encode(pd.DataFrame({"a": ["x", "y"]})) is None
+    assert native_encode(th.zeros(3, requires_grad=True)) is None
+
+
+def test_insert_blob_conflict(client, database):
+    blob = BinBlob(hash="conflict", codec="none", size=5, chunks=0, binary=b"value")
+    stored, inserted = insert_blob(database.session, blob)
+    assert inserted
+    database.session.commit()
+    database.session.expunge_all()
+
+    # Inserted concurrently by another writer: its blob is used instead
+    duplicate = BinBlob(hash="conflict", codec="none", size=5, chunks=0)
+    existing, inserted = insert_blob(database.session, duplicate)
+    assert not inserted
+    assert existing.binary == b"value"
+    assert duplicate not in database.session
+
+    database.session.delete(existing)
+    database.session.commit()
+
+
+def test_insert_blob_conflict_keeps_transaction(client, database):
+    blob = BinBlob(hash="kept", codec="none", size=5, chunks=0, binary=b"value")
+    insert_blob(database.session, blob)
+    insert_blob(database.session, BinBlob(hash="kept", codec="none", size=5, chunks=0))
+
+    # Nothing was committed by the conflicting insert
+    database.session.rollback()
+    assert database.session.query(BinBlob).filter_by(hash="kept").first() is None
+
+
+def test_migrate_inline_binaries(client, database):
+    tensor = th.arange(6, dtype=th.float32)
+    serialized = serialize(tensor)
+    legacy = BinObject(
+        id="legacy",
+        protobuf_name=serialized.__class__.__name__,
+        binary=serialized.SerializeToString(),
+    )
+    database.session.add(legacy)
+    database.session.commit()
+
+    # Read from the row until the payload is moved
+    assert th.all(th.eq(legacy.object, tensor))
+
+    migrate_inline_binaries(database.session)
+    database.session.commit()
+
+    bin_obj = database.session.query(BinObject).get("legacy")
+    assert bin_obj.binary is None
+    assert bin_obj.blob is not None
+    assert bin_obj.obj_type == "torch.Tensor"
+    assert th.all(th.eq(bin_obj.object, tensor))
+
+    blob = bin_obj.blob
+    database.session.delete(bin_obj)
+    database.session.delete(blob)
+    database.session.commit()
+
+
+@pytest.mark.parametrize("codec", list(codecs))
+def test_chunks_codec_roundtrip(codec):
+    data = b"pygrid" * 1024
+    chunks = list(encode_chunks(data, codec, chunk_size=1000))
+    assert decode_chunks(chunks, codec) == data
+    # Also readable by the one-shot codec
+    assert codecs[codec].decompress(b"".join(chunks)) == data
+
+
+def test_put_blob_chunked(client, database):
+    raw = b"pygrid" * COMPRESSION_THRESHOLD
+    blob = put_blob(database.session, raw, "torch.Tensor", chunk_size=1024)
+
+    assert blob.codec != "none"
+    assert blob.size < len(raw)
+    assert blob.chunks == -(-blob.size // 1024)
+    assert blob.content == raw
+    database.session.rollback()
+
+
+def test_put_blob_chunked_incompressible(client, database):
+    raw = np.random.default_rng(0).bytes(4 * COMPRESSION_THRESHOLD)
+    blob = put_blob(database.session, raw, "torch.Tensor", chunk_size=1024)
+
+    assert blob.codec == "none"
+    assert blob.size == len(raw)
+    assert blob.content == raw
+    database.session.rollback()
@@ -0,0 +1,32 @@
+# third party
+import pytest
+
+from src.main.core.database import *
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(DataMigration).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def test_apply_data_migration_once(client, database, cleanup):
+    runs = []
+
+    assert apply_data_migration("migration", lambda: runs.append(1))
+    assert not apply_data_migration("migration", lambda: runs.append(1))
+    assert runs == [1]
+    assert database.session.query(DataMigration).get("migration") is not None
+
+
+def test_apply_data_migration_rolls_back_on_error(client, database, cleanup):
+    def fail():
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        apply_data_migration("migration", fail)
+    assert database.session.query(DataMigration).get("migration") is None
@@ -1,12 +1,15 @@
 # stdlib
 from json import dumps
 from json import loads
+import os
 
 # third party
 import pytest
 import numpy as np
 import torch as th
 from flask import current_app as app
+from nacl.encoding import HexEncoder
+from nacl.signing import SigningKey
 from syft.core.common.uid import UID
 from sqlalchemy.exc import NoResultFound
 from syft.core.store.storeable_object import StorableObject
@@ -22,8 +25,12 @@ tensor2 = th.tensor([[-1, -2, -3, -4], [-100, -200, -300, -400]])
 def cleanup(database):
     yield
     try:
-        database.session.query(BinObject).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
         database.session.query(ObjectMetadata).delete()
+        database.session.query(BinObject).delete()
+        database.session.query(BinObjectChunk).delete()
+        database.session.query(BinBlob).delete()
         database.session.commit()
     except:
         database.session.rollback()
@@ -319,3 +326,217 @@ def test_values(client, database, cleanup):
     assert any(th.all(th.eq(tensor1, v)) for v in values_data)
     assert any(th.all(th.eq(tensor2, v)) for v in values_data)
     assert len(values_data) == 2
+
+
+def test_get_objects_of_type_filters_by_persisted_type(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+
+    id1 = UID()
+    storable1 = StorableObject(id=id1, data=tensor1)
+    disk_store.__setitem__(id1, storable1)
+
+    bin_obj = database.session.query(BinObject).get(str(id1.value))
+    assert bin_obj.obj_type == "torch.Tensor"
+
+    assert len(disk_store.get_objects_of_type(th.Tensor)) == 1
+    assert len(disk_store.get_objects_of_type(dict)) == 0
+
+
+def test__getitem__defers_payload(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    _id = UID()
+    storable = StorableObject(id=_id, data=tensor1, tags=["#lazy"])
+    disk_store.__setitem__(_id, storable)
+
+    retrieved = disk_store.__getitem__(_id)
+    assert retrieved.tags == ["#lazy"]
+    assert not retrieved.is_loaded
+
+    assert th.all(th.eq(retrieved.data, tensor1))
+    assert retrieved.is_loaded
+
+
+def test__setitem__chunked(client, database, cleanup):
+    disk_store = DiskObjectStore(database, chunk_size=64)
+    _id = UID()
+    storable = StorableObject(id=_id, data=th.arange(1000))
+    disk_store.__setitem__(_id, storable)
+
+    bin_obj = database.session.query(BinObject).get(str(_id.value))
+    blob = bin_obj.blob
+    chunks = database.session.query(BinObjectChunk).filter_by(blob=blob.hash)
+
+    assert blob.binary is None
+    assert blob.chunks == chunks.count()
+    assert blob.chunks == -(-blob.size // 64)
+    assert th.all(th.eq(disk_store.__getitem__(_id).data, th.arange(1000)))
+
+    disk_store.delete(_id)
+    assert chunks.count() == 0
+
+
+def test__setitem__memory_mapped(client, database, cleanup, tmp_path):
+    disk_store = DiskObjectStore(database, data_dir=str(tmp_path))
+    _id = UID()
+    tensor = th.arange(2**18, dtype=th.float32)
+    disk_store.__setitem__(_id, StorableObject(id=_id, data=tensor))
+
+    path = database.session.query(BinObject).get(str(_id.value)).blob.path
+    assert os.path.exists(path)
+
+    retrieved = disk_store.__getitem__(_id).data
+    assert isinstance(retrieved, th.Tensor)
+    assert th.all(th.eq(retrieved, tensor))
+
+    disk_store.delete(_id)
+    assert not os.path.exists(path)
+
+
+def test__setitem__deduplicates_payloads(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    id1, id2 = UID(), UID()
+    disk_store.__setitem__(id1, StorableObject(id=id1, data=tensor1))
+    disk_store.__setitem__(id2, StorableObject(id=id2, data=tensor1.clone()))
+
+    blobs = database.session.query(BinBlob)
+    assert blobs.count() == 1
+
+    # Rewriting an object with the same content keeps the shared blob
+    disk_store.__setitem__(id1, StorableObject(id=id1, data=tensor1))
+    assert blobs.count() == 1
+
+    disk_store.delete(id1)
+    assert blobs.count() == 1
+    assert th.all(th.eq(disk_store.__getitem__(id2).data, tensor1))
+
+    disk_store.delete(id2)
+    assert blobs.count() == 0
+
+
+def test_set_many(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    id1, id2 = UID(), UID()
+    disk_store.set_many(
+        [
+            (id1, StorableObject(id=id1, data=tensor1, tags=["#one"])),
+            (id2, StorableObject(id=id2, data=tensor2, tags=["#two"])),
+        ]
+    )
+
+    assert len(disk_store) == 2
+    assert disk_store.__getitem__(id1).tags == ["#one"]
+    assert th.all(th.eq(disk_store.__getitem__(id2).data, tensor2))
+
+    # Overwrites update the existing rows in place
+    disk_store.set_many([(id1, StorableObject(id=id1, data=tensor2, tags=["#new"]))])
+    assert len(disk_store) == 2
+    assert disk_store.__getitem__(id1).tags == ["#new"]
+    assert th.all(th.eq(disk_store.__getitem__(id1).data, tensor2))
+
+
+def test_set_many_rolls_back_on_error(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    _id = UID()
+
+    with pytest.raises(RuntimeError):
+        with disk_store.transaction():
+            disk_store.__setitem__(_id, StorableObject(id=_id, data=tensor1))
+            raise RuntimeError
+
+    assert len(disk_store) == 0
+
+
+def test_delete_many(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    ids = [UID() for _ in range(3)]
+    disk_store.set_many([(_id, StorableObject(id=_id, data=tensor1)) for _id in ids])
+
+    disk_store.delete_many(ids[:2] + [UID()])
+
+    assert disk_store.keys() == [ids[2]]
+    assert database.session.query(BinBlob).count() == 1
+
+
+def test_get_objects_with_tags(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    id1, id2, id3 = UID(), UID(), UID()
+    disk_store.set_many(
+        [
+            (id1, StorableObject(id=id1, data=tensor1, tags=["#diabetes", "#2020"])),
+            (id2, StorableObject(id=id2, data=tensor2, tags=["#diabetes"])),
+            (id3, StorableObject(id=id3, data=tensor1, tags=["#2020"])),
+        ]
+    )
+
+    matches = disk_store.get_objects_with_tags(["#diabetes", "#2020"])
+    assert [obj.id for obj in matches] == [id1]
+    assert len(disk_store.get_objects_with_tags(["#diabetes"])) == 2
+    assert disk_store.get_objects_with_tags(["#unknown"]) == []
+
+    # The index follows metadata updates and deletions
+    disk_store.__setitem__(id2, StorableObject(id=id2, data=tensor2, tags=["#2020"]))
+    assert len(disk_store.get_objects_with_tags(["#2020"])) == 3
+
+    disk_store.delete(id3)
+    assert len(disk_store.get_objects_with_tags(["#2020"])) == 2
+
+
+def test_get_objects_readable_by(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    owner = SigningKey.generate().verify_key
+    scientist = SigningKey.generate().verify_key
+    id1, id2 = UID(), UID()
+    disk_store.set_many(
+        [
+            (id1, StorableObject(id=id1, data=tensor1, read_permissions={owner: None})),
+            (id2, StorableObject(id=id2, data=tensor2, read_permissions={owner: None})),
+        ]
+    )
+
+    assert len(disk_store.get_objects_readable_by(owner)) == 2
+    assert disk_store.get_objects_readable_by(scientist) == []
+
+    disk_store.grant_permission(
+        id2, scientist.encode(encoder=HexEncoder).decode("utf-8")
+    )
+
+    readable = disk_store.get_objects_readable_by(scientist)
+    assert [obj.id for obj in readable] == [id2]
+    assert scientist in readable[0].read_permissions
+    assert owner in readable[0].read_permissions
+
+
+def test_get_objects_of_type_object(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    id1, id2 = UID(), UID()
+    disk_store.set_many(
+        [
+            (id1, StorableObject(id=id1, data=tensor1)),
+            (id2, StorableObject(id=id2, data={"key": "value"})),
+        ]
+    )
+
+    selected = disk_store.get_objects_of_type(object)
+    assert {obj.id for obj in selected} == {id1, id2}
+
+
+def test_get_objects_with_tags_readable_by(client, database, cleanup):
+    disk_store = DiskObjectStore(database)
+    owner = SigningKey.generate().verify_key
+    id1, id2, id3 = UID(), UID(), UID()
+    disk_store.set_many(
+        [
+            (
+                id1,
+                StorableObject(
+                    id=id1, data=tensor1, tags=["#2020"], read_permissions={owner: None}
+                ),
+            ),
+            (id2, StorableObject(id=id2, data=tensor2, tags=["#2020"])),
+            (id3, StorableObject(id=id3, data=tensor1, read_permissions={owner: None})),
+        ]
+    )
+
+    matches = disk_store.get_objects_with_tags(["#2020"], readable_by=owner)
+    assert [obj.id for obj in matches] == [id1]
+    assert len(disk_store.get_objects_with_tags([], readable_by=owner)) == 2
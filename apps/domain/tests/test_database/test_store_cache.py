@@ -0,0 +1,92 @@
+# third party
+import pytest
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+from src.main.core.database import *
+from src.main.core.database.bin_storage.bin_obj import COMPRESSION_THRESHOLD
+from src.main.core.database.store_cache import ObjectCache
+from src.main.core.database.store_disk import DiskObjectStore
+
+tensor1 = th.tensor([[1, 2, 3, 4], [10, 20, 30, 40]])
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(BinObject).delete()
+        database.session.query(BinObjectChunk).delete()
+        database.session.query(BinBlob).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ObjectCache(max_bytes=10)
+    cache.put("a", 1, size=4)
+    cache.put("b", 2, size=4)
+    assert cache.get("a") == (True, 1)
+
+    cache.put("c", 3, size=4)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.size == 8
+    assert cache.stats["evictions"] == 1
+
+
+def test_cache_skips_oversized_values():
+    cache = ObjectCache(max_bytes=10)
+    cache.put("a", 1, size=11)
+
+    assert len(cache) == 0
+    assert cache.get("a") == (False, None)
+    assert cache.stats["misses"] == 1
+
+
+def test_store_reads_through_cache(client, database, cleanup):
+    cache = ObjectCache(max_bytes=1024 * 1024)
+    disk_store = DiskObjectStore(database, cache=cache)
+    _id = UID()
+    disk_store.__setitem__(_id, StorableObject(id=_id, data=tensor1))
+
+    assert th.all(th.eq(disk_store.__getitem__(_id).data, tensor1))
+    assert th.all(th.eq(disk_store.__getitem__(_id).data, tensor1))
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_store_invalidates_cache(client, database, cleanup):
+    cache = ObjectCache(max_bytes=1024 * 1024)
+    disk_store = DiskObjectStore(database, cache=cache)
+    _id = UID()
+    disk_store.__setitem__(_id, StorableObject(id=_id, data=tensor1))
+    disk_store.__getitem__(_id).data
+    assert str(_id.value) in cache
+
+    disk_store.__setitem__(_id, StorableObject(id=_id, data=tensor1 * 2))
+    assert str(_id.value) not in cache
+    assert th.all(th.eq(disk_store.__getitem__(_id).data, tensor1 * 2))
+
+    disk_store.delete(_id)
+    assert str(_id.value) not in cache
+
+
+def test_store_charges_decoded_size(client, database, cleanup):
+    cache = ObjectCache(max_bytes=1024 * 1024)
+    disk_store = DiskObjectStore(database, cache=cache)
+    _id = UID()
+    tensor = th.zeros(COMPRESSION_THRESHOLD)
+    disk_store.__setitem__(_id, StorableObject(id=_id, data=tensor))
+    disk_store.__getitem__(_id).data
+
+    bin_obj = database.session.query(BinObject).get(str(_id.value))
+    assert bin_obj.blob.size < COMPRESSION_THRESHOLD
+    assert cache.size == tensor.element_size() * tensor.nelement()
@@ -0,0 +1,50 @@
+# stdlib
+import importlib
+
+# third party
+from src.main.utils.streaming import FRAME_LENGTH
+from src.main.utils.streaming import FRAME_REPLY
+from src.main.utils.streaming import REPLY_HEADER
+
+# The app serves the routes from the main package
+routes = importlib.import_module("main.routes.general.routes")
+
+MESSAGES = [b"first", b"", b"third" * 100]
+
+
+def batch(messages):
+    return b"".join(FRAME_LENGTH.pack(len(m)) + m for m in messages)
+
+
+def test_pysyft_batch_streams_replies(client, monkeypatch):
+    processed = []
+
+    def process_syft_frame(frame):
+        processed.append(bytes(frame))
+        return FRAME_REPLY, bytes(frame).upper()
+
+    monkeypatch.setattr(routes, "process_syft_frame", process_syft_frame)
+
+    response = client.post("/pysyft_batch", data=batch(MESSAGES))
+    assert response.status_code == 200
+    # Messages are processed as their replies are sent
+    assert len(processed) < len(MESSAGES)
+
+    body = response.get_data()
+    assert processed == MESSAGES
+
+    offset = 0
+    for message in MESSAGES:
+        assert REPLY_HEADER.unpack_from(body, offset) == (FRAME_REPLY, len(message))
+        offset += REPLY_HEADER.size
+        assert body[offset : offset + len(message)] == message.upper()
+        offset += len(message)
+    assert offset == len(body)
+
+
+def test_pysyft_batch_truncated(client, monkeypatch):
+    monkeypatch.setattr(routes, "process_syft_frame", lambda frame: (FRAME_REPLY, b""))
+
+    # Rejected without a view left on the buffer of the body
+    response = client.post("/pysyft_batch", data=batch(MESSAGES)[:-1])
+    assert response.status_code == 400
@@ -0,0 +1,66 @@
+# third party
+from src.main.utils.http_cache import IMMUTABLE
+from src.main.utils.http_cache import REVALIDATE
+from src.main.utils.http_cache import conditional_download
+
+
+def download(app, if_none_match, **kwargs):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return b"payload"
+
+    headers = {"If-None-Match": if_none_match}
+    with app.test_request_context("/", headers=headers):
+        response = conditional_download("checkpoint-1", load, **kwargs)
+        response.direct_passthrough = False
+        return response, len(loads)
+
+
+def test_conditional_download(app):
+    response, loads = download(app, '"checkpoint-0"', headers={"X-Extra": "1"})
+    assert response.status_code == 200
+    assert response.get_data() == b"payload"
+    assert response.headers["ETag"] == '"checkpoint-1"'
+    assert response.headers["Cache-Control"] == REVALIDATE
+    assert response.headers["X-Extra"] == "1"
+    assert loads == 1
+
+
+def test_conditional_download_not_modified(app):
+    response, loads = download(app, '"checkpoint-0", "checkpoint-1"', immutable=True)
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == '"checkpoint-1"'
+    assert response.headers["Cache-Control"] == IMMUTABLE
+    assert loads == 0
+
+
+def test_conditional_download_range(app, tmp_path):
+    path = tmp_path / "payload"
+    path.write_bytes(b"payload")
+
+    for load_file in [None, lambda: str(path)]:
+        headers = {"Range": "bytes=3-"}
+        with app.test_request_context("/", headers=headers):
+            response = conditional_download(
+                "checkpoint-1", lambda: b"payload", load_file=load_file
+            )
+            response.direct_passthrough = False
+            assert response.status_code == 206
+            assert response.get_data() == b"load"
+            assert response.headers["ETag"] == '"checkpoint-1"'
+
+
+def test_conditional_download_accel_redirect(app, tmp_path):
+    with app.test_request_context("/"):
+        response = conditional_download(
+            "checkpoint-1",
+            lambda: b"payload",
+            load_file=lambda: str(tmp_path / "ab" / "abcd"),
+            accel_uri=lambda path: "/_assets/ab/abcd",
+        )
+    assert response.status_code == 200
+    assert response.get_data() == b""
+    assert response.headers["X-Accel-Redirect"] == "/_assets/ab/abcd"
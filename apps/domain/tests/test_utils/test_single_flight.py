@@ -0,0 +1,92 @@
+# stdlib
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from types import SimpleNamespace
+
+# third party
+import pytest
+from src.main.utils import single_flight
+from src.main.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_load():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def load():
+        calls.append(1)
+        release.wait()
+        return b"value"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "key", load) for _ in range(8)]
+        while flight.shared < 7:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == [b"value"] * 8
+    assert calls == [1]
+
+
+def test_ttl():
+    calls = []
+
+    def load():
+        calls.append(1)
+        return len(calls)
+
+    flight = SingleFlight(ttl=60)
+    assert flight.do("key", load) == 1
+    assert flight.do("key", load) == 1
+    assert flight.do("other", load) == 2
+
+    flight = SingleFlight(ttl=0)
+    assert flight.do("key", load) == 3
+    assert flight.do("key", load) == 4
+
+
+def test_expired_results_are_dropped(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(
+        single_flight, "time", SimpleNamespace(monotonic=lambda: now[0])
+    )
+    flight = SingleFlight(ttl=10)
+    flight.do("first", lambda: 1)
+    now[0] += 5
+    flight.do("second", lambda: 2)
+    assert set(flight._calls) == {"first", "second"}
+
+    # Expired results are dropped by the next call, whatever its key
+    now[0] += 5
+    assert flight.do("third", lambda: 3) == 3
+    assert set(flight._calls) == {"second", "third"}
+    now[0] += 5
+    assert flight.do("second", lambda: "reloaded") == "reloaded"
+    assert set(flight._calls) == {"second", "third"}
+
+
+def test_finished_calls_are_dropped():
+    flight = SingleFlight(ttl=0)
+    flight.do("key", lambda: "value")
+    with pytest.raises(ValueError):
+        flight.do("other", lambda: int("not a number"))
+    assert flight._calls == {}
+
+
+def test_errors_are_not_kept():
+    flight = SingleFlight(ttl=60)
+
+    def fail():
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "value") == "value"
+
+
+def test_nested_call_in_same_thread():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: flight.do("key", lambda: "inner")) == "inner"
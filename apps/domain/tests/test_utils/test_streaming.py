@@ -0,0 +1,104 @@
+# stdlib
+import io
+import mmap
+
+# third party
+import pytest
+from src.main.core.exceptions import InvalidParameterValueError
+from src.main.core.exceptions import MessageTooLargeError
+from src.main.utils import streaming
+from src.main.utils.streaming import FRAME_ERROR
+from src.main.utils.streaming import FRAME_LENGTH
+from src.main.utils.streaming import FRAME_NO_REPLY
+from src.main.utils.streaming import FRAME_REPLY
+from src.main.utils.streaming import REPLY_HEADER
+from src.main.utils.streaming import request_message
+from src.main.utils.streaming import split_data_message
+from src.main.utils.streaming import split_frames
+from src.main.utils.streaming import stream_frames
+from src.main.utils.streaming import stream_response
+
+DATA = bytes(range(256)) * 1024
+
+
+@pytest.mark.parametrize("spool_size", [len(DATA), 1024])
+def test_request_message(spool_size):
+    with request_message(io.BytesIO(DATA), len(DATA), 0, spool_size) as buffer:
+        assert bytes(buffer) == DATA
+        assert isinstance(buffer.obj, mmap.mmap) == (spool_size < len(DATA))
+
+
+def test_request_message_memory_limit(monkeypatch):
+    monkeypatch.setattr(streaming, "MESSAGE_MEMORY_SIZE", 1024)
+
+    # Spooled to disk once concurrent requests hold the memory limit
+    with request_message(io.BytesIO(DATA), len(DATA), 0, len(DATA)) as buffer:
+        assert bytes(buffer) == DATA
+        assert isinstance(buffer.obj, mmap.mmap)
+    assert streaming._memory_used == 0
+
+
+def test_request_message_too_large():
+    with pytest.raises(MessageTooLargeError):
+        with request_message(io.BytesIO(DATA), len(DATA), 1024):
+            pass
+
+    # Bodies sent without a content length are counted while read
+    with pytest.raises(MessageTooLargeError):
+        with request_message(io.BytesIO(DATA), None, 1024):
+            pass
+
+
+def test_stream_response():
+    response = stream_response(DATA, chunk_size=1000)
+    assert response.is_streamed
+    assert b"".join(response.response) == DATA
+
+    response = stream_response(b"reply", chunk_size=1000)
+    assert not response.is_streamed
+    assert response.get_data() == b"reply"
+
+
+def test_split_data_message():
+    obj_type, content = b"syft.Message", bytes(range(200))
+    message = (
+        b"\x0a"
+        + bytes([len(obj_type)])
+        + obj_type
+        # Content longer than 127 bytes has a two byte length
+        + b"\x12"
+        + bytes([len(content) & 0x7F | 0x80, len(content) >> 7])
+        + content
+    )
+    buffer = memoryview(message)
+
+    name, view = split_data_message(buffer)
+    assert name == "syft.Message"
+    assert view.obj is message
+    assert bytes(view) == content
+
+    with pytest.raises(InvalidParameterValueError):
+        split_data_message(buffer[:-1])
+
+
+def test_split_frames():
+    messages = [b"first", b"", b"third" * 100]
+    batch = b"".join(FRAME_LENGTH.pack(len(m)) + m for m in messages)
+    frames = split_frames(memoryview(batch))
+    assert [bytes(frame) for frame in frames] == messages
+
+    with pytest.raises(InvalidParameterValueError):
+        split_frames(memoryview(batch[:-1]))
+
+
+def test_stream_frames():
+    replies = [(FRAME_REPLY, DATA), (FRAME_NO_REPLY, b""), (FRAME_ERROR, b"{}")]
+    body = b"".join(stream_frames(replies, chunk_size=1000).response)
+
+    offset = 0
+    for status, payload in replies:
+        assert REPLY_HEADER.unpack_from(body, offset) == (status, len(payload))
+        offset += REPLY_HEADER.size
+        assert body[offset : offset + len(payload)] == payload
+        offset += len(payload)
+    assert offset == len(body)